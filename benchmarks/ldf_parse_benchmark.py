@@ -0,0 +1,136 @@
+"""Compare one extract_* call per section with parse_ldf.
+
+    python benchmarks/ldf_parse_benchmark.py [matrix.ldf] [--frames 500] [--values 16]
+
+Without an LDF a synthetic one is generated: every frame carries 8 signals
+and every signal has its own encoding type with --values logical values.
+Called on the LDF text, each extractor splits and indexes the whole file on
+its own; parse_ldf indexes it once and hands every extractor its section.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ldf2xlsx import (
+    extract_frames,
+    extract_info,
+    extract_node_attributes,
+    extract_nodes,
+    extract_schedule_tables,
+    extract_signal_encoding_types,
+    extract_signals,
+    parse_ldf,
+)
+
+SIGNALS_PER_FRAME = 8
+
+
+def make_ldf(frames: int, values: int) -> str:
+    signals = [
+        (f"Frm{frame}_Sig{sig}", frame)
+        for frame in range(frames)
+        for sig in range(SIGNALS_PER_FRAME)
+    ]
+    lines = [
+        "LIN_description_file;",
+        'LIN_protocol_version = "2.1";',
+        'LIN_language_version = "2.1";',
+        "LIN_speed = 19.2 kbps;",
+        "",
+        "Nodes {",
+        "    Master: BCM, 10.0 ms, 0.1 ms;",
+        "    Slaves: SEAT, WIPER;",
+        "}",
+        "",
+        "Signals {",
+    ]
+    lines += [f"    {name}: 8, 0, BCM, SEAT, WIPER;    //{name}" for name, _ in signals]
+    lines += ["}", "", "Frames {"]
+    for frame in range(frames):
+        lines.append(f"    Frm{frame}: {frame % 60}, BCM, 8 {{")
+        lines += [
+            f"        Frm{frame}_Sig{sig}, {sig * 8};"
+            for sig in range(SIGNALS_PER_FRAME)
+        ]
+        lines.append("    }")
+    lines += ["}", "", "Node_attributes {"]
+    for nad, node in enumerate(("SEAT", "WIPER"), start=16):
+        lines += [
+            f"    {node} {{",
+            '        LIN_protocol = "2.1";',
+            f"        configured_NAD = 0x{nad:X};",
+            "        product_id = 0x0, 0x0, 0;",
+            "        P2_min = 50 ms;",
+            "        configurable_frames {",
+        ]
+        lines += [f"            Frm{frame};" for frame in range(frames)]
+        lines += ["        }", "    }"]
+    lines += ["}", "", "Schedule_tables {", "    Normal {"]
+    lines += [f"        Frm{frame} delay 10 ms;" for frame in range(frames)]
+    lines += ["    }", "}", "", "Signal_encoding_types {"]
+    for name, _ in signals:
+        lines.append(f"    Enc_{name} {{")
+        lines += [
+            f'        logical_value, {value}, "State {value}";'
+            for value in range(values)
+        ]
+        lines += ['        physical_value, 0, 255, 1, 0, "unit";', "    }"]
+    lines += ["}", ""]
+    return "\n".join(lines)
+
+
+def extract_each(data: str):
+    return {
+        "info": extract_info(data),
+        "nodes": extract_nodes(data),
+        "signals": extract_signals(data),
+        "frames": extract_frames(data),
+        "node_attributes": extract_node_attributes(data),
+        "schedule_tables": extract_schedule_tables(data),
+        "signal_encoding_types": extract_signal_encoding_types(data),
+    }
+
+
+def run(parse, data: str, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = parse(data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("ldf", nargs="?", help="LDF file to parse")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--values", type=int, default=16)
+    args = parser.parse_args()
+
+    if args.ldf:
+        with open(args.ldf, encoding="utf-8") as f:
+            data = f.read()
+    else:
+        data = make_ldf(args.frames, args.values)
+    print(f"LDF: {data.count(chr(10)) + 1} lines, {len(data) / 1024:.1f} KiB")
+
+    results = {
+        "extract_* each": run(extract_each, data),
+        "parse_ldf": run(parse_ldf, data),
+    }
+    for name, (elapsed, result) in results.items():
+        print(
+            f"{name:16} {elapsed:8.3f} s  {len(result['frames'])} frames, "
+            f"{len(result['signal_encoding_types'])} encoding types"
+        )
+    assert results["extract_* each"][1] == results["parse_ldf"][1]
+    speedup = results["extract_* each"][0] / results["parse_ldf"][0]
+    print(f"Speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Compare the per-cell copy() of styles with StyleCopier.
+
+    python benchmarks/style_copy_benchmark.py [domain.xlsx] [--rows 10000] [--cols 46]
+
+Without a workbook a synthetic Matrix sheet with a few dozen distinct styles
+is generated. Both copiers write all Matrix rows into a new workbook, which
+is saved to memory to compare the output file size.
+"""
+
+import argparse
+import os
+import sys
+import time
+from copy import copy
+from io import BytesIO
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from style_copier import StyleCopier
+
+
+def make_matrix(rows: int, cols: int):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Matrix"
+    fills = [
+        PatternFill(start_color=color, fill_type="solid")
+        for color in ("00CCFF", "FFFF99", "CCFFCC", "FFCC99")
+    ]
+    fonts = [Font(bold=True), Font(italic=True), Font(name="Arial", size=9)]
+    thin = Side(style="thin")
+    borders = [Border(left=thin, right=thin, top=thin, bottom=thin), Border()]
+    alignments = [Alignment(wrap_text=True), Alignment(horizontal="center")]
+    for row in range(1, rows + 1):
+        for col in range(1, cols + 1):
+            cell = ws.cell(row=row, column=col, value=f"{row}:{col}")
+            cell.fill = fills[(row + col) % len(fills)]
+            cell.font = fonts[row % len(fonts)]
+            cell.border = borders[col % len(borders)]
+            cell.alignment = alignments[(row // 7) % len(alignments)]
+            if col % 5 == 0:
+                cell.number_format = "0.00"
+    return wb
+
+
+def copy_legacy(source_cell, target_cell):
+    target_cell.value = source_cell.value
+    if source_cell.has_style:
+        target_cell.font = copy(source_cell.font)
+        target_cell.border = copy(source_cell.border)
+        target_cell.fill = copy(source_cell.fill)
+        target_cell.number_format = copy(source_cell.number_format)
+        target_cell.protection = copy(source_cell.protection)
+        target_cell.alignment = copy(source_cell.alignment)
+
+
+def copy_interned(styles: StyleCopier):
+    def copy_cell(source_cell, target_cell):
+        target_cell.value = source_cell.value
+        if source_cell.has_style:
+            styles.copy(source_cell, target_cell)
+
+    return copy_cell
+
+
+def run(source_ws, copy_cell):
+    target_wb = Workbook()
+    target_ws = target_wb.active
+    start = time.perf_counter()
+    for row in source_ws.iter_rows():
+        for source_cell in row:
+            copy_cell(
+                source_cell,
+                target_ws.cell(row=source_cell.row, column=source_cell.column),
+            )
+    elapsed = time.perf_counter() - start
+
+    output = BytesIO()
+    target_wb.save(output)
+    return elapsed, len(output.getvalue()), len(target_wb._cell_styles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("workbook", nargs="?", help="Domain matrix to copy")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--cols", type=int, default=46)
+    args = parser.parse_args()
+
+    if args.workbook:
+        source_ws = load_workbook(args.workbook)["Matrix"]
+    else:
+        source_ws = make_matrix(args.rows, args.cols)["Matrix"]
+    print(f"Matrix: {source_ws.max_row} rows x {source_ws.max_column} columns")
+
+    styles = StyleCopier()
+    results = {
+        "copy() per cell": run(source_ws, copy_legacy),
+        "StyleCopier": run(source_ws, copy_interned(styles)),
+    }
+    for name, (elapsed, size, cell_styles) in results.items():
+        print(
+            f"{name:16} {elapsed:8.2f} s  {size / 1024:9.1f} KiB  "
+            f"{cell_styles} cell styles"
+        )
+    print(f"Distinct source styles: {styles.style_count}")
+    speedup = results["copy() per cell"][0] / results["StyleCopier"][0]
+    print(f"Speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
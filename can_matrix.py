@@ -0,0 +1,420 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+from matrix_loader import (
+    extract_senders_receivers,
+    find_bus_users,
+    read_columns,
+    read_sheet,
+)
+
+# Bilingual headers of the Matrix sheet
+MSG_NAME = "Msg Name\n报文名称"
+MSG_TYPE = "Msg Type\n报文类型"
+MSG_ID = "Msg ID\n报文标识符"
+MSG_SEND_TYPE = "Msg Send Type\n报文发送类型"
+MSG_CYCLE_TIME = "Msg Cycle Time (ms)\n报文周期时间"
+FRAME_FORMAT = "Frame Format\n帧格式"
+BRS = "BRS\n传输速率切换标识位"
+MSG_LENGTH = "Msg Length (Byte)\n报文长度"
+SIGNAL_NAME = "Signal Name\n信号名称"
+SIGNAL_DESCRIPTION = "Signal Description\n信号描述"
+BYTE_ORDER = "Byte Order\n排列格式(Intel/Motorola)"
+START_BYTE = "Start Byte\n起始字节"
+START_BIT = "Start Bit\n起始位"
+SIGNAL_SEND_TYPE = "Signal Send Type\n信号发送类型"
+BIT_LENGTH = "Bit Length (Bit)\n信号长度"
+DATA_TYPE = "Data Type\n数据类型"
+RESOLUTION = "Resolution\n精度"
+OFFSET = "Offset\n偏移量"
+MIN_PHYS = "Signal Min. Value (phys)\n物理最小值"
+MAX_PHYS = "Signal Max. Value (phys)\n物理最大值"
+MIN_HEX = "Signal Min. Value (Hex)\n总线最小值"
+MAX_HEX = "Signal Max. Value (Hex)\n总线最大值"
+INITIAL_VALUE = "Initial Value (Hex)\n初始值"
+INVALID_VALUE = "Invalid Value(Hex)\n无效值"
+INACTIVE_VALUE = "Inactive Value (Hex)\n非使能值"
+UNIT = "Unit\n单位"
+VALUE_DESCRIPTION = "Signal Value Description\n信号值描述"
+MSG_CYCLE_TIME_FAST = "Msg Cycle Time Fast(ms)\n报文发送的快速周期"
+MSG_NR_OF_REPETITION = "Msg Nr. Of Reption\n报文快速发送的次数"
+MSG_DELAY_TIME = "Msg Delay Time(ms)\n报文延时时间"
+
+# Short column name -> sheet header. Message fields are forward-filled from
+# the message row onto its signal rows.
+MESSAGE_COLUMNS = {
+    "Msg ID": MSG_ID,
+    "Msg Name": MSG_NAME,
+    "Cycle Type": MSG_CYCLE_TIME,
+    "Msg Time Fast": MSG_CYCLE_TIME_FAST,
+    "Msg Reption": MSG_NR_OF_REPETITION,
+    "Msg Delay": MSG_DELAY_TIME,
+    "Msg Type": MSG_TYPE,
+    "Send Type": MSG_SEND_TYPE,
+    "Msg Length": MSG_LENGTH,
+}
+SIGNAL_COLUMNS = {
+    "Sig Name": SIGNAL_NAME,
+    "Start Byte": START_BYTE,
+    "Start Bit": START_BIT,
+    "Length": BIT_LENGTH,
+    "Resolution": RESOLUTION,
+    "Offset": OFFSET,
+    "Initinal": INITIAL_VALUE,
+    "Invalid": INVALID_VALUE,
+    "Min": MIN_PHYS,
+    "Min Hex": MIN_HEX,
+    "Max": MAX_PHYS,
+    "Max Hex": MAX_HEX,
+    "Unit": UNIT,
+    "Receiver": None,  # from the S/R columns
+    "Byte Order": BYTE_ORDER,
+    "Data Type": DATA_TYPE,
+    "Description": SIGNAL_DESCRIPTION,
+    "Signal Value Description": VALUE_DESCRIPTION,
+    "Senders": None,  # from the S/R columns
+    "Signal Send Type": SIGNAL_SEND_TYPE,
+    "Inactive value": INACTIVE_VALUE,
+}
+# Only CANFD matrices have these
+OPTIONAL_MESSAGE_COLUMNS = {"BRS": BRS, "Frame Format": FRAME_FORMAT}
+
+NODE_ROLE = pd.CategoricalDtype(["S", "R"])
+
+# Column of ExcelToDBCConverter's signal table -> CanMatrix.signals column
+DBC_COLUMNS = {
+    "Message ID": "Msg ID",
+    "Message Name": "Msg Name",
+    "Signal Name": "Sig Name",
+    "Cycle Type": "Cycle Type",
+    "Msg Time Fast": "Msg Time Fast",
+    "Msg Reption": "Msg Reption",
+    "Msg Delay": "Msg Delay",
+    "Start Byte": "Start Byte",
+    "Start Bit": "Start Bit",
+    "Length": "Length",
+    "Factor": "Resolution",
+    "Offset": "Offset",
+    "Initinal": "Initinal",
+    "Invalid": "Invalid",
+    "Min": "Min",
+    "Max": "Max",
+    "Unit": "Unit",
+    "Receiver": "Receiver",
+    "Byte Order": "Byte Order",
+    "Data Type": "Data Type",
+    "Message Type": "Msg Type",
+    "Send Type": "Send Type",
+    "Description": "Description",
+    "Msg Length": "Msg Length",
+    "Signal Value Description": "Signal Value Description",
+    "Senders": "Senders",
+    "Signal Send Type": "Signal Send Type",
+    "Inactive value": "Inactive value",
+    "Is Signed": "Is Signed",
+}
+# Message fields that must be the same on every row of a message
+DBC_MESSAGE_FIELDS = (
+    "Msg ID",
+    "Cycle Type",
+    "Send Type",
+    "Msg Length",
+    "Msg Type",
+    "Msg Time Fast",
+    "Msg Reption",
+    "Msg Delay",
+)
+DBC_TIMING_FIELDS = ("Cycle Type", "Msg Time Fast", "Msg Reption", "Msg Delay")
+
+# GenSigSendType values of a DBC
+SIGNAL_SEND_TYPES = [
+    "Cyclic",
+    "OnChange",
+    "OnWrite",
+    "IfActive",
+    "OnChangeWithRepetition",
+    "OnWriteWithRepetition",
+    "IfActiveWithRepetition",
+    "NoSigSendType",
+    "OnChangeAndIfActive",
+    "OnChangeAndIfActiveWithRepetition",
+    "CA",
+    "CE",
+    "Event",
+]
+
+
+def parse_frame_ids(ids: pd.Series) -> pd.Series:
+    """'0x1A3' style IDs (or plain numbers) as nullable integers"""
+
+    def parse(value):
+        if isinstance(value, str):
+            try:
+                return int(value.strip(), 16)
+            except ValueError:
+                return None
+        if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            return int(value)
+        return None
+
+    return pd.Series(
+        [parse(value) for value in ids], index=ids.index, dtype="Int64", name=ids.name
+    )
+
+
+class CanMatrix:
+    """Columnar model of a CAN matrix, built once and shared by the tools.
+
+    messages: one row per message row of the sheet, short column names plus
+              the integer "Frame ID".
+    signals:  one row per signal with the message fields forward-filled, the
+              same layout CANValidator validates.
+    roles:    categorical S/R per message (rows) and ECU (columns).
+
+    Both tables keep the index of the sheet row they come from.
+    """
+
+    def __init__(
+        self, messages: pd.DataFrame, signals: pd.DataFrame, roles: pd.DataFrame
+    ):
+        self.messages = messages
+        self.signals = signals
+        self.roles = roles
+
+    @property
+    def nodes(self) -> List[str]:
+        return list(self.roles.columns)
+
+    def senders(self) -> pd.Series:
+        """Comma-joined senders of every message"""
+        return self._nodes_with_role("S")
+
+    def receivers(self) -> pd.Series:
+        """Comma-joined receivers of every message"""
+        return self._nodes_with_role("R")
+
+    def _nodes_with_role(self, role: str) -> pd.Series:
+        nodes = np.array(self.nodes, dtype=object)
+        marks = (self.roles == role).to_numpy()
+        return pd.Series(
+            [",".join(nodes[row]) for row in marks],
+            index=self.roles.index,
+            dtype=object,
+        )
+
+    def dbc_signals(self) -> pd.DataFrame:
+        """Signal rows in the layout ExcelToDBCConverter builds the DBC from.
+
+        Message fields are taken from the first message row of each message
+        name, the timing fields as integers (0 when not a number).
+        """
+        messages = self.messages.copy()
+        for field in DBC_TIMING_FIELDS:
+            messages[field] = (
+                pd.to_numeric(messages[field], errors="coerce").fillna(0).astype(int)
+            )
+        for field in DBC_MESSAGE_FIELDS:
+            if field not in DBC_TIMING_FIELDS:
+                messages[field] = messages[field].ffill()
+        first = messages.groupby("Msg Name")[list(DBC_MESSAGE_FIELDS)].first()
+
+        signals = self.signals
+        names = signals["Msg Name"]
+        data = {}
+        for column, field in DBC_COLUMNS.items():
+            if field == "Msg Name":
+                data[column] = names
+            elif field in DBC_MESSAGE_FIELDS:
+                data[column] = names.map(first[field])
+            else:
+                data[column] = signals[field]
+        dbc_df = pd.DataFrame(data)
+
+        for column in ("Send Type", "Signal Send Type"):
+            dbc_df[column] = dbc_df[column].astype(str).str.replace("Cycle", "Cyclic")
+        return dbc_df
+
+    @classmethod
+    def from_sheet(
+        cls, df: pd.DataFrame, bus_users: Optional[List[str]] = None
+    ) -> "CanMatrix":
+        """Build from a Matrix sheet as read by pd.read_excel/read_sheet"""
+        if bus_users is None:
+            bus_users = find_bus_users(df)
+        senders, receivers = extract_senders_receivers(df, bus_users)
+
+        data = {name: df[header].ffill() for name, header in MESSAGE_COLUMNS.items()}
+        for name, header in SIGNAL_COLUMNS.items():
+            data[name] = df[header] if header is not None else None
+        data["Receiver"] = receivers
+        data["Senders"] = senders
+        for name, header in OPTIONAL_MESSAGE_COLUMNS.items():
+            data[name] = df[header].ffill() if header in df.columns else None
+
+        signals = pd.DataFrame(data)
+        signals["Unit"] = signals["Unit"].astype(str)
+        signals["Unit"] = signals["Unit"].str.replace("Ω", "Ohm", regex=False)
+        signals["Unit"] = signals["Unit"].str.replace("℃", "degC", regex=False)
+        signals = signals.dropna(subset=["Sig Name"])
+        signals["Is Signed"] = signals["Data Type"].str.contains("Signed", na=False)
+
+        message_rows = df[df[MSG_NAME].notna()]
+        messages = pd.DataFrame(
+            {name: message_rows[header] for name, header in MESSAGE_COLUMNS.items()}
+        )
+        for name, header in OPTIONAL_MESSAGE_COLUMNS.items():
+            messages[name] = message_rows[header] if header in df.columns else None
+        messages["Frame ID"] = parse_frame_ids(messages["Msg ID"])
+
+        roles = message_rows[bus_users].astype(NODE_ROLE)
+        return cls(messages, signals, roles)
+
+    @classmethod
+    def from_excel(cls, excel_path) -> "CanMatrix":
+        """Build from the Matrix sheet of an xlsx file (path or file-like)"""
+        return cls.from_sheet(read_sheet(excel_path, sheet_name="Matrix"))
+
+    @classmethod
+    def from_dbc(cls, db) -> "CanMatrix":
+        """Build from a cantools database, values written the way DBC_2_Xlsx
+        writes them into a Matrix sheet"""
+        nodes = [node.name for node in db.nodes]
+        messages = []
+        signals = []
+        roles = []
+        for message in db.messages:
+            attributes = message.dbc.attributes if message.dbc else {}
+
+            def attribute(name):
+                return attributes[name].value if name in attributes else None
+
+            is_fd = message.is_fd
+            message_row = {
+                "Msg ID": f"0x{message.frame_id:X}",
+                "Msg Name": message.name,
+                "Cycle Type": message.cycle_time,
+                "Msg Time Fast": attribute("GenMsgCycleTimeFast"),
+                "Msg Reption": attribute("GenMsgNrOfRepetition"),
+                "Msg Delay": attribute("GenMsgDelayTime"),
+                "Msg Type": (
+                    "NM"
+                    if message.name.startswith("NM_")
+                    else "Diag" if message.name.startswith("Diag") else "Normal"
+                ),
+                "Send Type": message.send_type,
+                "Msg Length": message.length,
+                "BRS": "1" if is_fd else "0",
+                "Frame Format": "StandardCAN_FD" if is_fd else "StandardCAN",
+            }
+            messages.append({**message_row, "Frame ID": message.frame_id})
+
+            senders = ",".join(message.senders) or "Vector__XXX"
+            receivers = set()
+            for signal in message.signals:
+                receivers.update(signal.receivers)
+                signals.append(
+                    {
+                        **message_row,
+                        **cls._dbc_signal_row(signal),
+                        "Senders": senders,
+                    }
+                )
+            roles.append(
+                {
+                    node: (
+                        "S"
+                        if node in message.senders
+                        else "R" if node in receivers else None
+                    )
+                    for node in nodes
+                }
+            )
+
+        signal_columns = list(MESSAGE_COLUMNS) + list(SIGNAL_COLUMNS)
+        signal_columns += list(OPTIONAL_MESSAGE_COLUMNS) + ["Is Signed"]
+        messages = pd.DataFrame(
+            messages,
+            columns=list(MESSAGE_COLUMNS)
+            + list(OPTIONAL_MESSAGE_COLUMNS)
+            + ["Frame ID"],
+        )
+        messages["Frame ID"] = messages["Frame ID"].astype("Int64")
+        roles = pd.DataFrame(roles, columns=nodes, index=messages.index).astype(
+            NODE_ROLE
+        )
+        return cls(messages, pd.DataFrame(signals, columns=signal_columns), roles)
+
+    @staticmethod
+    def _dbc_signal_row(signal) -> Dict:
+        conversion = signal.conversion
+        attributes = signal.dbc.attributes if signal.dbc else {}
+        send_type = attributes.get("GenSigSendType")
+        send_type = send_type.value if send_type is not None else None
+
+        def raw_hex(value):
+            if value is None or conversion.scale == 0:
+                return None
+            return f"0x{int((value - conversion.offset) / conversion.scale):X}"
+
+        choices = signal.choices or {}
+        unit = str(signal.unit)
+        return {
+            "Sig Name": signal.name,
+            "Start Byte": signal.start // 8,
+            "Start Bit": signal.start,
+            "Length": signal.length,
+            "Resolution": conversion.scale,
+            "Offset": conversion.offset,
+            "Initinal": (
+                f"0x{int(signal.raw_initial):X}"
+                if signal.raw_initial is not None
+                else None
+            ),
+            "Invalid": (
+                f"0x{int(signal.raw_invalid):X}"
+                if signal.raw_invalid is not None
+                else None
+            ),
+            "Min": signal.minimum,
+            "Min Hex": raw_hex(signal.minimum),
+            "Max": signal.maximum,
+            "Max Hex": raw_hex(signal.maximum),
+            "Unit": unit.replace("Ω", "Ohm").replace("℃", "degC"),
+            "Receiver": ",".join(signal.receivers) or "Vector__XXX",
+            "Byte Order": (
+                "Motorola MSB" if signal.byte_order == "big_endian" else "Intel"
+            ),
+            "Data Type": "Signed" if signal.is_signed else "Unsigned",
+            "Description": signal.comment,
+            "Signal Value Description": (
+                "\n".join(
+                    f"0x{int(value):X}: {text}" for value, text in choices.items()
+                )
+                or None
+            ),
+            "Signal Send Type": (
+                SIGNAL_SEND_TYPES[send_type]
+                if isinstance(send_type, int) and send_type < len(SIGNAL_SEND_TYPES)
+                else None
+            ),
+            "Inactive value": None,
+            "Is Signed": bool(signal.is_signed),
+        }
+
+
+def read_messages(excel_path) -> pd.DataFrame:
+    """CanMatrix.messages of an xlsx matrix without the signals and node roles.
+    Only the message columns of the Matrix sheet are read, for the tools that
+    need nothing else (busload, CAN ID map)."""
+    headers = [*MESSAGE_COLUMNS.values(), *OPTIONAL_MESSAGE_COLUMNS.values()]
+    columns = read_columns(excel_path, headers)
+    rows = np.flatnonzero(pd.notna(columns[MSG_NAME]))
+    messages = pd.DataFrame(
+        {name: columns[header][rows] for name, header in MESSAGE_COLUMNS.items()},
+        index=rows,
+    )
+    for name, header in OPTIONAL_MESSAGE_COLUMNS.items():
+        messages[name] = columns[header][rows] if header in columns else None
+    messages["Frame ID"] = parse_frame_ids(messages["Msg ID"])
+    return messages
@@ -0,0 +1,1097 @@
+"""Rules of the CAN matrix validator.
+
+The rules check the signal table of a matrix (CanMatrix.signals, the layout
+pages/CANValidator.py works on) and report their findings as rows of one
+error table with ERROR_COLUMNS:
+
+    Rule         key of the rule in RULES
+    Severity     "error" or "warning"
+    Error Type   what is wrong, e.g. "Invalid Message ID"
+    Column       short matrix column the finding belongs to
+    Msg Name     message of the finding
+    Sig Name     signal of the finding, None for message findings
+    Message/Signal Name, Details, Expected   the text shown to the user
+
+Message rules look at the last row of every message name and signal rules at
+the last row of every signal name. Columns that need parsing (IDs, hex values,
+value descriptions) are parsed once per distinct value and shared by all
+rules through MatrixColumns, the checks themselves are masks over the arrays.
+"""
+
+import math
+import re
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from signal_layout import Layout, check_layout
+
+ERROR_COLUMNS = [
+    "Rule",
+    "Severity",
+    "Error Type",
+    "Column",
+    "Msg Name",
+    "Sig Name",
+    "Message/Signal Name",
+    "Details",
+    "Expected",
+]
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_\-]+$")
+MAX_NAME_LENGTH = 64
+RECOMMENDED_SIGNAL_NAME_LENGTH = 36
+
+MESSAGE_TYPES = ["Normal", "Diag", "NM"]
+MESSAGE_SEND_TYPES = ["Cycle", "Event", "CE"]
+FRAME_FORMATS = ["StandardCAN_FD", "StandardCAN"]
+CYCLIC_SEND_TYPES = ["Cycle", "CE", "CA"]
+EVENT_SEND_TYPES = ["Event", "IfActive"]
+
+# Message send type -> allowed signal send types
+SIGNAL_SEND_TYPES = {
+    "CA": ["Cycle", "IfActiveWithRepetition"],
+    "CE": [
+        "Cycle",
+        "OnWrite",
+        "OnChange",
+        "OnWriteWithRepetition",
+        "OnChangeWithRepetition",
+    ],
+    "Cycle": ["Cycle"],
+    "Event": [
+        "OnWrite",
+        "OnChange",
+        "OnWriteWithRepetition",
+        "OnChangeWithRepetition",
+    ],
+    "IfActive": ["IfActive"],
+}
+
+VALUE_DESCRIPTION_PATTERN = re.compile(
+    r"^(?:"
+    r"0x[0-9A-Fa-f]+(:|~0x[0-9A-Fa-f]+:)\s*"
+    r"[<>A-Za-z0-9 _+\-.,/%°()&]+"
+    r"(?:\s*[+&]\s*[<>A-Za-z0-9 _+\-.,/%°()]+)*"
+    r"(?:\n|$)"
+    r")+$"
+)
+VALUE_DESCRIPTION_CHARS = re.compile(r"^[A-Za-z0-9 ,.:+_/\-<>%()&~-]+$")
+VALUE_DESCRIPTION_KEYS = re.compile(r"(0x[0-9A-Fa-f]+[:~]?)")
+DESCRIPTION_PATTERN = re.compile(r"^[A-Za-z0-9 ,.;:+_/-<>%()°~-]+$")
+
+BIT_LENGTH_EXPECTED = (
+    "Signal values (Max, Initial, Invalid) must not exceed 2^N - 1, "
+    "where N is the signal bit length"
+)
+
+
+def parse_int(value):
+    """Integer of a matrix cell: '0x1F' is hex, '31' decimal, numbers are
+    returned as they are. Raises ValueError for text that is neither."""
+    if isinstance(value, str):
+        if value.startswith(("0x", "0X")):
+            return int(value, 16)
+        return int(value)
+    return value
+
+
+def _is_number(value) -> bool:
+    return type(value) in (int, float)
+
+
+def _map_distinct(series: pd.Series, func: Callable) -> np.ndarray:
+    """func applied once per distinct non-empty value, NaN stays None"""
+    codes, uniques = pd.factorize(series)
+    mapped = np.empty(len(uniques) + 1, dtype=object)
+    for position, value in enumerate(uniques):
+        mapped[position] = func(value)
+    return mapped[codes]
+
+
+def _last_positions(keys: pd.Series) -> np.ndarray:
+    """Position of the last row of every key, keys in order of first appearance"""
+    codes, _ = pd.factorize(keys)
+    valid = codes >= 0
+    positions = np.arange(len(codes))[valid]
+    if not len(positions):
+        return positions
+    return pd.Series(positions).groupby(codes[valid]).max().to_numpy()
+
+
+def _isclose(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """math.isclose(a, b, rel_tol=1e-9) for arrays"""
+    with np.errstate(invalid="ignore"):
+        return (a == b) | (np.abs(a - b) <= 1e-9 * np.maximum(np.abs(a), np.abs(b)))
+
+
+class MatrixColumns:
+    """Signal table of a matrix with the parsed columns the rules share.
+
+    Every column is parsed once, on its distinct values, the first time a
+    rule needs it.
+    """
+
+    def __init__(self, signals: pd.DataFrame):
+        self.signals = signals
+        self._integers: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._numbers: Dict[str, np.ndarray] = {}
+
+    @cached_property
+    def message_rows(self) -> np.ndarray:
+        """Position of the last row of every message"""
+        return _last_positions(self.signals["Msg Name"])
+
+    @cached_property
+    def signal_rows(self) -> np.ndarray:
+        """Position of the last row of every signal"""
+        return _last_positions(self.signals["Sig Name"])
+
+    @cached_property
+    def layout(self) -> Layout:
+        """Bit occupancy of every message, signals labelled by row position"""
+        return check_layout(
+            self.column("Msg Name"),
+            pd.Series(np.arange(len(self.signals))),
+            self.column("Start Bit"),
+            self.column("Length"),
+            self.column("Byte Order"),
+            self.column("Msg Length"),
+        )
+
+    def column(self, name: str) -> pd.Series:
+        if name in self.signals.columns:
+            return self.signals[name]
+        return pd.Series(np.nan, index=self.signals.index, dtype=object, name=name)
+
+    def has_values(self, name: str) -> bool:
+        """The column exists and is not empty, e.g. Frame Format of a CANFD matrix"""
+        return name in self.signals.columns and self.signals[name].notna().any()
+
+    def values(self, name: str, rows: np.ndarray) -> np.ndarray:
+        return self.column(name).to_numpy(dtype=object)[rows]
+
+    def integers(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """parse_int of a column as floats (NaN when empty or unparsable) and
+        the parse error of every value (None when there is none)"""
+        if name not in self._integers:
+
+            def parse(value):
+                try:
+                    return float(parse_int(value)), None
+                except (ValueError, TypeError) as e:
+                    return np.nan, str(e)
+
+            parsed = _map_distinct(self.column(name), parse)
+            floats = np.array(
+                [np.nan if item is None else item[0] for item in parsed], dtype=float
+            )
+            errors = np.array(
+                [None if item is None else item[1] for item in parsed], dtype=object
+            )
+            self._integers[name] = (floats, errors)
+        return self._integers[name]
+
+    def numbers(self, name: str) -> np.ndarray:
+        """Values that are int or float as floats, NaN for anything else"""
+        if name not in self._numbers:
+            column = self.column(name)
+            if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(
+                column
+            ):
+                floats = column.to_numpy(dtype=float, na_value=np.nan)
+            else:
+                floats = _map_distinct(
+                    column, lambda value: float(value) if _is_number(value) else None
+                )
+                floats = np.array(
+                    [np.nan if value is None else value for value in floats],
+                    dtype=float,
+                )
+            self._numbers[name] = floats
+        return self._numbers[name]
+
+    def number_types(self, name: str, rows: np.ndarray) -> np.ndarray:
+        """True where the value is an int or float (NaN included)"""
+        column = self.column(name)
+        if pd.api.types.is_numeric_dtype(column):
+            return np.full(len(rows), not pd.api.types.is_bool_dtype(column))
+        return column.iloc[rows].map(_is_number).to_numpy(dtype=bool)
+
+
+def _found(
+    columns: MatrixColumns,
+    rows: np.ndarray,
+    error_type: str,
+    column: str,
+    details: Union[str, List[str]],
+    expected: Union[str, List[str]],
+    message: bool = False,
+    severity: str = "error",
+) -> pd.DataFrame:
+    msg_names = columns.values("Msg Name", rows)
+    sig_names = None if message else columns.values("Sig Name", rows)
+    names = msg_names if message else sig_names
+    return pd.DataFrame(
+        {
+            "Severity": severity,
+            "Error Type": error_type,
+            "Column": column,
+            "Msg Name": msg_names,
+            "Sig Name": sig_names,
+            "Message/Signal Name": [str(name) for name in names],
+            "Details": details,
+            "Expected": expected,
+        },
+        columns=ERROR_COLUMNS[1:],
+    )
+
+
+def _name_findings(
+    columns: MatrixColumns, rows: np.ndarray, name_column: str, kind: str
+) -> List[pd.DataFrame]:
+    message = name_column == "Msg Name"
+    names = columns.column(name_column).iloc[rows].astype(str)
+    invalid = ~names.str.strip().str.fullmatch(NAME_PATTERN).to_numpy(dtype=bool)
+    lengths = names.str.len().to_numpy()
+    too_long = lengths > MAX_NAME_LENGTH
+
+    findings = [
+        _found(
+            columns,
+            rows[invalid],
+            f"Invalid {kind} Name",
+            name_column,
+            "Contains prohibited characters",
+            "Only A-Z, a-z, 0-9, _, - allowed",
+            message=message,
+        ),
+        _found(
+            columns,
+            rows[too_long],
+            f"Too Long {kind} Name",
+            name_column,
+            [f"Length: {length} characters" for length in lengths[too_long]],
+            f"Max {MAX_NAME_LENGTH} characters",
+            message=message,
+            severity="warning",
+        ),
+    ]
+    if not message:
+        shorten = (lengths > RECOMMENDED_SIGNAL_NAME_LENGTH) & (
+            lengths < MAX_NAME_LENGTH
+        )
+        findings.append(
+            _found(
+                columns,
+                rows[shorten],
+                "Signal Name Needs Shortening",
+                name_column,
+                [f"Length: {length} characters" for length in lengths[shorten]],
+                f"Recommended max {RECOMMENDED_SIGNAL_NAME_LENGTH} characters",
+                severity="warning",
+            )
+        )
+    return findings
+
+
+def message_names(columns: MatrixColumns) -> List[pd.DataFrame]:
+    return _name_findings(columns, columns.message_rows, "Msg Name", "Message")
+
+
+def message_types(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.message_rows
+    names = columns.column("Msg Name").iloc[rows].astype(str)
+    types = columns.column("Msg Type").iloc[rows]
+    type_values = types.to_numpy(dtype=object)
+
+    invalid = ~types.isin(MESSAGE_TYPES).to_numpy()
+    diag = (names.str.startswith("Diag") & (types != "Diag")).to_numpy()
+    nm = (names.str.startswith("NM_") & (types != "NM")).to_numpy()
+
+    findings = [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Message Type",
+            "Msg Type",
+            [f"Type: {value}" for value in type_values[invalid]],
+            "Must be Normal, Diag or NM",
+            message=True,
+        )
+    ]
+    for mask, expected in (
+        (diag, "Should be Diag for messages starting with 'Diag'"),
+        (nm, "Should be NM for messages starting with 'NM_'"),
+    ):
+        findings.append(
+            _found(
+                columns,
+                rows[mask],
+                "Message Name-Type Mismatch",
+                "Msg Name",
+                [f"Type: {value}" for value in type_values[mask]],
+                expected,
+                message=True,
+            )
+        )
+    return findings
+
+
+def message_ids(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.message_rows
+    floats, _ = columns.integers("Msg ID")
+    ids = floats[rows]
+    raw = columns.values("Msg ID", rows)
+    types = columns.values("Msg Type", rows)
+
+    def id_text(position):
+        value = ids[position]
+        return hex(int(value)) if not np.isnan(value) else str(raw[position])
+
+    with np.errstate(invalid="ignore"):
+        invalid = ~((ids >= 0x001) & (ids <= 0x7FF))
+        diag = (ids >= 0x700) & (ids <= 0x7FF) & (types != "Diag")
+        nm = (ids >= 0x500) & (ids <= 0x5FF) & (types != "NM")
+
+    findings = [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Message ID",
+            "Msg ID",
+            [f"ID: {id_text(position)}" for position in np.flatnonzero(invalid)],
+            "Must be between 0x001 and 0x7FF",
+            message=True,
+        )
+    ]
+    for mask, expected in (
+        (diag, "IDs 0x700-0x7FF should be Diag type"),
+        (nm, "IDs 0x500-0x5FF should be NM type"),
+    ):
+        findings.append(
+            _found(
+                columns,
+                rows[mask],
+                "Message ID-Type Mismatch",
+                "Msg ID",
+                [
+                    f"ID: {id_text(position)}, Type: {types[position]}"
+                    for position in np.flatnonzero(mask)
+                ],
+                expected,
+                message=True,
+            )
+        )
+    return findings
+
+
+def message_send_types(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.message_rows
+    send_types = columns.column("Send Type").iloc[rows]
+    invalid = ~send_types.isin(MESSAGE_SEND_TYPES).to_numpy()
+    return [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Send Type",
+            "Send Type",
+            [f"Send Type: {value}" for value in send_types[invalid]],
+            "Must be Cycle, Event or CE",
+            message=True,
+        )
+    ]
+
+
+def frame_formats(columns: MatrixColumns) -> List[pd.DataFrame]:
+    if not columns.has_values("Frame Format"):
+        return []
+    rows = columns.message_rows
+    frame_format = columns.column("Frame Format").iloc[rows]
+    invalid = ~frame_format.isin(FRAME_FORMATS).to_numpy()
+    return [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Frame Format",
+            "Frame Format",
+            [f"Frame Format: {value}" for value in frame_format[invalid]],
+            "Must be StandardCAN_FD or StandardCAN",
+            message=True,
+        )
+    ]
+
+
+def brs(columns: MatrixColumns) -> List[pd.DataFrame]:
+    if not columns.has_values("BRS"):
+        return []
+    rows = columns.message_rows
+    brs_values = columns.column("BRS").iloc[rows]
+    frame_format = columns.column("Frame Format").iloc[rows]
+    raw = brs_values.to_numpy(dtype=object)
+    formats = frame_format.to_numpy(dtype=object)
+
+    invalid = ~brs_values.isin([0, 1]).to_numpy()
+    classic = (brs_values.eq(0) & frame_format.ne("StandardCAN")).to_numpy()
+    fd = (brs_values.eq(1) & frame_format.ne("StandardCAN_FD")).to_numpy()
+
+    findings = [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid BRS Value",
+            "BRS",
+            [f"BRS: {value}" for value in raw[invalid]],
+            "Must be 0 or 1",
+            message=True,
+        )
+    ]
+    for mask, expected in (
+        (classic, "BRS=0 should be with StandardCAN"),
+        (fd, "BRS=1 should be with StandardCAN_FD"),
+    ):
+        findings.append(
+            _found(
+                columns,
+                rows[mask],
+                "BRS-Frame Format Mismatch",
+                "Frame Format",
+                [
+                    f"BRS: {value}, Frame Format: {ff}"
+                    for value, ff in zip(raw[mask], formats[mask])
+                ],
+                expected,
+                message=True,
+            )
+        )
+    return findings
+
+
+def message_lengths(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.message_rows
+    lengths = columns.column("Msg Length").iloc[rows]
+    raw = lengths.to_numpy(dtype=object)
+
+    if not columns.has_values("Frame Format"):
+        invalid = lengths.ne(8).to_numpy()
+        return [
+            _found(
+                columns,
+                rows[invalid],
+                "Invalid Message Length",
+                "Msg Length",
+                [f"Length: {value}" for value in raw[invalid]],
+                "For CAN length must be 8",
+                message=True,
+            )
+        ]
+
+    frame_format = columns.column("Frame Format").iloc[rows]
+    formats = frame_format.to_numpy(dtype=object)
+    is_fd = frame_format.eq("StandardCAN_FD").to_numpy()
+    is_classic = frame_format.eq("StandardCAN").to_numpy()
+    invalid_fd = is_fd & ~lengths.isin([8, 64]).to_numpy()
+    invalid_classic = is_classic & lengths.ne(8).to_numpy()
+    unknown = ~(is_fd | is_classic)
+
+    findings = []
+    for mask, expected in (
+        (invalid_fd, "For StandardCAN_FD length must be 8 or 64"),
+        (invalid_classic, "For StandardCAN length must be 8"),
+        (unknown, "Frame Format must be StandardCAN_FD or StandardCAN"),
+    ):
+        findings.append(
+            _found(
+                columns,
+                rows[mask],
+                "Invalid Message Length",
+                "Msg Length",
+                [
+                    f"Length: {value}, Frame Format: {ff}"
+                    for value, ff in zip(raw[mask], formats[mask])
+                ],
+                expected,
+                message=True,
+            )
+        )
+    return findings
+
+
+def signal_names(columns: MatrixColumns) -> List[pd.DataFrame]:
+    return _name_findings(columns, columns.signal_rows, "Sig Name", "Signal")
+
+
+def _value_description_problem(value) -> Optional[str]:
+    """'chars' or 'format' for an invalid value description, None when valid"""
+    text = str(value).strip()
+    parts = VALUE_DESCRIPTION_KEYS.split(text)
+    for position in range(0, len(parts), 2):
+        part = parts[position]
+        if part.strip() and not VALUE_DESCRIPTION_CHARS.match(part):
+            return "chars"
+    if not VALUE_DESCRIPTION_PATTERN.fullmatch(text):
+        return "format"
+    return None
+
+
+def value_descriptions(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    descriptions = columns.column("Signal Value Description")
+    problems = _map_distinct(descriptions, _value_description_problem)[rows]
+    missing = descriptions.iloc[rows].isna().to_numpy()
+    texts = descriptions.iloc[rows].to_numpy(dtype=object)
+
+    findings = [
+        _found(
+            columns,
+            rows[missing],
+            "Missing Signal Value Description",
+            "Signal Value Description",
+            "Value is empty",
+            "Signal value description is required",
+        )
+    ]
+    for problem, error_type, expected in (
+        (
+            "chars",
+            "Invalid Characters in Signal Value Description",
+            "Only A-Z, a-z, 0-9, spaces and ,.:+_/-<>%()~& allowed",
+        ),
+        (
+            "format",
+            "Invalid Signal Value Description",
+            "Must match pattern like '0x0: No Error' or '0x0~0x3: Reserved'",
+        ),
+    ):
+        mask = problems == problem
+        findings.append(
+            _found(
+                columns,
+                rows[mask],
+                error_type,
+                "Signal Value Description",
+                [f"Value: {str(text).strip()}" for text in texts[mask]],
+                expected,
+            )
+        )
+    return findings
+
+
+def signal_descriptions(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    descriptions = columns.column("Description")
+    # Empty descriptions are allowed
+    invalid = _map_distinct(
+        descriptions, lambda value: not DESCRIPTION_PATTERN.fullmatch(str(value))
+    )[rows].astype(bool)
+    texts = descriptions.iloc[rows].to_numpy(dtype=object)
+    return [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Signal Description",
+            "Description",
+            [f"Value: {text}" for text in texts[invalid]],
+            "Contains invalid characters",
+        )
+    ]
+
+
+def byte_orders(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    byte_order = columns.column("Byte Order").iloc[rows]
+    invalid = byte_order.ne("Motorola MSB").to_numpy()
+    return [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Byte Order",
+            "Byte Order",
+            [f"Byte Order: {value}" for value in byte_order[invalid]],
+            "Must be 'Motorola MSB'",
+        )
+    ]
+
+
+def _out_of_range(
+    columns: MatrixColumns, name: str, rows: np.ndarray, stop: int
+) -> np.ndarray:
+    """value not in range(0, stop)"""
+    values = columns.numbers(name)[rows]
+    with np.errstate(invalid="ignore"):
+        inside = (values >= 0) & (values < stop) & (values == np.floor(values))
+    return ~inside
+
+
+def start_bytes(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    invalid = _out_of_range(columns, "Start Byte", rows, 8)
+    return [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Start Byte",
+            "Start Byte",
+            [
+                f"Start Byte: {value}"
+                for value in columns.values("Start Byte", rows[invalid])
+            ],
+            "Must be between 0 and 7",
+        )
+    ]
+
+
+def start_bits(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    invalid = _out_of_range(columns, "Start Bit", rows, 64)
+    return [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Start Bit",
+            "Start Bit",
+            [
+                f"Start Bit: {value}"
+                for value in columns.values("Start Bit", rows[invalid])
+            ],
+            "Must be between 0 and 63",
+        )
+    ]
+
+
+def signal_send_types(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    message_types = columns.column("Send Type").iloc[rows]
+    signal_types = columns.column("Signal Send Type").iloc[rows]
+    allowed_pairs = pd.MultiIndex.from_tuples(
+        [
+            (message_type, signal_type)
+            for message_type, allowed in SIGNAL_SEND_TYPES.items()
+            for signal_type in allowed
+        ]
+    )
+    checked = message_types.isin(list(SIGNAL_SEND_TYPES)).to_numpy()
+    allowed = pd.MultiIndex.from_arrays([message_types, signal_types]).isin(
+        allowed_pairs
+    )
+    invalid = checked & ~allowed
+
+    message_values = message_types.to_numpy(dtype=object)[invalid]
+    signal_values = signal_types.to_numpy(dtype=object)[invalid]
+    return [
+        _found(
+            columns,
+            rows[invalid],
+            "Invalid Signal Send Type",
+            "Signal Send Type",
+            [
+                f"Signal Type: {signal_type}, Message Type: {message_type}"
+                for signal_type, message_type in zip(signal_values, message_values)
+            ],
+            [
+                f"Allowed types: {', '.join(SIGNAL_SEND_TYPES[message_type])}"
+                for message_type in message_values
+            ],
+        )
+    ]
+
+
+def _number_findings(
+    columns: MatrixColumns, name: str, column: str
+) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    missing = columns.column(column).iloc[rows].isna().to_numpy()
+    invalid_type = ~missing & ~columns.number_types(column, rows)
+    values = columns.values(column, rows[invalid_type])
+    return [
+        _found(
+            columns,
+            rows[missing],
+            f"Missing {name}",
+            column,
+            "Value is empty",
+            f"{name} is required",
+        ),
+        _found(
+            columns,
+            rows[invalid_type],
+            f"Invalid {name} Type",
+            column,
+            [f"Type: {type(value).__name__}, Value: {value}" for value in values],
+            "Must be int or float",
+        ),
+    ]
+
+
+def resolutions(columns: MatrixColumns) -> List[pd.DataFrame]:
+    return _number_findings(columns, "Resolution", "Resolution")
+
+
+def offsets(columns: MatrixColumns) -> List[pd.DataFrame]:
+    return _number_findings(columns, "Offset", "Offset")
+
+
+def _physical_value(phys, hex_value, resolution, offset) -> Tuple[bool, str]:
+    """(valid, details) of Physical = Hex * Resolution + Offset for one signal"""
+    try:
+        hex_int = parse_int(hex_value) if isinstance(hex_value, str) else hex_value
+        calculated = int(hex_int) * resolution + offset
+        if math.isclose(calculated, phys, rel_tol=1e-9):
+            return True, ""
+        return False, f"{calculated}"
+    except (ValueError, TypeError) as e:
+        return False, f"Error: {str(e)}"
+
+
+def _physical_findings(
+    columns: MatrixColumns,
+    phys_column: str,
+    hex_column: str,
+    label: str,
+    tolerance: float = 0.0,
+) -> List[pd.DataFrame]:
+    """Rows where the physical value is not Hex * Resolution + Offset"""
+    rows = columns.signal_rows
+    phys = columns.numbers(phys_column)[rows]
+    resolution = columns.numbers("Resolution")[rows]
+    offset = columns.numbers("Offset")[rows]
+    hex_floats, hex_errors = columns.integers(hex_column)
+    hex_values = np.trunc(hex_floats[rows])
+
+    raw = {
+        name: columns.values(name, rows)
+        for name in (phys_column, hex_column, "Resolution", "Offset")
+    }
+    checked = ~(
+        pd.isna(raw[phys_column])
+        | pd.isna(raw[hex_column])
+        | pd.isna(raw["Resolution"])
+    )
+    calculated = hex_values * resolution + offset
+    with np.errstate(invalid="ignore"):
+        valid = _isclose(calculated, phys)
+        if tolerance:
+            valid |= ~(np.abs(calculated - phys) >= tolerance)
+    numeric = (
+        columns.number_types(phys_column, rows)
+        & columns.number_types("Resolution", rows)
+        & columns.number_types("Offset", rows)
+        & (hex_errors[rows] == None)  # noqa: E711
+    )
+
+    # Anything the arrays cannot settle is checked value by value
+    calculation, calculation_details = [], []
+    parse_errors, parse_details = [], []
+    for position in np.flatnonzero(checked & ~(valid & numeric)):
+        values = [
+            raw[name][position]
+            for name in (phys_column, hex_column, "Resolution", "Offset")
+        ]
+        ok, details = _physical_value(*values)
+        if ok:
+            continue
+        phys_value, hex_value = values[0], values[1]
+        if details.startswith("Error: "):
+            parse_errors.append(position)
+            parse_details.append(f"{label} (Hex): {hex_value}, {details}")
+            continue
+        if tolerance and not abs(float(details) - phys_value) >= tolerance:
+            continue
+        calculation.append(position)
+        calculation_details.append(
+            f"{label} (Physical): {phys_value}, {label} (Hex): {hex_value}, "
+            f"Calculated: {details}"
+        )
+
+    name = "Minimum" if label == "Min" else "Maximum"
+    return [
+        _found(
+            columns,
+            rows[np.array(calculation, dtype=int)],
+            f"Invalid {name} Value Calculation",
+            phys_column,
+            calculation_details,
+            "Physical should equal (Hex * Resolution) + Offset",
+        ),
+        _found(
+            columns,
+            rows[np.array(parse_errors, dtype=int)],
+            f"Invalid {name} Value Format",
+            phys_column,
+            parse_details,
+            "Hex value should be convertible to integer",
+        ),
+    ]
+
+
+def minimums(columns: MatrixColumns) -> List[pd.DataFrame]:
+    return _physical_findings(columns, "Min", "Min Hex", "Min")
+
+
+def _last_described_value(value) -> Optional[int]:
+    """Raw value of the last line of a value description, None if unreadable"""
+    key = str(value).strip().split("\n")[-1].split(":")[0].split("~")[-1]
+    try:
+        return int(key, 16)
+    except ValueError:
+        return None
+
+
+def maximums(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    hex_column = "Max Hex" if "Max Hex" in columns.signals.columns else "Invalid"
+
+    described = _map_distinct(
+        columns.column("Signal Value Description"), _last_described_value
+    )[rows]
+    described_values = np.array(
+        [np.nan if value is None else value for value in described], dtype=float
+    )
+    with np.errstate(invalid="ignore"):
+        below = columns.numbers("Max")[rows] < described_values
+    max_values = columns.values("Max", rows[below])
+    hex_values = columns.values(hex_column, rows[below])
+    findings = [
+        _found(
+            columns,
+            rows[below],
+            "Phys/Hex max value greater than max signal value description",
+            "Max",
+            [
+                f"Max (Physical): {max_value}, Max (Hex): {hex_value}, "
+                f"Signal Value Description: {number}"
+                for max_value, hex_value, number in zip(
+                    max_values, hex_values, described[below]
+                )
+            ],
+            "The maximum Phys/Hex value must be greater than or equal to the "
+            "last value in the signal value description.",
+        )
+    ]
+    # Rounded maximums (e.g. 0xFE * 0.1 written as 25) are accepted
+    return findings + _physical_findings(columns, "Max", hex_column, "Max", tolerance=1)
+
+
+def bit_lengths(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.signal_rows
+    lengths = pd.to_numeric(columns.column("Length"), errors="coerce").to_numpy(
+        dtype=float
+    )[rows]
+    with np.errstate(over="ignore", invalid="ignore"):
+        allowed = np.ldexp(1.0, np.nan_to_num(lengths).astype(int)) - 1
+
+    findings = []
+    for label, error_type, column, values in (
+        (
+            "Max Value",
+            "Max value exceeding bit length limits",
+            "Max",
+            columns.numbers("Max")[rows],
+        ),
+        (
+            "Initinal Value",
+            "Initinal value exceeding bit length limits",
+            "Initinal",
+            columns.integers("Initinal")[0][rows],
+        ),
+        (
+            "Invalid Value",
+            "Invalid value exceeding bit length limits",
+            "Invalid",
+            columns.integers("Invalid")[0][rows],
+        ),
+    ):
+        with np.errstate(invalid="ignore"):
+            exceeding = ~np.isnan(lengths) & (values > allowed)
+        raw = columns.values(column, rows[exceeding])
+        details = []
+        for value, length in zip(raw, lengths[exceeding]):
+            if column != "Max":
+                value = parse_int(value)
+            length = int(length)
+            details.append(
+                f"{label}: {value}, Bit Length: {length}, "
+                f"Max Allowed: {(1 << length) - 1}"
+            )
+        findings.append(
+            _found(
+                columns,
+                rows[exceeding],
+                error_type,
+                column,
+                details,
+                BIT_LENGTH_EXPECTED,
+            )
+        )
+    return findings
+
+
+def cycle_times(columns: MatrixColumns) -> List[pd.DataFrame]:
+    rows = columns.message_rows
+    send_types = columns.column("Send Type").iloc[rows]
+    cycle = columns.column("Cycle Type").iloc[rows]
+    raw = cycle.to_numpy(dtype=object)
+    numbers = columns.numbers("Cycle Type")[rows]
+    cyclic = send_types.isin(CYCLIC_SEND_TYPES).to_numpy()
+    event = send_types.isin(EVENT_SEND_TYPES).to_numpy()
+    missing = cycle.isna().to_numpy()
+    with np.errstate(invalid="ignore"):
+        invalid = ~missing & ~(numbers >= 0)
+    send_values = send_types.to_numpy(dtype=object)
+
+    findings = []
+    for mask, error_type, expected in (
+        (
+            cyclic & missing,
+            "Missing Cycle Time",
+            "Cycle time is required for Cycle, CE and CA messages",
+        ),
+        (
+            cyclic & invalid,
+            "Invalid Cycle Time",
+            "Cycle time must be a non-negative number",
+        ),
+        (
+            event & ~missing,
+            "Unexpected Cycle Time",
+            "Event and IfActive messages must not have a cycle time",
+        ),
+    ):
+        findings.append(
+            _found(
+                columns,
+                rows[mask],
+                error_type,
+                "Cycle Type",
+                [
+                    f"Send Type: {send_type}, Cycle Time: {value}"
+                    for send_type, value in zip(send_values[mask], raw[mask])
+                ],
+                expected,
+                message=True,
+            )
+        )
+    return findings
+
+
+def signal_layout(columns: MatrixColumns) -> List[pd.DataFrame]:
+    overlaps = columns.layout.overlaps
+    others = columns.values("Sig Name", overlaps["Other Signal"].to_numpy(dtype=int))
+    outside = columns.layout.outside
+    outside_rows = outside["Signal"].to_numpy(dtype=int)
+    return [
+        _found(
+            columns,
+            overlaps["Signal"].to_numpy(dtype=int),
+            "Overlapping Signals",
+            "Start Bit",
+            [
+                f"Overlaps {other} in bits {bits}"
+                for other, bits in zip(others, overlaps["Bits"])
+            ],
+            "Signals of a message must not share bits",
+        ),
+        _found(
+            columns,
+            outside_rows,
+            "Signal Outside Message",
+            "Start Bit",
+            [
+                f"Bits {bits} outside the {length:g} byte message"
+                for bits, length in zip(
+                    outside["Bits"], columns.numbers("Msg Length")[outside_rows]
+                )
+            ],
+            "All bits of a signal must lie within Msg Length",
+        ),
+    ]
+
+
+def signal_gaps(columns: MatrixColumns) -> List[pd.DataFrame]:
+    gaps = columns.layout.gaps
+    last_rows = dict(
+        zip(columns.values("Msg Name", columns.message_rows), columns.message_rows)
+    )
+    rows = np.array([last_rows[name] for name in gaps["Message"]], dtype=int)
+    return [
+        _found(
+            columns,
+            rows,
+            "Unused Message Bits",
+            "Msg Length",
+            [
+                f"Unused bits: {bits} ({count} of {length:g})"
+                for bits, count, length in zip(
+                    gaps["Unused Bits"],
+                    gaps["Count"],
+                    columns.numbers("Msg Length")[rows] * 8,
+                )
+            ],
+            "Informational: bits of the frame no signal occupies",
+            message=True,
+            severity="warning",
+        )
+    ]
+
+
+# Rule key -> rule, in the order the validator shows them
+RULES: Dict[str, Callable[[MatrixColumns], List[pd.DataFrame]]] = {
+    "message_names": message_names,
+    "message_types": message_types,
+    "message_ids": message_ids,
+    "message_send_types": message_send_types,
+    "frame_formats": frame_formats,
+    "brs": brs,
+    "message_lengths": message_lengths,
+    "signal_names": signal_names,
+    "value_descriptions": value_descriptions,
+    "signal_descriptions": signal_descriptions,
+    "byte_orders": byte_orders,
+    "start_bytes": start_bytes,
+    "start_bits": start_bits,
+    "signal_send_types": signal_send_types,
+    "resolutions": resolutions,
+    "offsets": offsets,
+    "minimums": minimums,
+    "maximums": maximums,
+    "bit_lengths": bit_lengths,
+    "signal_layout": signal_layout,
+    "cycle_times": cycle_times,
+    "signal_gaps": signal_gaps,
+}
+# The cycle time check is not part of the validation yet, unused bits are
+# only shown on request
+DEFAULT_RULES = tuple(
+    rule for rule in RULES if rule not in ("cycle_times", "signal_gaps")
+)
+
+
+def _columns(signals: Union[pd.DataFrame, MatrixColumns]) -> MatrixColumns:
+    if isinstance(signals, MatrixColumns):
+        return signals
+    return MatrixColumns(signals)
+
+
+def check(signals: Union[pd.DataFrame, MatrixColumns], rule: str) -> pd.DataFrame:
+    """Error table of one rule"""
+    findings = [frame for frame in RULES[rule](_columns(signals)) if not frame.empty]
+    if not findings:
+        return pd.DataFrame(columns=ERROR_COLUMNS)
+    errors = pd.concat(findings, ignore_index=True)
+    errors.insert(0, "Rule", rule)
+    return errors
+
+
+def validate(
+    signals: Union[pd.DataFrame, MatrixColumns],
+    rules: Iterable[str] = DEFAULT_RULES,
+) -> pd.DataFrame:
+    """Error table of all rules, the signal table is parsed once"""
+    columns = _columns(signals)
+    errors = [check(columns, rule) for rule in rules]
+    errors = [frame for frame in errors if not frame.empty]
+    if not errors:
+        return pd.DataFrame(columns=ERROR_COLUMNS)
+    return pd.concat(errors, ignore_index=True)
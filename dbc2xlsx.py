@@ -1,303 +1,428 @@
 import cantools
 import cantools.database
+import numpy as np
 import pandas as pd
 import traceback
 import argparse
 import pprint
 import os
-from openpyxl import load_workbook
-from typing import List, Dict
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import Cell, WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, Side
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 from collections import OrderedDict
+from can_matrix import SIGNAL_SEND_TYPES, CanMatrix
+from matrix_cache import matrix_cache
 
+# Columns of the sheet when there is no test.xlsx template
+DEFAULT_COLUMNS = [
+    "Message Name",
+    "Message Type",
+    "Message ID",
+    "Send Type",
+    "Cycle Time",
+    "Protocol",
+    "CAN FD",
+    "Message Length",
+    "Signal Name",
+    "Signal Description",
+    "Byte Order",
+    "Start Byte",
+    "Start Bit",
+    "Send Type",
+    "Bit Length",
+    "Data Type",
+    "Resolution",
+    "Offset",
+    "Min Value",
+    "Max Value",
+    "Min Raw",
+    "Max Raw",
+    "Initial Value",
+    "Invalid Value",
+    "Error Value",
+    "Unit",
+    "Value Description",
+    "GenMsgCycleTimeFast",
+    "GenMsgNrOfRepetition",
+    "GenMsgDelayTime",
+]
 
-class DbcRead:
-    def __init__(self, dbc_path: str):
-        self.dbc_path = dbc_path
+HEADER_STYLE = "Matrix Header"
+
+
+def header_style() -> NamedStyle:
+    """Bold, centered and framed header cells, as pandas.to_excel wrote them"""
+    thin = Side(style="thin")
+    return NamedStyle(
+        name=HEADER_STYLE,
+        font=Font(bold=True),
+        border=Border(left=thin, right=thin, top=thin, bottom=thin),
+        alignment=Alignment(horizontal="center", vertical="top"),
+    )
+
+
+# Typed columns of DbcTables, one preallocated array each
+MESSAGE_FIELDS = {
+    "Name": object,
+    "Frame ID": np.int64,
+    "Length": np.int64,
+    "Cycle Time": np.float64,
+    "Send Type": object,
+    "Protocol": object,
+    "Senders": object,
+    "Cycle Time Fast": np.float64,
+    "Nr Of Repetition": np.float64,
+    "Delay Time": np.float64,
+    "Signals": np.int64,
+}
+SIGNAL_FIELDS = {
+    "Message": np.int64,
+    "Name": object,
+    "Start Bit": np.int64,
+    "Length": np.int64,
+    "Big Endian": np.bool_,
+    "Is Signed": np.bool_,
+    "Send Type": np.int64,
+    "Scale": np.float64,
+    "Offset": np.float64,
+    "Minimum": np.float64,
+    "Maximum": np.float64,
+    "Initial": object,  # raw hex text, 64-bit values do not fit a float
+    "Invalid": object,
+    "Unit": object,
+    "Comment": object,
+    "Value Description": object,
+}
+
+
+class DbcTables(NamedTuple):
+    """Flat tables of a DBC, one typed column per field.
+
+    messages:  one row per message, "Signals" is its number of signals
+    signals:   one row per signal in message order, "Message" is the row of
+               its message and "Send Type" the GenSigSendType (-1 if unset)
+    nodes:     ECU names
+    senders:   bool matrix, messages x nodes
+    receivers: bool matrix, signals x nodes
+    """
+
+    messages: pd.DataFrame
+    signals: pd.DataFrame
+    nodes: List[str]
+    senders: np.ndarray
+    receivers: np.ndarray
 
-    def CreateDB(self):
-        db = cantools.database.load_file(self.dbc_path)
+    def signal_records(self) -> np.recarray:
+        """The typed (non-object) signal columns as a NumPy structured array"""
+        return self.signals.select_dtypes(exclude="object").to_records(index=False)
 
-        result = {}
 
-        for message in db.messages:
-            message_attr = message.dbc.attributes
-            gen_msg_cycle_time_fast = (
-                message_attr.get("GenMsgCycleTimeFast").value
-                if message_attr.get("GenMsgCycleTimeFast")
-                else None
+def format_value_description(choices) -> str:
+    if not choices:
+        return ""
+
+    if isinstance(choices, (dict, OrderedDict)):
+        lines = []
+        for value, desc in choices.items():
+            hex_value = f"0x{int(value):X}"
+            lines.append(f"{hex_value}: {desc}")
+        return "\n".join(lines)
+    return str(choices)
+
+
+def extract_tables(db: cantools.database.Database) -> DbcTables:
+    """Messages and signals of a cantools database, written straight into
+    preallocated column arrays"""
+    nodes = [node.name for node in db.nodes]
+    node_index = {name: i for i, name in enumerate(nodes)}
+    n_messages = len(db.messages)
+    n_signals = sum(len(message.signals) for message in db.messages)
+
+    msg = {name: np.empty(n_messages, dtype) for name, dtype in MESSAGE_FIELDS.items()}
+    sig = {name: np.empty(n_signals, dtype) for name, dtype in SIGNAL_FIELDS.items()}
+    senders = np.zeros((n_messages, len(nodes)), dtype=bool)
+    receivers = np.zeros((n_signals, len(nodes)), dtype=bool)
+
+    def attribute(attributes, name) -> float:
+        value = attributes.get(name)
+        return np.nan if value is None or value.value is None else value.value
+
+    def raw_hex(value) -> Optional[str]:
+        return f"0x{int(value):X}" if value is not None else None
+
+    row = 0
+    for i, message in enumerate(db.messages):
+        attributes = message.dbc.attributes if message.dbc else {}
+        msg["Name"][i] = message.name
+        msg["Frame ID"][i] = message.frame_id
+        msg["Length"][i] = message.length
+        msg["Cycle Time"][i] = (
+            message.cycle_time if message.cycle_time is not None else np.nan
+        )
+        msg["Send Type"][i] = message.send_type
+        msg["Protocol"][i] = message.protocol
+        msg["Senders"][i] = ",".join(message.senders)
+        msg["Cycle Time Fast"][i] = attribute(attributes, "GenMsgCycleTimeFast")
+        msg["Nr Of Repetition"][i] = attribute(attributes, "GenMsgNrOfRepetition")
+        msg["Delay Time"][i] = attribute(attributes, "GenMsgDelayTime")
+        msg["Signals"][i] = len(message.signals)
+        for node in message.senders:
+            if node in node_index:
+                senders[i, node_index[node]] = True
+
+        for signal in message.signals:
+            conversion = signal.conversion
+            send_type = (signal.dbc.attributes if signal.dbc else {}).get(
+                "GenSigSendType"
             )
-            gen_msg_nr_rep = (
-                message_attr.get("GenMsgNrOfRepetition").value
-                if message_attr.get("GenMsgNrOfRepetition")
-                else None
+            sig["Message"][row] = i
+            sig["Name"][row] = signal.name
+            sig["Start Bit"][row] = signal.start
+            sig["Length"][row] = signal.length
+            sig["Big Endian"][row] = signal.byte_order == "big_endian"
+            sig["Is Signed"][row] = signal.is_signed
+            sig["Send Type"][row] = (
+                send_type.value
+                if isinstance(getattr(send_type, "value", None), int)
+                else -1
             )
-            gen_msg_delay = (
-                message_attr.get("GenMsgDelayTime").value
-                if message_attr.get("GenMsgDelayTime")
-                else None
+            sig["Scale"][row] = conversion.scale
+            sig["Offset"][row] = conversion.offset
+            sig["Minimum"][row] = (
+                signal.minimum if signal.minimum is not None else np.nan
             )
-            result[message.name] = {
-                "Msg_id": message.frame_id,
-                "Msg_length": message.length,
-                "Bus_name": message.bus_name,
-                "Msg_comment": message.comment,
-                "Cycle_time": message.cycle_time,
-                "Byte_order": message.header_byte_order,
-                "If_fd": message.is_fd,
-                "Protocol": message.protocol,
-                "Send_type": message.send_type,
-                "Senders": message.senders,
-                "Recievers": message.receivers,
-                "GenMsgCycleTimeFast": gen_msg_cycle_time_fast,
-                "GenMsgNrOfRepetition": gen_msg_nr_rep,
-                "GenMsgDelayTime": gen_msg_delay,
-                "Signals": [],
-            }
-
-            for signal in message.signals:
-                signal_data = {
-                    "Sgn_name": signal.name,
-                    "Start_bit": signal.start,
-                    "Sgn_lenght": signal.length,
-                    "Byte_oreder": signal.byte_order,
-                    "Sgn_Send_Type": signal.dbc.attributes["GenSigSendType"],
-                    "Is_signed": signal.is_signed,
-                    "Initinal": signal.raw_initial,
-                    "Invalid": signal.raw_invalid,
-                    "Factor": signal.conversion.scale,
-                    "Offset": signal.conversion.offset,
-                    "Is_float": signal.conversion.is_float,
-                    "Minimum": signal.minimum,
-                    "Maximum": signal.maximum,
-                    "Unit": signal.unit,
-                    "Comment": signal.comment,
-                    "Receivers": signal.receivers,
-                    "Value_description": signal.choices,
-                }
-                result[message.name]["Signals"].append(signal_data)
-        bus_users = db.nodes
+            sig["Maximum"][row] = (
+                signal.maximum if signal.maximum is not None else np.nan
+            )
+            sig["Initial"][row] = raw_hex(signal.raw_initial)
+            sig["Invalid"][row] = raw_hex(signal.raw_invalid)
+            sig["Unit"][row] = signal.unit
+            sig["Comment"][row] = signal.comment
+            sig["Value Description"][row] = format_value_description(signal.choices)
+            for node in signal.receivers:
+                if node in node_index:
+                    receivers[row, node_index[node]] = True
+            row += 1
+
+    return DbcTables(pd.DataFrame(msg), pd.DataFrame(sig), nodes, senders, receivers)
 
-        return result, bus_users
 
-    def _format_value_description(self, choices):
-        if not choices or choices == None:
-            return ""
+def _cells(values: pd.Series) -> np.ndarray:
+    """Column values for the sheet, missing ones as empty cells"""
+    cells = values.to_numpy(dtype=object)
+    cells[values.isna().to_numpy()] = None
+    return cells
 
-        if isinstance(choices, (dict, OrderedDict)):
-            lines = []
-            for value, desc in choices.items():
-                hex_value = f"0x{int(value):X}"
-                lines.append(f"{hex_value}: {desc}")
-            return "\n".join(lines)
-        return str(choices)
 
-    def copy_format(self, source_path: str, target_path: str) -> None:
-        """Copy styles from source.xlsx in target.xlsx."""
+def _raw_hex(values: pd.Series, scale: pd.Series, offset: pd.Series) -> List:
+    """Bus value of physical values as hex text, "0x0" for a zero factor"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        raw = np.trunc((values - offset) / scale).to_numpy()
+    return [
+        "0x0" if factor == 0 else None if np.isnan(value) else f"0x{int(value):X}"
+        for value, factor in zip(raw, scale.to_numpy())
+    ]
+
+
+class DbcRead:
+    def __init__(self, dbc_path: str):
+        self.dbc_path = dbc_path
+
+    def tables(self) -> DbcTables:
+        return extract_tables(matrix_cache.dbc(self.dbc_path))
+
+    def to_can_matrix(self) -> CanMatrix:
+        return CanMatrix.from_dbc(matrix_cache.dbc(self.dbc_path))
+
+    def read_template(
+        self, template_path: str
+    ) -> Tuple[str, List[str], Dict[int, Dict[int, str]]]:
+        """Sheet name, header and number formats of test.xlsx in one read-only
+        pass. Formats are keyed by row, then column (both 1-based), "General"
+        cells are left out."""
+        wb = load_workbook(template_path, read_only=True)
         try:
-            source_wb = load_workbook(source_path)
-            target_wb = load_workbook(target_path)
+            ws = wb[wb.sheetnames[0]]
+            columns = []
+            number_formats = {}
+            for row_idx, row in enumerate(ws.iter_rows(), start=1):
+                if row_idx == 1:
+                    # Rows are padded to the widest row, drop the empty tail
+                    header = [cell.value for cell in row]
+                    while header and header[-1] is None:
+                        header.pop()
+                    columns = ["" if name is None else str(name) for name in header]
+                formats = {
+                    col_idx: cell.number_format
+                    for col_idx, cell in enumerate(row, start=1)
+                    if cell.number_format not in (None, "General")
+                }
+                if formats:
+                    number_formats[row_idx] = formats
+            return ws.title, columns, number_formats
+        finally:
+            wb.close()
 
-            source_sheet_name = source_wb.sheetnames[0]
-            target_sheet_name = target_wb.sheetnames[0]
+    def _find_template(self) -> Optional[str]:
+        possible_paths = [
+            "test.xlsx",
+            "pages/test.xlsx",
+            os.path.join(os.path.dirname(__file__), "test.xlsx"),
+            os.path.join(os.path.dirname(__file__), "pages", "test.xlsx"),
+        ]
+        for path in possible_paths:
+            if os.path.exists(path):
+                return path
+        return None
 
-            source_sheet = source_wb[source_sheet_name]
-            target_sheet = target_wb[target_sheet_name]
+    def sheet_rows(self, tables: DbcTables, columns: List[str]) -> np.ndarray:
+        """Message row + signal rows of every message, one object array row
+        per sheet row in column order. The last columns are tables.nodes."""
+        messages, signals = tables.messages, tables.signals
+        owner = signals["Message"].to_numpy()
+        counts = messages["Signals"].to_numpy()
+        msg_rows = np.arange(len(messages)) + np.cumsum(counts) - counts
+        sig_rows = np.arange(len(signals)) + owner + 1
+        grid = np.full((len(messages) + len(signals), len(columns)), None, dtype=object)
 
-            for row in source_sheet.iter_rows():
-                for cell in row:
-                    target_cell = target_sheet[cell.coordinate]
+        names = messages["Name"].astype(str)
+        grid[msg_rows, 0] = messages["Name"].to_numpy()
+        grid[msg_rows, 1] = np.where(
+            names.str.startswith("NM_"),
+            "NM",
+            np.where(names.str.startswith("Diag"), "Diag", "Normal"),
+        )
+        grid[msg_rows, 2] = [f"0x{frame_id:X}" for frame_id in messages["Frame ID"]]
+        grid[msg_rows, 3] = messages["Send Type"].to_numpy()
+        grid[msg_rows, 4] = _cells(messages["Cycle Time"])
+        fd = (messages["Protocol"] != "CAN").to_numpy()
+        grid[msg_rows, 5] = np.where(fd, "StandardCAN_FD", "StandardCAN")
+        grid[msg_rows, 6] = np.where(fd, "1", "0")
+        grid[msg_rows, 7] = messages["Length"].to_numpy()
 
-                    target_cell.number_format = cell.number_format
+        send_types = signals["Send Type"].to_numpy()
+        known = (send_types >= 0) & (send_types < len(SIGNAL_SEND_TYPES))
+        scale, offset = signals["Scale"], signals["Offset"]
+        grid[sig_rows, 8] = signals["Name"].to_numpy()
+        grid[sig_rows, 9] = signals["Comment"].to_numpy()
+        grid[sig_rows, 10] = np.where(signals["Big Endian"], "Motorola MSB", "Intel")
+        grid[sig_rows, 11] = (signals["Start Bit"] // 8).to_numpy()
+        grid[sig_rows, 12] = signals["Start Bit"].to_numpy()
+        grid[sig_rows, 13] = np.where(
+            known, np.array(SIGNAL_SEND_TYPES, dtype=object)[send_types * known], ""
+        )
+        grid[sig_rows, 14] = signals["Length"].to_numpy()
+        grid[sig_rows, 15] = np.where(signals["Is Signed"], "Signed", "Unsigned")
+        grid[sig_rows, 16] = scale.to_numpy(dtype=object)
+        grid[sig_rows, 17] = offset.to_numpy(dtype=object)
+        grid[sig_rows, 18] = _cells(signals["Minimum"])
+        grid[sig_rows, 19] = _cells(signals["Maximum"])
+        grid[sig_rows, 20] = _raw_hex(signals["Minimum"], scale, offset)
+        grid[sig_rows, 21] = _raw_hex(signals["Maximum"], scale, offset)
+        grid[sig_rows, 22] = signals["Initial"].fillna("").to_numpy()
+        grid[sig_rows, 23] = signals["Invalid"].fillna("").to_numpy()
+        grid[sig_rows, 24] = "0x0"
+        grid[sig_rows, 25] = signals["Unit"].to_numpy()
+        grid[sig_rows, 26] = signals["Value Description"].to_numpy()
+        grid[sig_rows, 27] = _cells(messages["Cycle Time Fast"])[owner]
+        grid[sig_rows, 28] = _cells(messages["Nr Of Repetition"])[owner]
+        grid[sig_rows, 29] = _cells(messages["Delay Time"])[owner]
 
-            target_wb.save(target_path)
-            print(f"Formating successfully copy from {source_path} in {target_path}")
-        except Exception as e:
-            print(f"Error durring copy formats: {str(e)}")
+        ecu = slice(len(columns) - len(tables.nodes), len(columns))
+        grid[msg_rows, ecu] = np.where(tables.senders, "S", "R")
+        grid[sig_rows, ecu] = np.where(
+            tables.senders[owner], "S", np.where(tables.receivers, "R", None)
+        )
+        return grid
+
+    def write_xlsx(
+        self,
+        output_path: str,
+        sheet_name: str,
+        columns: List[str],
+        rows: Iterable[List],
+        number_formats: Optional[Dict[int, Dict[int, str]]] = None,
+    ) -> int:
+        """Stream the header and rows into a write-only workbook, one save.
+
+        Cells listed in number_formats get that format, like test.xlsx has it
+        at the same coordinate. Returns the number of rows written."""
+        number_formats = number_formats or {}
+        wb = Workbook(write_only=True)
+        wb.add_named_style(header_style())
+        ws = wb.create_sheet(sheet_name)
 
-    def convert(self, output_path: str = "output.xlsx") -> bool:
-        """Main method convert (message row + signal rows, with style copy)"""
+        def formatted(values: List, formats: Dict[int, str]) -> List:
+            cells = list(values) + [None] * (max(formats) - len(values))
+            for col_idx, number_format in formats.items():
+                cell = cells[col_idx - 1]
+                if not isinstance(cell, Cell):
+                    cell = WriteOnlyCell(ws, value=cell)
+                cell.number_format = number_format
+                cells[col_idx - 1] = cell
+            return cells
+
+        header = []
+        for name in columns:
+            cell = WriteOnlyCell(ws, value=name)
+            cell.style = HEADER_STYLE
+            header.append(cell)
+        ws.append(
+            formatted(header, number_formats[1]) if 1 in number_formats else header
+        )
+
+        row_idx = 1
+        for row_idx, values in enumerate(rows, start=2):
+            formats = number_formats.get(row_idx)
+            ws.append(formatted(values, formats) if formats else values)
+
+        # Formatted template cells below the data keep their format as well
+        for row_idx in range(row_idx + 1, max(number_formats, default=0) + 1):
+            formats = number_formats.get(row_idx)
+            ws.append(formatted([], formats) if formats else [])
+
+        wb.save(output_path)
+        return row_idx - 1
+
+    def convert(
+        self, output_path: str = "output.xlsx", tables: Optional[DbcTables] = None
+    ) -> bool:
+        """Main method convert (message row + signal rows, with the number
+        formats of test.xlsx), written in a single pass. Pass tables when the
+        DBC is already extracted."""
         try:
             print(f"Starting conversion to: {output_path}")
             print(f"Current working directory: {os.getcwd()}")
             print(f"DBC file path: {self.dbc_path}")
             print(f"DBC file exists: {os.path.exists(self.dbc_path)}")
-            lib, ecu = self.CreateDB()
-            ecu_nodes = [node.name for node in ecu]
-
-            test_xlsx_path = None
-            possible_paths = [
-                "test.xlsx",
-                "pages/test.xlsx",
-                os.path.join(os.path.dirname(__file__), "test.xlsx"),
-                os.path.join(os.path.dirname(__file__), "pages", "test.xlsx"),
-            ]
-
-            for path in possible_paths:
-                if os.path.exists(path):
-                    test_xlsx_path = path
-                    break
+            if tables is None:
+                tables = self.tables()
+            ecu_nodes = tables.nodes
 
+            test_xlsx_path = self._find_template()
             if not test_xlsx_path:
                 print("Warning: test.xlsx not found, using default columns")
-                base_columns = [
-                    "Message Name",
-                    "Message Type",
-                    "Message ID",
-                    "Send Type",
-                    "Cycle Time",
-                    "Protocol",
-                    "CAN FD",
-                    "Message Length",
-                    "Signal Name",
-                    "Signal Description",
-                    "Byte Order",
-                    "Start Byte",
-                    "Start Bit",
-                    "Send Type",
-                    "Bit Length",
-                    "Data Type",
-                    "Resolution",
-                    "Offset",
-                    "Min Value",
-                    "Max Value",
-                    "Min Raw",
-                    "Max Raw",
-                    "Initial Value",
-                    "Invalid Value",
-                    "Error Value",
-                    "Unit",
-                    "Value Description",
-                    "GenMsgCycleTimeFast",
-                    "GenMsgNrOfRepetition",
-                    "GenMsgDelayTime",
-                ]
+                base_columns = DEFAULT_COLUMNS
                 test_sheet_name = "Sheet1"
+                number_formats = {}
             else:
-                test_xl = pd.ExcelFile(test_xlsx_path)
-                test_sheet_name = test_xl.sheet_names[0]
-                test_df = pd.read_excel(test_xl, sheet_name=test_sheet_name)
-                base_columns = list(map(str, test_df.columns))
-
-            non_ecu_columns = []
-            for col in base_columns:
-                if col not in ecu_nodes:
-                    non_ecu_columns.append(col)
+                test_sheet_name, base_columns, number_formats = self.read_template(
+                    test_xlsx_path
+                )
+
+            non_ecu_columns = [col for col in base_columns if col not in ecu_nodes]
             columns = non_ecu_columns + ecu_nodes
 
-            rows = []
-            for msg_name, msg_data in lib.items():
-                msg_row = {col: "" for col in columns}
-                msg_row[columns[0]] = msg_name
-                msg_row[columns[1]] = (
-                    "NM"
-                    if str(msg_name).startswith("NM_")
-                    else "Diag" if str(msg_name).startswith("Diag") else "Normal"
-                )
-                msg_row[columns[2]] = f"0x{int(msg_data['Msg_id']):X}"
-                msg_row[columns[3]] = msg_data.get("Send_type", "")
-                msg_row[columns[4]] = msg_data["Cycle_time"]
-                msg_row[columns[5]] = (
-                    "StandardCAN" if msg_data["Protocol"] == "CAN" else "StandardCAN_FD"
-                )
-                msg_row[columns[6]] = (
-                    str(1) if msg_row[columns[5]] == "StandardCAN_FD" else str(0)
-                )
-                msg_row[columns[7]] = msg_data["Msg_length"]
-
-                for ecu_node in ecu_nodes:
-                    if ecu_node in columns:
-                        msg_row[ecu_node] = (
-                            "S" if ecu_node in msg_data["Senders"] else "R"
-                        )
-                rows.append(msg_row)
-
-                for signal in msg_data["Signals"]:
-                    sig_row = {col: "" for col in columns}
-                    sig_row[columns[8]] = signal["Sgn_name"]
-                    sig_row[columns[9]] = signal["Comment"]
-                    sig_row[columns[10]] = (
-                        "Motorola MSB"
-                        if signal["Byte_oreder"] == "big_endian"
-                        else "Intel"
-                    )
-                    sig_row[columns[11]] = signal["Start_bit"] // 8
-                    sig_row[columns[12]] = signal["Start_bit"]
-                    send_map = {
-                        0: "Cyclic",
-                        1: "OnChange",
-                        2: "OnWrite",
-                        3: "IfActive",
-                        4: "OnChangeWithRepetition",
-                        5: "OnWriteWithRepetition",
-                        6: "IfActiveWithRepetition",
-                        7: "NoSigSendType",
-                        8: "OnChangeAndIfActive",
-                        9: "OnChangeAndIfActiveWithRepetition",
-                        10: "CA",
-                        11: "CE",
-                        12: "Event",
-                    }
-                    gen_sig_send_type = (
-                        signal["Sgn_Send_Type"].value
-                        if hasattr(signal["Sgn_Send_Type"], "value")
-                        else None
-                    )
-                    sig_row[columns[13]] = send_map.get(gen_sig_send_type, "")
-                    sig_row[columns[14]] = signal["Sgn_lenght"]
-                    sig_row[columns[15]] = (
-                        "Unsigned" if signal["Is_signed"] == False else "Signed"
-                    )
-                    sig_row[columns[16]] = signal["Factor"]
-                    sig_row[columns[17]] = signal["Offset"]
-                    sig_row[columns[18]] = signal["Minimum"]
-                    sig_row[columns[19]] = signal["Maximum"]
-                    sig_row[columns[20]] = (
-                        f"0x{int((signal['Minimum'] - signal['Offset']) / signal['Factor']):X}"
-                        if signal["Factor"] != 0
-                        else "0x0"
-                    )
-                    sig_row[columns[21]] = (
-                        f"0x{int((signal['Maximum'] - signal['Offset']) / signal['Factor']):X}"
-                        if signal["Factor"] != 0
-                        else "0x0"
-                    )
-                    sig_row[columns[22]] = (
-                        f"0x{int(signal['Initinal']):X}"
-                        if pd.notna(signal["Initinal"])
-                        else ""
-                    )
-                    sig_row[columns[23]] = (
-                        f"0x{int(signal['Invalid']):X}"
-                        if pd.notna(signal["Invalid"])
-                        else ""
-                    )
-                    sig_row[columns[24]] = "0x0"
-                    sig_row[columns[25]] = signal["Unit"]
-
-                    sig_row[columns[26]] = self._format_value_description(
-                        signal["Value_description"]
-                    )
-                    sig_row[columns[27]] = msg_data["GenMsgCycleTimeFast"]
-                    sig_row[columns[28]] = msg_data["GenMsgNrOfRepetition"]
-                    sig_row[columns[29]] = msg_data["GenMsgDelayTime"]
-
-                    for ecu_node in ecu_nodes:
-                        if ecu_node in columns:
-                            if ecu_node in msg_data["Senders"]:
-                                sig_row[ecu_node] = "S"
-                            elif ecu_node in signal["Receivers"]:
-                                sig_row[ecu_node] = "R"
-                            else:
-                                sig_row[ecu_node] = ""
-                    rows.append(sig_row)
-
-            df = pd.DataFrame(rows, columns=columns)
-            df.to_excel(
-                output_path, sheet_name=test_sheet_name, index=False, engine="openpyxl"
+            self.write_xlsx(
+                output_path,
+                test_sheet_name,
+                columns,
+                self.sheet_rows(tables, columns).tolist(),
+                number_formats,
             )
-
             if test_xlsx_path:
-                self.copy_format(test_xlsx_path, output_path)
+                print(f"Formating successfully copy from {test_xlsx_path}")
 
             print(f"Excel file successfully created: {output_path}")
             return True
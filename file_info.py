@@ -0,0 +1,111 @@
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+CAN_PREFIX = "ATOM_CAN_Matrix_"
+CANFD_PREFIX = "ATOM_CANFD_Matrix_"
+LIN_PREFIX = "ATOM_LIN_Matrix_"
+
+
+class MatrixFileInfo(NamedTuple):
+    """Metadata encoded in a matrix file name, e.g.
+    ATOM_CANFD_Matrix_<domain>_V<x.y.z>_<date>[_internal][_<device>].xlsx"""
+
+    version: str
+    date: str
+    device_name: str
+    domain_name: str
+    protocol: str
+
+
+def _parse_can_name(file_name_only: str) -> Optional[MatrixFileInfo]:
+    if file_name_only.startswith(CANFD_PREFIX):
+        protocol = "CANFD"
+        parts = file_name_only[len(CANFD_PREFIX) :].split("_")
+    elif file_name_only.startswith(CAN_PREFIX):
+        protocol = "CAN"
+        parts = file_name_only[len(CAN_PREFIX) :].split("_")
+    else:
+        return None
+
+    domain_name = parts.pop(0)
+    version_string = parts.pop(0)
+    if version_string.startswith("V"):
+        version = version_string[1:]
+        if len(version.split(".")) != 3:
+            return None
+    else:
+        version = ""
+    file_date = parts.pop(0)
+    if len(parts) > 0:
+        if parts[0] == "internal":
+            parts.pop(0)
+        device_name = "_".join(parts)
+    else:
+        device_name = ""
+
+    return MatrixFileInfo(version, file_date, device_name, domain_name, protocol)
+
+
+def _parse_lin_name(file_name_only: str) -> Optional[MatrixFileInfo]:
+    if file_name_only.startswith(CANFD_PREFIX):
+        protocol = "CANFD"
+        remaining = file_name_only[len(CANFD_PREFIX) :]
+    elif file_name_only.startswith(LIN_PREFIX):
+        protocol = "LIN"
+        remaining = file_name_only[len(LIN_PREFIX) :]
+    elif file_name_only.startswith(CAN_PREFIX):
+        protocol = "CAN"
+        remaining = file_name_only[len(CAN_PREFIX) :]
+    else:
+        return None
+
+    parts = remaining.split("_")
+    domain_name = parts.pop(0)
+
+    version_string = parts.pop(0)
+    version = version_string[1:] if version_string.startswith("V") else version_string
+
+    version_parts = version.split(".")
+    if len(version_parts) != 3:
+        return None
+
+    # Some LIN matrices carry the date inside the version: V1.0.0-20250101
+    if "-" in version_parts[2]:
+        version_parts[2], file_date = version_parts[2].split("-")
+    elif parts and re.match(r"^\d{8}$", parts[0]):
+        file_date = parts.pop(0)
+    else:
+        file_date = ""
+
+    device_name = "_".join(parts) if parts else ""
+    if device_name.startswith("internal"):
+        device_name = device_name[8:].lstrip("_")
+
+    return MatrixFileInfo(
+        ".".join(version_parts), file_date, device_name, domain_name, protocol
+    )
+
+
+@lru_cache(maxsize=256)
+def _parse_file_name(file_name: str, lin: bool) -> Optional[MatrixFileInfo]:
+    file_name_only = os.path.splitext(os.path.basename(file_name))[0]
+    if lin:
+        return _parse_lin_name(file_name_only)
+    return _parse_can_name(file_name_only)
+
+
+def parse_file_name(file_name, lin: bool = False) -> Optional[MatrixFileInfo]:
+    """Parse (and cache) matrix metadata from a file name, path or uploaded file.
+
+    lin=True applies the LDF converter rules, which also accept LIN matrices
+    and dates embedded in the version string.
+    """
+    return _parse_file_name(str(getattr(file_name, "name", file_name)), lin)
+
+
+def file_info_dict(file_name, lin: bool = False) -> Optional[dict]:
+    """Same as parse_file_name, returned as a fresh dict for older callers"""
+    info = parse_file_name(file_name, lin)
+    return info._asdict() if info is not None else None
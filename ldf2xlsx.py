@@ -1,13 +1,15 @@
 import canmatrix.formats
+import os
+from itertools import groupby
+from operator import itemgetter
 import pandas as pd
 import argparse
 import pprint
 import re
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
 import openpyxl
 from openpyxl.utils.dataframe import dataframe_to_rows
 from pydantic import BaseModel, FilePath, ValidationError
-from typing import Dict, Union, List
 
 
 MATRIX_COLUMNS = [
@@ -65,7 +67,7 @@ def read_file_ldf(file_path: str) -> pd.DataFrame:
 
         data = {}
 
-        with open(file=validated_path, mode="r+", encoding="utf-8") as file:
+        with open(file=validated_path, mode="r", encoding="utf-8") as file:
             data = file.read()
 
         return data
@@ -78,9 +80,94 @@ def read_file_ldf(file_path: str) -> pd.DataFrame:
         return pd.DataFrame(columns=MATRIX_COLUMNS)
 
 
-def extract_info(data: str) -> Dict[str, Union[str, float]]:
+def iter_section_lines(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """(section, line) for every stripped line of an LDF, in one pass.
+
+    section is the name of the top-level block the line belongs to
+    ("Signals", "Frames", ...) or "" outside of any block. Brace depth is
+    tracked so nested blocks (frames, nodes, encodings) stay in their
+    section; the lines opening and closing a section are not yielded.
+    """
+    section = ""
+    depth = 0
+    for line in lines:
+        line = line.strip()
+        if "{" not in line and "}" not in line:  # most lines
+            yield section, line
+            continue
+
+        change = line.count("{") - line.count("}")
+        if depth == 0 and "{" in line:
+            section = line.split("{")[0].strip()
+            depth = max(change, 0)
+            if depth == 0:  # a block on one line
+                section = ""
+            continue
+
+        depth += change
+        if section and depth <= 0:
+            section = ""
+            depth = 0
+            continue
+        yield section, line
+
+
+def index_sections(data: str) -> Dict[str, List[str]]:
+    """Lines of every top-level section of an LDF, "" for the statements
+    outside of sections"""
+    sections = {}
+    name, lines = None, None
+    for section, line in iter_section_lines(data.split("\n")):
+        if section != name:
+            name, lines = section, sections.setdefault(section, [])
+        lines.append(line)
+    return sections
+
+
+def _read_lines(source) -> Iterator[str]:
+    # A path is opened read-only, file objects and mmaps are read line by line
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, mode="r", encoding="utf-8") as file:
+            yield from file
+        return
+
+    while True:
+        line = source.readline()
+        if not line:
+            return
+        yield line.decode("utf-8") if isinstance(line, bytes) else line
+
+
+def iter_ldf_sections(source) -> Iterator[Tuple[str, Iterator[str]]]:
+    """(section, lines) of an LDF read incrementally from a path, a text or
+    binary file object or an mmap.
+
+    The lines of a section are read while they are consumed, so no more than
+    one line of the file is held in memory; consume them before moving on to
+    the next section (itertools.groupby). Runs of top-level statements come
+    as section "".
+    """
+    for section, group in groupby(
+        iter_section_lines(_read_lines(source)), key=itemgetter(0)
+    ):
+        yield section, (line for _, line in group)
+
+
+# The extractors take the LDF text, its index_sections() or, for a streamed
+# section, {section name: its lines}
+LdfSections = Union[str, Dict[str, Iterable[str]]]
+
+
+def _section(data: LdfSections, name: str) -> Iterable[str]:
+    sections = index_sections(data) if isinstance(data, str) else data
+    return sections.get(name, [])
+
+
+def extract_info(
+    data: LdfSections,
+) -> Dict[str, Union[str, float]]:
     try:
-        lines = data.split("\n")
+        lines = _section(data, "")
         for i, line in enumerate(lines):
             if "LIN_description_file;" in line:
                 info_lines = lines[i + 1 : i + 5]
@@ -99,43 +186,32 @@ def extract_info(data: str) -> Dict[str, Union[str, float]]:
         return {}
 
 
-def extract_nodes(data: str) -> Dict[str, Union[str, float, List[str]]]:
+def extract_nodes(
+    data: LdfSections,
+) -> Dict[str, Union[str, float, List[str]]]:
     try:
-        lines = [line.strip() for line in data.split("\n")]
         nodes_dict = {
             "Master": {"name": "", "parameters": [], "time_units": "ms"},
             "Slaves": [],
         }
 
-        in_nodes_section = False
+        for line in _section(data, "Nodes"):
+            if "Master:" in line:
+                master_parts = line.split("Master:")[1].strip().rstrip(";").split(",")
+                nodes_dict["Master"]["name"] = master_parts[0].strip()
 
-        for line in lines:
-            if "Nodes {" in line:
-                in_nodes_section = True
-                continue
-
-            if in_nodes_section:
-                if "}" in line:
-                    break
-
-                if "Master:" in line:
-                    master_parts = (
-                        line.split("Master:")[1].strip().rstrip(";").split(",")
-                    )
-                    nodes_dict["Master"]["name"] = master_parts[0].strip()
-
-                    for param in master_parts[1:]:
-                        param = param.strip()
-                        if "ms" in param:
-                            value = param.replace("ms", "").strip()
-                            try:
-                                nodes_dict["Master"]["parameters"].append(float(value))
-                            except ValueError:
-                                pass
+                for param in master_parts[1:]:
+                    param = param.strip()
+                    if "ms" in param:
+                        value = param.replace("ms", "").strip()
+                        try:
+                            nodes_dict["Master"]["parameters"].append(float(value))
+                        except ValueError:
+                            pass
 
-                elif "Slaves:" in line:
-                    slaves_part = line.split("Slaves:")[1].strip().rstrip(";")
-                    nodes_dict["Slaves"] = [s.strip() for s in slaves_part.split(",")]
+            elif "Slaves:" in line:
+                slaves_part = line.split("Slaves:")[1].strip().rstrip(";")
+                nodes_dict["Slaves"] = [s.strip() for s in slaves_part.split(",")]
 
         return nodes_dict
 
@@ -147,59 +223,51 @@ def extract_nodes(data: str) -> Dict[str, Union[str, float, List[str]]]:
         }
 
 
-def extract_signals(data: str) -> Dict[str, Dict[str, Union[str, int, List[str]]]]:
+def extract_signals(
+    data: LdfSections,
+) -> Dict[str, Dict[str, Union[str, int, List[str]]]]:
     try:
-        lines = [line.strip() for line in data.split("\n")]
         signals_dict = {}
-        in_signals_section = False
 
-        for line in lines:
-            if "Signals {" in line:
-                in_signals_section = True
+        for line in _section(data, "Signals"):
+            if not line or line.startswith("//"):
                 continue
 
-            if in_signals_section:
-                if "}" in line:
-                    break
+            if "//" in line:
+                signal_part, comment = line.split("//", 1)
+                comment = comment.strip()
+            else:
+                signal_part = line
+                comment = ""
 
-                if not line or line.startswith("//"):
-                    continue
+            signal_part = signal_part.strip().rstrip(";")
 
-                if "//" in line:
-                    signal_part, comment = line.split("//", 1)
-                    comment = comment.strip()
-                else:
-                    signal_part = line
-                    comment = ""
-
-                signal_part = signal_part.strip().rstrip(";")
-
-                parts = [p.strip() for p in signal_part.split(":")]
-                if len(parts) != 2:
-                    continue
-
-                signal_name = parts[0]
-                signal_params = [p.strip() for p in parts[1].split(",")]
+            parts = [p.strip() for p in signal_part.split(":")]
+            if len(parts) != 2:
+                continue
 
-                if len(signal_params) < 4:
-                    continue
+            signal_name = parts[0]
+            signal_params = [p.strip() for p in parts[1].split(",")]
 
-                try:
-                    size = int(signal_params[0])
-                    init_value = int(signal_params[1])
-                    publishers = [signal_params[2]]
-                    subscribers = signal_params[3:]
+            if len(signal_params) < 4:
+                continue
 
-                    signals_dict[signal_name] = {
-                        "size": size,
-                        "init_value": init_value,
-                        "publishers": publishers,
-                        "subscribers": subscribers,
-                        "comment": comment,
-                    }
-                except (ValueError, IndexError) as e:
-                    print(f"Error parsing signal {signal_name}: {e}")
-                    continue
+            try:
+                size = int(signal_params[0])
+                init_value = int(signal_params[1])
+                publishers = [signal_params[2]]
+                subscribers = signal_params[3:]
+
+                signals_dict[signal_name] = {
+                    "size": size,
+                    "init_value": init_value,
+                    "publishers": publishers,
+                    "subscribers": subscribers,
+                    "comment": comment,
+                }
+            except (ValueError, IndexError) as e:
+                print(f"Error parsing signal {signal_name}: {e}")
+                continue
 
         return signals_dict
 
@@ -209,55 +277,49 @@ def extract_signals(data: str) -> Dict[str, Dict[str, Union[str, int, List[str]]
 
 
 def extract_frames(
-    data: str,
+    data: LdfSections,
 ) -> Dict[str, Dict[str, Union[int, str, List[Dict[str, Union[str, int]]]]]]:
     try:
-        lines = [line.strip() for line in data.split("\n")]
         frames_dict = {}
-        in_frames_section = False
         current_frame = None
 
-        for line in lines:
-            if "Frames {" in line:
-                in_frames_section = True
+        for line in _section(data, "Frames"):
+            if not line:
                 continue
 
-            if in_frames_section:
-                if "}" in line:
-                    break
-
-                if not line:
-                    continue
-
-                if ":" in line and "{" in line:
-                    frame_part = line.split("{")[0].strip()
-                    frame_name, frame_params = frame_part.split(":", 1)
-                    frame_name = frame_name.strip()
-
-                    params = [p.strip() for p in frame_params.split(",")]
-                    if len(params) >= 3:
-                        frame_id = int(params[0])
-                        publisher = params[1]
-                        size = int(params[2])
-
-                        frames_dict[frame_name] = {
-                            "frame_id": frame_id,
-                            "publisher": publisher,
-                            "lenght": size,
-                            "signals": [],
-                        }
-                        current_frame = frame_name
-                    continue
-
-                if current_frame and "," in line and ";" in line:
-                    signal_part = line.split(";")[0].strip()
-                    signal_name, start_bit = signal_part.split(",")
-                    signal_name = signal_name.strip()
-                    start_bit = int(start_bit.strip())
-
-                    frames_dict[current_frame]["signals"].append(
-                        {"signal_name": signal_name, "start_bit": start_bit}
-                    )
+            if line == "}":
+                current_frame = None
+                continue
+
+            if ":" in line and "{" in line:
+                frame_part = line.split("{")[0].strip()
+                frame_name, frame_params = frame_part.split(":", 1)
+                frame_name = frame_name.strip()
+
+                params = [p.strip() for p in frame_params.split(",")]
+                if len(params) >= 3:
+                    frame_id = int(params[0])
+                    publisher = params[1]
+                    size = int(params[2])
+
+                    frames_dict[frame_name] = {
+                        "frame_id": frame_id,
+                        "publisher": publisher,
+                        "lenght": size,
+                        "signals": [],
+                    }
+                    current_frame = frame_name
+                continue
+
+            if current_frame and "," in line and ";" in line:
+                signal_part = line.split(";")[0].strip()
+                signal_name, start_bit = signal_part.split(",")
+                signal_name = signal_name.strip()
+                start_bit = int(start_bit.strip())
+
+                frames_dict[current_frame]["signals"].append(
+                    {"signal_name": signal_name, "start_bit": start_bit}
+                )
 
         return frames_dict
 
@@ -267,82 +329,69 @@ def extract_frames(
 
 
 def extract_node_attributes(
-    data: str,
+    data: LdfSections,
 ) -> Dict[str, Dict[str, Union[str, int, float, List[str]]]]:
     try:
-        lines = [line.strip() for line in data.split("\n")]
         node_attrs = {}
-        brace_count = 0
-        in_node_section = False
         in_configurable_frames = False
         current_node = None
 
-        for line in lines:
-            brace_count += line.count("{") - line.count("}")
+        for line in _section(data, "Node_attributes"):
+            if line.endswith("{") and not line.startswith("configurable_frames"):
+                node_name = line.split("{")[0].strip()
+                node_attrs[node_name] = {
+                    "LIN_protocol": "",
+                    "configured_NAD": 0,
+                    "product_id": [0, 0, 0],
+                    "response_error": "",
+                    "P2_min": 0.0,
+                    "ST_min": 0.0,
+                    "N_As_timeout": 0.0,
+                    "N_Cr_timeout": 0.0,
+                    "configurable_frames": [],
+                }
+                current_node = node_name
+                continue
+
+            if not current_node:
+                continue
 
-            if "Node_attributes {" in line:
-                in_node_section = True
+            if "configurable_frames {" in line:
+                in_configurable_frames = True
                 continue
 
-            if in_node_section:
-                if brace_count <= 0 and line.strip() == "}":
-                    break
-
-                if line.endswith("{") and not line.startswith("configurable_frames"):
-                    node_name = line.split("{")[0].strip()
-                    node_attrs[node_name] = {
-                        "LIN_protocol": "",
-                        "configured_NAD": 0,
-                        "product_id": [0, 0, 0],
-                        "response_error": "",
-                        "P2_min": 0.0,
-                        "ST_min": 0.0,
-                        "N_As_timeout": 0.0,
-                        "N_Cr_timeout": 0.0,
-                        "configurable_frames": [],
-                    }
-                    current_node = node_name
-                    continue
-
-                if not current_node:
-                    continue
-
-                if "configurable_frames {" in line:
-                    in_configurable_frames = True
-                    continue
-
-                if in_configurable_frames and line.strip() == "}":
-                    in_configurable_frames = False
-                    continue
-
-                if in_configurable_frames and current_node:
-                    frame = line.strip().rstrip(";").strip()
-                    if frame and frame != "}":
-                        node_attrs[current_node]["configurable_frames"].append(frame)
-                    continue
-
-                if not in_configurable_frames and "=" in line:
-                    attr, value = line.split("=", 1)
-                    attr = attr.strip()
-                    value = value.strip().rstrip(";").strip()
-
-                    if attr == "LIN_protocol":
-                        node_attrs[current_node][attr] = value.strip('"')
-                    elif attr == "configured_NAD":
-                        node_attrs[current_node][attr] = (
-                            int(value, 16) if "0x" in value else int(value)
-                        )
-                    elif attr == "product_id":
-                        ids = [
-                            int(x.strip(), 16) if "0x" in x else int(x.strip())
-                            for x in value.split(",")
-                        ]
-                        node_attrs[current_node][attr] = ids
-                    elif attr in ["P2_min", "ST_min", "N_As_timeout", "N_Cr_timeout"]:
-                        num = float(value.split()[0])
-                        node_attrs[current_node][attr] = num
-                    else:
-                        node_attrs[current_node][attr] = value
+            if in_configurable_frames and line == "}":
+                in_configurable_frames = False
+                continue
+
+            if in_configurable_frames:
+                frame = line.rstrip(";").strip()
+                if frame and frame != "}":
+                    node_attrs[current_node]["configurable_frames"].append(frame)
+                continue
+
+            if "=" in line:
+                attr, value = line.split("=", 1)
+                attr = attr.strip()
+                value = value.strip().rstrip(";").strip()
+
+                if attr == "LIN_protocol":
+                    node_attrs[current_node][attr] = value.strip('"')
+                elif attr == "configured_NAD":
+                    node_attrs[current_node][attr] = (
+                        int(value, 16) if "0x" in value else int(value)
+                    )
+                elif attr == "product_id":
+                    ids = [
+                        int(x.strip(), 16) if "0x" in x else int(x.strip())
+                        for x in value.split(",")
+                    ]
+                    node_attrs[current_node][attr] = ids
+                elif attr in ["P2_min", "ST_min", "N_As_timeout", "N_Cr_timeout"]:
+                    num = float(value.split()[0])
+                    node_attrs[current_node][attr] = num
+                else:
+                    node_attrs[current_node][attr] = value
 
         return node_attrs
 
@@ -351,45 +400,31 @@ def extract_node_attributes(
         return {}
 
 
-from typing import Dict, List, Union
-
-
-def extract_schedule_tables(data: str) -> Dict[str, List[Dict[str, Union[str, int]]]]:
+def extract_schedule_tables(
+    data: LdfSections,
+) -> Dict[str, List[Dict[str, Union[str, int]]]]:
     try:
-        lines = [line.strip() for line in data.split("\n")]
         schedules = {}
-        in_schedule_section = False
         current_schedule = None
-        brace_count = 0
-
-        for line in lines:
-            brace_count += line.count("{") - line.count("}")
 
-            if "Schedule_tables {" in line:
-                in_schedule_section = True
+        for line in _section(data, "Schedule_tables"):
+            if line.endswith("{"):
+                schedule_name = line.split("{")[0].strip()
+                schedules[schedule_name] = []
+                current_schedule = schedule_name
                 continue
 
-            if in_schedule_section:
-                if brace_count <= 0 and line.strip() == "}":
-                    break
-
-                if line.endswith("{"):
-                    schedule_name = line.split("{")[0].strip()
-                    schedules[schedule_name] = []
-                    current_schedule = schedule_name
-                    continue
-
-                if not current_schedule:
-                    continue
+            if not current_schedule:
+                continue
 
-                if "delay" in line and current_schedule:
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        frame = parts[0]
-                        delay = int(parts[2])
-                        schedules[current_schedule].append(
-                            {"frame": frame, "delay": delay, "unit": "ms"}
-                        )
+            if "delay" in line:
+                parts = line.split()
+                if len(parts) >= 4:
+                    frame = parts[0]
+                    delay = int(parts[2])
+                    schedules[current_schedule].append(
+                        {"frame": frame, "delay": delay, "unit": "ms"}
+                    )
 
         return schedules
 
@@ -399,57 +434,46 @@ def extract_schedule_tables(data: str) -> Dict[str, List[Dict[str, Union[str, in
 
 
 def extract_signal_encoding_types(
-    data: str,
+    data: LdfSections,
 ) -> Dict[str, Dict[str, List[Dict[str, Union[str, int]]]]]:
     try:
-        lines = [line.strip() for line in data.split("\n")]
         encodings = {}
-        in_encoding_section = False
         current_signal = None
-        brace_count = 0
 
-        for line in lines:
-            brace_count += line.count("{") - line.count("}")
+        for line in _section(data, "Signal_encoding_types"):
+            if line.endswith("{"):
+                signal_name = line.split("{")[0].strip()
+                encodings[signal_name] = {
+                    "logical_values": [],
+                    "physical_values": {},
+                }
+                current_signal = signal_name
+                continue
 
-            if "Signal_encoding_types {" in line:
-                in_encoding_section = True
+            if not current_signal:
                 continue
 
-            if in_encoding_section:
-                if brace_count <= 0 and line.strip() == "}":
-                    break
+            if "logical_value," in line:
+                # Only the value and the description are needed, don't split
+                # and strip the rest of the line
+                parts = line.split(",", 3)
+                if len(parts) >= 3:
+                    value = int(parts[1].strip().strip('"'))
+                    description = parts[2].strip().strip('"').rstrip(";").strip()
+                    encodings[current_signal]["logical_values"].append(
+                        {"value": value, "description": description}
+                    )
 
-                if line.endswith("{"):
-                    signal_name = line.split("{")[0].strip()
-                    encodings[signal_name] = {
-                        "logical_values": [],
-                        "physical_values": {},
+            elif "physical_value," in line:
+                parts = [p.strip().strip('"') for p in line.split(",")]
+                if len(parts) >= 6:
+                    encodings[current_signal]["physical_values"] = {
+                        "min": int(parts[1]),
+                        "max": int(parts[2]),
+                        "scale": float(parts[3]),
+                        "offset": float(parts[4]),
+                        "unit": parts[5].rstrip(";").strip(),
                     }
-                    current_signal = signal_name
-                    continue
-
-                if not current_signal:
-                    continue
-
-                if "logical_value," in line:
-                    parts = [p.strip().strip('"') for p in line.split(",")]
-                    if len(parts) >= 3:
-                        value = int(parts[1])
-                        description = parts[2].rstrip(";").strip()
-                        encodings[current_signal]["logical_values"].append(
-                            {"value": value, "description": description}
-                        )
-
-                elif "physical_value," in line:
-                    parts = [p.strip().strip('"') for p in line.split(",")]
-                    if len(parts) >= 6:
-                        encodings[current_signal]["physical_values"] = {
-                            "min": int(parts[1]),
-                            "max": int(parts[2]),
-                            "scale": float(parts[3]),
-                            "offset": float(parts[4]),
-                            "unit": parts[5].rstrip(";").strip(),
-                        }
 
         return encodings
 
@@ -458,6 +482,48 @@ def extract_signal_encoding_types(
         return {}
 
 
+# Section of an LDF -> key in the parse_ldf result and its extractor
+LDF_SECTIONS = {
+    "Nodes": ("nodes", extract_nodes),
+    "Signals": ("signals", extract_signals),
+    "Frames": ("frames", extract_frames),
+    "Node_attributes": ("node_attributes", extract_node_attributes),
+    "Schedule_tables": ("schedule_tables", extract_schedule_tables),
+    "Signal_encoding_types": (
+        "signal_encoding_types",
+        extract_signal_encoding_types,
+    ),
+}
+
+
+def parse_ldf(data: str) -> Dict[str, Dict[str, Any]]:
+    """All extract_* results of an LDF from one pass over its lines"""
+    sections = index_sections(data)
+    ldf = {"info": extract_info(sections)}
+    for key, extract in LDF_SECTIONS.values():
+        ldf[key] = extract(sections)
+    return ldf
+
+
+def parse_ldf_file(source) -> Dict[str, Dict[str, Any]]:
+    """parse_ldf for a path, file object or mmap, in bounded memory: the
+    lines of every section go straight into its extractor as they are read.
+    A section that occurs more than once is merged into one dict."""
+    statements = []
+    found = {}
+    for section, lines in iter_ldf_sections(source):
+        if section == "":
+            statements.extend(lines)
+        elif section in LDF_SECTIONS:
+            key, extract = LDF_SECTIONS[section]
+            found.setdefault(key, {}).update(extract({section: lines}))
+
+    ldf = {"info": extract_info({"": statements})}
+    for key, extract in LDF_SECTIONS.values():
+        ldf[key] = found[key] if key in found else extract({})
+    return ldf
+
+
 def ldf_dicts_to_xlsx(
     info_dict: Dict[str, Any],
     master_slave_dict: Dict[str, Any],
@@ -602,30 +668,30 @@ def ldf_dicts_to_xlsx(
 
 
 def main():
-    data = read_file_ldf("ATOM_LIN_Matrix_BCM-ALM_V4.0.0-20250121.ldf")
+    ldf = parse_ldf_file("ATOM_LIN_Matrix_BCM-ALM_V4.0.0-20250121.ldf")
 
-    print(extract_info(data=data))
+    print(ldf["info"])
 
-    print(extract_nodes(data=data))
+    print(ldf["nodes"])
 
-    pprint.pprint(extract_signals(data=data))
+    pprint.pprint(ldf["signals"])
 
-    pprint.pprint(extract_frames(data=data))
+    pprint.pprint(ldf["frames"])
 
-    pprint.pprint(extract_node_attributes(data=data))
+    pprint.pprint(ldf["node_attributes"])
 
-    pprint.pprint(extract_schedule_tables(data=data))
+    pprint.pprint(ldf["schedule_tables"])
 
-    pprint.pprint(extract_signal_encoding_types(data=data))
+    pprint.pprint(ldf["signal_encoding_types"])
 
     ldf_dicts_to_xlsx(
-        extract_info(data=data),
-        extract_nodes(data=data),
-        extract_signals(data=data),
-        extract_frames(data=data),
-        extract_node_attributes(data=data),
-        extract_schedule_tables(data=data),
-        extract_signal_encoding_types(data=data),
+        ldf["info"],
+        ldf["nodes"],
+        ldf["signals"],
+        ldf["frames"],
+        ldf["node_attributes"],
+        ldf["schedule_tables"],
+        ldf["signal_encoding_types"],
     )
 
 
@@ -0,0 +1,578 @@
+"""Rules of the LIN matrix validator.
+
+The rules check the frame table built by signal_table from the Matrix
+sheet and report their findings as rows of one error table with
+ERROR_COLUMNS, the same layout can_rules uses without the matrix position
+columns. pages/LINValidator.py (sections and export) and validate_matrix.py
+show the same table, so the page and the CLI always agree:
+
+    Rule         key of the rule in RULES
+    Severity     always "error" for LIN findings
+    Error Type   what is wrong, e.g. "Invalid Message Length"
+    Message/Signal Name, Details, Expected   the text shown to the user
+
+Message rules look at the last row of every message name and signal rules at
+the last row of every signal name. The input frame is never modified.
+"""
+
+import re
+from typing import Callable, Dict, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from matrix_loader import extract_senders_receivers, find_bus_users
+
+ERROR_COLUMNS = [
+    "Rule",
+    "Severity",
+    "Error Type",
+    "Message/Signal Name",
+    "Details",
+    "Expected",
+]
+
+NAME_PATTERN = re.compile(r"^[A-Za-z0-9_\-]+$")
+MAX_NAME_LENGTH = 32
+
+SEND_TYPES = ["UF", "EF", "SF", "DF"]
+CHECKSUM_MODES = ["classic", "enhanced"]
+MESSAGE_LENGTHS = [1, 2, 4, 8]
+FRAME_BYTES = 8
+MAX_SIGNAL_LENGTH = 16
+
+
+def signal_table(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame table the rules work on, built from the raw Matrix sheet"""
+    # Identify bus users (nodes that send or receive messages)
+    bus_users = find_bus_users(df)
+
+    senders, receivers = extract_senders_receivers(df, bus_users)
+
+    new_df_data = {
+        "Msg ID": df["Msg ID(hex)\n报文标识符"].ffill(),
+        "Msg Name": df["Msg Name\n报文名称"].ffill(),
+        "Protected ID": df["Protected ID (hex)\n保护标识符"].ffill(),
+        "Send Type": df["Msg Send Type\n报文发送类型"].ffill(),
+        "Checksum Mode": df["Checksum mode\n校验方式"].ffill(),
+        "Msg Length": df["Msg Length(Byte)\n报文长度"].ffill(),
+        "Sig Name": df["Signal Name\n信号名称"],
+        "Description": df["Signal Description\n信号描述"],
+        "Response Error": df["Response Error"],
+        "Start Byte": df["Start Byte\n起始字节"],
+        "Start Bit": df["Start Bit\n起始位"],
+        "Length": df["Bit Length(Bit)\n信号长度"],
+        "Resolution": df["Resolution\n精度"],
+        "Offset": df["Offset\n偏移量"],
+        "Min": df["Signal Min. Value(phys)\n物理最小值"],
+        "Max": df["Signal Max. Value(phys)\n物理最大值"],
+        "Min Hex": df["Signal Min. Value(Hex)\n总线最小值"],
+        "Max Hex": df["Signal Max. Value(Hex)\n总线最大值"],
+        "Unit": df["Unit\n单位"],
+        "Initinal": df["Initial Value(Hex)\n初始值"],
+        "Invalid": df["Invalid Value(Hex)\n无效值"],
+        "Signal Value Description": df["Signal Value Description(hex)\n信号值描述"],
+        "Remark": df["Remark\n备注"],
+        "Receiver": receivers,
+        "Senders": senders,
+    }
+
+    new_df = pd.DataFrame(new_df_data)
+
+    new_df["Unit"] = new_df["Unit"].astype(str)
+    new_df["Unit"] = new_df["Unit"].str.replace("Ω", "Ohm", regex=False)
+    new_df["Unit"] = new_df["Unit"].str.replace("℃", "degC", regex=False)
+
+    new_df = new_df.dropna(subset=["Sig Name"])
+
+    new_df["Is Signed"] = False
+
+    return new_df
+
+
+def parse_id(value) -> int:
+    """Frame or protected ID from a hex string ("0x..") or a number"""
+    if isinstance(value, str) and value.startswith("0x"):
+        return int(value, 16)
+    return int(value)
+
+
+def parse_ids(values: pd.Series) -> np.ndarray:
+    """parse_id of a whole column, every distinct value is parsed once"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return np.array([parse_id(value) for value in uniques], dtype=np.int64)[codes]
+
+
+def _pid(frame_id: int) -> int:
+    bits = [(frame_id >> i) & 1 for i in range(6)]
+    p0 = bits[0] ^ bits[1] ^ bits[2] ^ bits[4]
+    p1 = 1 - (bits[1] ^ bits[3] ^ bits[4] ^ bits[5])
+    return frame_id | (p0 << 6) | (p1 << 7)
+
+
+# Frame ID 0x00-0x3F -> protected ID with parity bits
+# P0 = ID0 ^ ID1 ^ ID2 ^ ID4 (bit 6), P1 = !(ID1 ^ ID3 ^ ID4 ^ ID5) (bit 7)
+PID_TABLE = np.array([_pid(frame_id) for frame_id in range(64)], dtype=np.int64)
+
+
+def protected_id(frame_id: int) -> int:
+    """Protected ID of a frame ID, ValueError outside 0x00-0x3F"""
+    if not 0x00 <= frame_id <= 0x3F:
+        raise ValueError(f"Frame ID 0x{frame_id:02X} is outside 0x00-0x3F")
+    return int(PID_TABLE[frame_id])
+
+
+def protected_id_checks(data_frame: pd.DataFrame) -> pd.DataFrame:
+    """Protected ID of every message checked against PID_TABLE in one pass.
+
+    One row per message (its last row in the matrix) with the parsed IDs,
+    the expected protected ID and the flags Out Of Range (not 8 bit),
+    Calculation Error (differs from the frame ID's PID) and Parity Error
+    (P0/P1 do not match the ID bits of the protected ID itself). Raises
+    ValueError when an ID cannot be parsed.
+    """
+    pids = parse_ids(data_frame["Protected ID"])
+    frame_ids = parse_ids(data_frame["Msg ID"])
+    last = ~data_frame["Msg Name"].duplicated(keep="last").to_numpy()
+    pids, frame_ids = pids[last], frame_ids[last]
+
+    in_range = (pids >= 0x00) & (pids <= 0xFF)
+    checked = in_range & (frame_ids >= 0x00) & (frame_ids <= 0x3F)
+    expected = PID_TABLE[frame_ids & 0x3F]
+    parity = PID_TABLE[pids & 0x3F]
+    return pd.DataFrame(
+        {
+            "Msg Name": data_frame["Msg Name"].to_numpy()[last],
+            "Protected ID": pids,
+            "Frame ID": frame_ids,
+            "Expected PID": expected,
+            "Out Of Range": ~in_range,
+            "Calculation Error": checked & (pids != expected),
+            "Parity Error": checked & ((pids ^ parity) & 0xC0 != 0),
+        }
+    )
+
+
+def _error(error_type: str, name, details: str, expected: str) -> Dict:
+    return {
+        "Error Type": error_type,
+        "Message/Signal Name": name,
+        "Details": details,
+        "Expected": expected,
+    }
+
+
+def _name_errors(names: pd.Series, kind: str) -> List[Dict]:
+    errors = []
+    for name in set(names.dropna().astype(str)):
+        if not NAME_PATTERN.fullmatch(name.strip()):
+            errors.append(
+                _error(
+                    f"Invalid {kind} Name",
+                    name,
+                    "Contains prohibited characters",
+                    "Only A-Z, a-z, 0-9, _, - allowed",
+                )
+            )
+        if len(name) > MAX_NAME_LENGTH:
+            errors.append(
+                _error(
+                    f"Too Long {kind} Name",
+                    name,
+                    f"Length: {len(name)} characters",
+                    f"Max {MAX_NAME_LENGTH} characters",
+                )
+            )
+    return errors
+
+
+def message_names(data_frame: pd.DataFrame) -> List[Dict]:
+    return _name_errors(data_frame["Msg Name"], "Message")
+
+
+def protected_ids(data_frame: pd.DataFrame) -> List[Dict]:
+    if "Protected ID" not in data_frame.columns or "Msg ID" not in data_frame.columns:
+        return []
+
+    try:
+        checks = protected_id_checks(data_frame)
+    except Exception as e:
+        return [
+            _error(
+                "Protected ID Parsing Error",
+                "N/A",
+                f"Error: {str(e)}",
+                "Protected IDs should be valid hex or decimal values",
+            )
+        ]
+
+    errors = []
+    for row in checks[
+        checks[["Out Of Range", "Calculation Error", "Parity Error"]].any(axis=1)
+    ].itertuples(index=False):
+        mes, pid, frame_id, expected = row[:4]
+        if row[4]:
+            errors.append(
+                _error(
+                    "Protected ID Out of Range",
+                    mes,
+                    f"Protected ID: 0x{pid:02X}",
+                    "Must be between 0x00 and 0xFF",
+                )
+            )
+            continue
+
+        if row[5]:
+            errors.append(
+                _error(
+                    "Protected ID Calculation Error",
+                    mes,
+                    f"Received: 0x{pid:02X}, Expected: 0x{expected:02X}",
+                    f"Frame ID (0x{frame_id:02X}) + P0 ({expected >> 6 & 1}) + P1 ({expected >> 7})",
+                )
+            )
+
+        if row[6]:
+            parity = PID_TABLE[pid & 0x3F]
+            errors.append(
+                _error(
+                    "Protected ID Parity Error",
+                    mes,
+                    f"Received P0,P1: {pid >> 6 & 1}{pid >> 7 & 1}, Expected: {parity >> 6 & 1}{parity >> 7}",
+                    "P0 = ID0 ⊕ ID1 ⊕ ID2 ⊕ ID4, P1 = ¬(ID1 ⊕ ID3 ⊕ ID4 ⊕ ID5)",
+                )
+            )
+    return errors
+
+
+def message_ids(data_frame: pd.DataFrame) -> List[Dict]:
+    errors = []
+    try:
+        msg_id = dict(zip(data_frame["Msg Name"], data_frame["Msg ID"].apply(parse_id)))
+        msg_type = dict(zip(data_frame["Msg Name"], data_frame["Send Type"]))
+
+        for mes, id in msg_id.items():
+            if not (0x00 <= id <= 0x3D):
+                errors.append(
+                    _error(
+                        "Message ID Out of Range",
+                        mes,
+                        f"ID: 0x{id:02X}",
+                        "Must be between 0x00 and 0x3D",
+                    )
+                )
+
+            if id in [0x3E, 0x3F]:
+                errors.append(
+                    _error(
+                        "Forbidden Message ID",
+                        mes,
+                        f"ID: 0x{id:02X}",
+                        "IDs 0x3E and 0x3F are reserved",
+                    )
+                )
+
+            frame_type = msg_type.get(mes, "")
+
+            if frame_type == "UF" and not (0x00 <= id <= 0x3B):
+                errors.append(
+                    _error(
+                        "Invalid ID for Unconditional Frame",
+                        mes,
+                        f"ID: 0x{id:02X}, Type: {frame_type}",
+                        "Unconditional Frames must use IDs 0x00-0x3B",
+                    )
+                )
+
+            if frame_type == "DF" and not (0x3C <= id <= 0x3D):
+                errors.append(
+                    _error(
+                        "Invalid ID for Diagnostic Frame",
+                        mes,
+                        f"ID: 0x{id:02X}, Type: {frame_type}",
+                        "Diagnostic Frames must use IDs 0x3C or 0x3D",
+                    )
+                )
+    except Exception as e:
+        errors.append(
+            _error(
+                "Message ID Parsing Error",
+                "N/A",
+                f"Error: {str(e)}",
+                "Message IDs should be valid hex or decimal values",
+            )
+        )
+    return errors
+
+
+def message_send_types(data_frame: pd.DataFrame) -> List[Dict]:
+    msg_send_type = dict(zip(data_frame["Msg Name"], data_frame["Send Type"]))
+    return [
+        _error(
+            "Invalid Send Type",
+            mes,
+            f"Type: {send_type}",
+            "Must be UF (Unconditional), EF (Event), SF (Sporadic), or DF (Diagnostic)",
+        )
+        for mes, send_type in msg_send_type.items()
+        if send_type not in SEND_TYPES
+    ]
+
+
+def checksum_modes(data_frame: pd.DataFrame) -> List[Dict]:
+    if "Checksum Mode" not in data_frame.columns:
+        return []
+
+    errors = []
+    modes = dict(zip(data_frame["Msg Name"], data_frame["Checksum Mode"]))
+    send_type = dict(zip(data_frame["Msg Name"], data_frame["Send Type"]))
+
+    for mes, mode in modes.items():
+        mode_str = str(mode).strip().lower()
+        if mode_str not in CHECKSUM_MODES:
+            errors.append(
+                _error(
+                    "Invalid Checksum Mode",
+                    mes,
+                    f"Mode: {mode}",
+                    "Must be 'Classic' or 'Enhanced'",
+                )
+            )
+
+        if send_type[mes] == "DF" and mode_str != "classic":
+            errors.append(
+                _error(
+                    "Invalid Checksum for Diagnostic Frame",
+                    mes,
+                    f"Mode: {mode}, Type: {send_type[mes]}",
+                    "Diagnostic Frames must use Classic checksum",
+                )
+            )
+    return errors
+
+
+def message_lengths(data_frame: pd.DataFrame) -> List[Dict]:
+    msg_len = dict(zip(data_frame["Msg Name"], data_frame["Msg Length"]))
+    return [
+        _error(
+            "Invalid Message Length",
+            mes,
+            f"Length: {length} bytes",
+            "Must be 1, 2, 4, or 8 bytes",
+        )
+        for mes, length in msg_len.items()
+        if length not in MESSAGE_LENGTHS
+    ]
+
+
+def signal_names(data_frame: pd.DataFrame) -> List[Dict]:
+    return _name_errors(data_frame["Sig Name"], "Signal")
+
+
+def signal_descriptions(data_frame: pd.DataFrame) -> List[Dict]:
+    sig_desc = dict(zip(data_frame["Sig Name"], data_frame["Description"]))
+    return [
+        _error(
+            "Missing Signal Description",
+            sig_name,
+            "Value is empty",
+            "Signal description is required",
+        )
+        for sig_name, val in sig_desc.items()
+        if pd.isna(val) or str(val).strip() == ""
+    ]
+
+
+def response_errors(data_frame: pd.DataFrame) -> List[Dict]:
+    if "Response Error" not in data_frame.columns:
+        return []
+
+    resp_error = dict(zip(data_frame["Sig Name"], data_frame["Response Error"]))
+    return [
+        _error(
+            "Invalid Response Error Value",
+            sig,
+            f"Value: {val}",
+            "Should be numeric or empty",
+        )
+        for sig, val in resp_error.items()
+        if pd.notna(val) and str(val).strip() != "" and not str(val).isdigit()
+    ]
+
+
+def start_bytes(data_frame: pd.DataFrame) -> List[Dict]:
+    start_byte = dict(zip(data_frame["Sig Name"], data_frame["Start Byte"]))
+    return [
+        _error(
+            "Invalid Start Byte",
+            sig,
+            f"Start byte: {byte}",
+            f"Must be between 0 and {FRAME_BYTES - 1}",
+        )
+        for sig, byte in start_byte.items()
+        if byte not in range(0, FRAME_BYTES)
+    ]
+
+
+def start_bits(data_frame: pd.DataFrame) -> List[Dict]:
+    start_bit = dict(zip(data_frame["Sig Name"], data_frame["Start Bit"]))
+    return [
+        _error(
+            "Invalid Start Bit",
+            sig,
+            f"Start bit: {bit}",
+            f"Must be between 0 and {FRAME_BYTES * 8 - 1}",
+        )
+        for sig, bit in start_bit.items()
+        if bit not in range(0, FRAME_BYTES * 8)
+    ]
+
+
+def signal_lengths(data_frame: pd.DataFrame) -> List[Dict]:
+    sig_len = dict(zip(data_frame["Sig Name"], data_frame["Length"]))
+    return [
+        _error(
+            "Invalid Signal Length",
+            sig,
+            f"Length: {length} bits",
+            f"Must be between 1 and {MAX_SIGNAL_LENGTH} bits",
+        )
+        for sig, length in sig_len.items()
+        if not (1 <= length <= MAX_SIGNAL_LENGTH)
+    ]
+
+
+def signal_positions(data_frame: pd.DataFrame) -> List[Dict]:
+    """Signals that run past the end of the frame. Start bits are counted
+    over the whole frame; invalid start bits and lengths are reported by
+    start_bits and signal_lengths."""
+    start_bit = dict(zip(data_frame["Sig Name"], data_frame["Start Bit"]))
+    bit_length = dict(zip(data_frame["Sig Name"], data_frame["Length"]))
+
+    errors = []
+    for sig, bit in start_bit.items():
+        length = bit_length.get(sig)
+        if bit not in range(0, FRAME_BYTES * 8) or not (
+            1 <= length <= MAX_SIGNAL_LENGTH
+        ):
+            continue
+
+        end_bit = int(bit + length - 1)
+        if end_bit > FRAME_BYTES * 8 - 1:
+            errors.append(
+                _error(
+                    "Signal Positioning Error",
+                    sig,
+                    f"Start bit: {bit}, length: {length} (ends at bit {end_bit})",
+                    f"Signal must end within the frame (bit {FRAME_BYTES * 8 - 1})",
+                )
+            )
+    return errors
+
+
+def _is_hex_or_decimal(value) -> bool:
+    if isinstance(value, str):
+        try:
+            parse_id(value)
+        except ValueError:
+            return False
+    return True
+
+
+def initial_invalid_values(data_frame: pd.DataFrame) -> List[Dict]:
+    errors = []
+    init_values = dict(zip(data_frame["Sig Name"], data_frame["Initinal"]))
+    invalid_values = dict(zip(data_frame["Sig Name"], data_frame["Invalid"]))
+
+    for sig in init_values.keys():
+        init_val = init_values.get(sig)
+        inval_val = invalid_values.get(sig)
+
+        problems = []
+        if pd.notna(init_val) and not _is_hex_or_decimal(init_val):
+            problems.append(f"Invalid initial value: {init_val}")
+        if pd.notna(inval_val) and not _is_hex_or_decimal(inval_val):
+            problems.append(f"Invalid invalid value: {inval_val}")
+
+        if problems:
+            errors.append(
+                _error(
+                    "Initial/Invalid Value Error",
+                    sig,
+                    "; ".join(problems),
+                    "Values should be in hex (0xXX) or decimal format",
+                )
+            )
+    return errors
+
+
+def min_max_values(data_frame: pd.DataFrame) -> List[Dict]:
+    errors = []
+    min_vals = dict(zip(data_frame["Sig Name"], data_frame["Min"]))
+    max_vals = dict(zip(data_frame["Sig Name"], data_frame["Max"]))
+
+    for sig in min_vals.keys():
+        min_val = min_vals.get(sig)
+        max_val = max_vals.get(sig)
+
+        if pd.isna(min_val) or pd.isna(max_val):
+            continue
+
+        try:
+            if float(min_val) > float(max_val):
+                errors.append(
+                    _error(
+                        "Min/Max Value Mismatch",
+                        sig,
+                        f"Min: {float(min_val)}, Max: {float(max_val)}",
+                        "Minimum value must be less than or equal to maximum value",
+                    )
+                )
+        except ValueError:
+            errors.append(
+                _error(
+                    "Invalid Min/Max Value Format",
+                    sig,
+                    f"Min: {min_val}, Max: {max_val}",
+                    "Values should be numeric",
+                )
+            )
+    return errors
+
+
+RULES: Dict[str, Callable[[pd.DataFrame], List[Dict]]] = {
+    "message_names": message_names,
+    "protected_ids": protected_ids,
+    "message_ids": message_ids,
+    "message_send_types": message_send_types,
+    "checksum_modes": checksum_modes,
+    "message_lengths": message_lengths,
+    "signal_names": signal_names,
+    "signal_descriptions": signal_descriptions,
+    "response_errors": response_errors,
+    "start_bytes": start_bytes,
+    "start_bits": start_bits,
+    "signal_lengths": signal_lengths,
+    "signal_positions": signal_positions,
+    "initial_invalid_values": initial_invalid_values,
+    "min_max_values": min_max_values,
+}
+
+
+def check(data_frame: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """Error table of one rule"""
+    errors = pd.DataFrame(RULES[rule](data_frame), columns=ERROR_COLUMNS[2:])
+    errors.insert(0, "Severity", "error")
+    errors.insert(0, "Rule", rule)
+    return errors
+
+
+def validate(
+    data_frame: pd.DataFrame, rules: Iterable[str] = tuple(RULES)
+) -> pd.DataFrame:
+    """Error table of all rules"""
+    errors = [check(data_frame, rule) for rule in rules]
+    errors = [frame for frame in errors if not frame.empty]
+    if not errors:
+        return pd.DataFrame(columns=ERROR_COLUMNS)
+    return pd.concat(errors, ignore_index=True)
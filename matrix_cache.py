@@ -0,0 +1,433 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import stat
+import sys
+import uuid
+from io import BytesIO
+from typing import Callable, Dict, Iterable
+
+import cantools
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import can_matrix
+import matrix_loader
+from can_matrix import CanMatrix, read_messages
+from matrix_loader import MatrixWorkbook
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # tables are pickled instead
+    pa = None
+
+# Bump when the layout of cache entries changes, old entries are then ignored
+CACHE_VERSION = 1
+
+
+def _user_cache_dir() -> str:
+    """Cache directory of the current user, never a shared temp directory"""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME")
+    base = base or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "convert2dbc", "matrix_cache")
+
+
+DEFAULT_CACHE_DIR = os.environ.get("MATRIX_CACHE_DIR") or _user_cache_dir()
+DEFAULT_MAX_BYTES = int(os.environ.get("MATRIX_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+_NAN_COLUMNS = b"nan_columns"
+_MISSING = object()
+
+
+def read_bytes(source) -> bytes:
+    """Content of a path, an uploaded/opened file or bytes"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+    if hasattr(source, "read"):
+        source.seek(0)
+        data = source.read()
+        source.seek(0)
+        return data
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _version_tag() -> str:
+    """Short hash of everything a cached entry depends on: the entry layout,
+    Python and library versions and the source of the parsing modules. An
+    upgrade or code change then misses instead of unpickling stale objects."""
+    parts = [
+        str(CACHE_VERSION),
+        sys.version,
+        cantools.__version__,
+        np.__version__,
+        openpyxl.__version__,
+        pd.__version__,
+        pa.__version__ if pa is not None else "no pyarrow",
+    ]
+    for module_path in (can_matrix.__file__, matrix_loader.__file__, __file__):
+        with open(module_path, "rb") as f:
+            parts.append(content_hash(f.read()))
+    return content_hash("\n".join(parts).encode())[:16]
+
+
+VERSION_TAG = _version_tag()
+
+
+def _same_frame(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    """Equal including dtypes, index and the Python type of object values"""
+    if not (
+        a.columns.equals(b.columns)
+        and type(a.index) is type(b.index)
+        and a.index.equals(b.index)
+        and list(a.dtypes) == list(b.dtypes)
+        and a.equals(b)
+    ):
+        return False
+    for position, dtype in enumerate(a.dtypes):
+        if dtype == object:
+            a_types = a.iloc[:, position].map(type).to_numpy()
+            b_types = b.iloc[:, position].map(type).to_numpy()
+            if not np.array_equal(a_types, b_types):
+                return False
+    return True
+
+
+def private_dir(path: str) -> bool:
+    """Create path readable by the current user only (mode 0700).
+    False when it is not a directory of the current user or others can write
+    to it: pickles found there could have been planted and are never loaded."""
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+    except OSError as e:
+        print(f"Matrix cache: cannot create {path}: {e}")
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        print(f"Matrix cache: {path} is not a directory, cache disabled")
+        return False
+    if hasattr(os, "getuid"):
+        if info.st_uid != os.getuid():
+            print(f"Matrix cache: {path} belongs to another user, cache disabled")
+            return False
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            print(f"Matrix cache: {path} is writable by others, cache disabled")
+            return False
+        if stat.S_IMODE(info.st_mode) != 0o700:
+            try:
+                os.chmod(path, 0o700)
+            except OSError:
+                return False
+    return True
+
+
+def _to_feather(df: pd.DataFrame, path: str) -> bool:
+    """Write df as Feather if it reads back identical, False otherwise"""
+    if pa is None:
+        return False
+    # Arrow has a single null, remember the object columns that used NaN
+    nan_columns = [
+        position
+        for position, dtype in enumerate(df.dtypes)
+        if dtype == object
+        and df.iloc[:, position].isna().any()
+        and not df.iloc[:, position].map(lambda value: value is None).any()
+    ]
+    try:
+        table = pa.Table.from_pandas(df)
+    except (pa.ArrowException, TypeError, ValueError):
+        return False
+    metadata = dict(table.schema.metadata or {})
+    metadata[_NAN_COLUMNS] = json.dumps(nan_columns).encode()
+    table = table.replace_schema_metadata(metadata)
+    feather.write_feather(table, path)
+    if _same_frame(df, _from_feather(path)):
+        return True
+    os.remove(path)
+    return False
+
+
+def _from_feather(path: str) -> pd.DataFrame:
+    table = feather.read_table(path)
+    df = table.to_pandas()
+    for position in json.loads((table.schema.metadata or {}).get(_NAN_COLUMNS, b"[]")):
+        column = df.iloc[:, position]
+        df.isetitem(position, column.where(column.notna(), np.nan))
+    return df
+
+
+class MatrixCache:
+    """On-disk cache of parsed matrices and DBC files, keyed by the SHA-256
+    of the file content.
+
+    Every entry is a directory of tables, stored as Feather when they survive
+    the round trip unchanged and pickled otherwise. Hits refresh the entry's
+    modification time, and the least recently used entries are removed once
+    the cache grows beyond max_bytes.
+
+    The cache directory must belong to the current user and is kept at mode
+    0700, see private_dir(). Otherwise nothing is loaded or stored and every
+    call builds its result.
+    """
+
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._usable = None
+
+    def usable(self) -> bool:
+        """The cache directory is private to the current user"""
+        if self._usable is None:
+            self._usable = private_dir(self.cache_dir)
+        return self._usable
+
+    def _entry_path(self, kind: str, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{kind}-{VERSION_TAG}-{digest}")
+
+    def tables(
+        self, kind: str, data: bytes, build: Callable[[], Dict[str, pd.DataFrame]]
+    ) -> Dict[str, pd.DataFrame]:
+        """Tables built from data, loaded from the cache when already there"""
+        if not self.usable():
+            return build()
+        path = self._entry_path(kind, content_hash(data))
+        tables = self._load(path, self._read_tables)
+        if tables is not _MISSING:
+            self.hits += 1
+            return tables
+
+        self.misses += 1
+        tables = build()
+        self._store(path, lambda tmp: self._write_tables(tables, tmp))
+        return tables
+
+    def value(self, kind: str, data: bytes, build: Callable[[], object]):
+        """Any picklable object built from data, cached like tables()"""
+        if not self.usable():
+            return build()
+        path = self._entry_path(kind, content_hash(data))
+        value = self._load(path, self._read_value)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = build()
+
+        def write(tmp):
+            with open(os.path.join(tmp, "value.pkl"), "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._store(path, write)
+        return value
+
+    def _load(self, path: str, read: Callable[[str], object]):
+        """Entry at path read with read(path), _MISSING when there is none.
+        An entry that fails to load for any reason is removed so it is built
+        and stored again."""
+        try:
+            value = read(path)
+        except FileNotFoundError:
+            return _MISSING  # not cached yet or evicted meanwhile
+        except Exception as e:
+            print(f"Matrix cache: removing unreadable entry {path}: {e!r}")
+            shutil.rmtree(path, ignore_errors=True)
+            return _MISSING
+        self._touch(path)
+        return value
+
+    @staticmethod
+    def _read_value(path: str):
+        with open(os.path.join(path, "value.pkl"), "rb") as f:
+            return pickle.load(f)
+
+    @staticmethod
+    def _read_tables(path: str) -> Dict[str, pd.DataFrame]:
+        with open(os.path.join(path, "tables.json"), encoding="utf-8") as f:
+            index = json.load(f)
+        tables = {}
+        for name, file_name in index.items():
+            if os.path.basename(file_name) != file_name:
+                raise ValueError(f"Table {file_name} outside of the entry")
+            file_path = os.path.join(path, file_name)
+            if file_name.endswith(".feather"):
+                tables[name] = _from_feather(file_path)
+            else:
+                tables[name] = pd.read_pickle(file_path)
+        return tables
+
+    @staticmethod
+    def _write_tables(tables: Dict[str, pd.DataFrame], tmp: str):
+        index = {}
+        for position, (name, df) in enumerate(tables.items()):
+            file_name = f"{position}.feather"
+            if not _to_feather(df, os.path.join(tmp, file_name)):
+                file_name = f"{position}.pkl"
+                df.to_pickle(os.path.join(tmp, file_name))
+            index[name] = file_name
+        with open(os.path.join(tmp, "tables.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False)
+
+    def _store(self, path: str, write: Callable[[str], None]):
+        tmp = os.path.join(self.cache_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(tmp)
+            write(tmp)
+            os.rename(tmp, path)
+        except OSError as e:
+            # Another session stored the same entry first, or the cache
+            # directory is not writable: the result is still returned
+            if not os.path.isdir(path):
+                print(f"Matrix cache: could not store {path}: {e}")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict()
+
+    @staticmethod
+    def _touch(path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _entries(self):
+        """(mtime, size, path) of every entry"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return entries
+        for name in names:
+            if name.startswith("."):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                size = sum(entry.stat().st_size for entry in os.scandir(path))
+                entries.append((os.path.getmtime(path), size, path))
+            except OSError:
+                continue
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        if self.usable():
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self._usable = None
+
+    def workbook(
+        self, source, sheet_names: Iterable[str] = MatrixWorkbook.DEFAULT_SHEETS
+    ) -> MatrixWorkbook:
+        """MatrixWorkbook of an xlsx matrix, source is a path or file"""
+        sheet_names = tuple(sheet_names)
+        data = read_bytes(source)
+        kind = "xlsx-" + content_hash("\n".join(sheet_names).encode())[:8]
+        sheets = self.tables(
+            kind,
+            data,
+            lambda: MatrixWorkbook(
+                _seekable(source, data), sheet_names=sheet_names
+            ).sheets,
+        )
+        return MatrixWorkbook.from_frames(source, sheets)
+
+    def sheet(self, source, sheet_name: str = "Matrix") -> pd.DataFrame:
+        """One sheet of an xlsx matrix, like matrix_loader.read_sheet"""
+        df = self.workbook(source).sheet(sheet_name)
+        if df is None:
+            raise ValueError(f"Sheet '{sheet_name}' not found in workbook")
+        return df
+
+    def can_matrix(self, source) -> CanMatrix:
+        """CanMatrix of an xlsx matrix"""
+        data = read_bytes(source)
+        tables = self.tables(
+            "canmatrix",
+            data,
+            lambda: _matrix_tables(CanMatrix.from_sheet(self.sheet(data, "Matrix"))),
+        )
+        return CanMatrix(**tables)
+
+    def messages(self, source) -> pd.DataFrame:
+        """CanMatrix.messages of an xlsx matrix, only its message columns read"""
+        data = read_bytes(source)
+        tables = self.tables(
+            "messages",
+            data,
+            lambda: {"messages": read_messages(_seekable(source, data))},
+        )
+        return tables["messages"]
+
+    def dbc(self, source, **kwargs) -> cantools.database.Database:
+        """cantools database of a DBC file, like cantools.database.load_file"""
+        data = read_bytes(source)
+        encoding = kwargs.pop("encoding", "cp1252")
+        return self.value(
+            "dbc",
+            data + repr((encoding, sorted(kwargs.items()))).encode(),
+            lambda: cantools.database.load_string(
+                data.decode(encoding), database_format="dbc", **kwargs
+            ),
+        )
+
+    def dbc_string(self, text: str, **kwargs) -> cantools.database.Database:
+        """cantools database of DBC text, like cantools.database.load_string"""
+        return self.dbc(text.encode("utf-8"), encoding="utf-8", **kwargs)
+
+    def dbc_matrix(self, source) -> CanMatrix:
+        """CanMatrix of a DBC file"""
+        data = read_bytes(source)
+        tables = self.tables(
+            "dbcmatrix",
+            data,
+            lambda: _matrix_tables(
+                CanMatrix.from_dbc(self.dbc(data, encoding="utf-8"))
+            ),
+        )
+        return CanMatrix(**tables)
+
+
+def _matrix_tables(can_matrix: CanMatrix) -> Dict[str, pd.DataFrame]:
+    return {
+        "messages": can_matrix.messages,
+        "signals": can_matrix.signals,
+        "roles": can_matrix.roles,
+    }
+
+
+def _seekable(source, data: bytes):
+    """Source itself when it is a path, otherwise its content as a file"""
+    if isinstance(source, (str, os.PathLike)):
+        return source
+    return BytesIO(data)
+
+
+matrix_cache = MatrixCache()
@@ -0,0 +1,250 @@
+import glob
+import itertools
+import os
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.cell.cell import ERROR_CODES
+from pandas.io.parsers import TextParser
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class MatrixWorkbook:
+    """Opens a matrix workbook once and shares the parsed sheets between
+    node discovery, validation and loading."""
+
+    DEFAULT_SHEETS = ("Matrix", "History")
+
+    def __init__(
+        self,
+        excel_path,
+        sheet_names: Iterable[str] = DEFAULT_SHEETS,
+        engine: str = "openpyxl",
+    ):
+        self.excel_path = excel_path
+        self.engine = engine
+        self.parse_count = 0  # how many times the workbook file was parsed
+        self.sheets: Dict[str, pd.DataFrame] = self._read_sheets(list(sheet_names))
+
+    def _read_sheets(self, sheet_names) -> Dict[str, pd.DataFrame]:
+        if hasattr(self.excel_path, "seek"):
+            self.excel_path.seek(0)
+
+        sheets = {}
+        if self.engine == "openpyxl":
+            wb = load_workbook(
+                self.excel_path, read_only=True, data_only=True, keep_links=False
+            )
+            try:
+                self.parse_count += 1
+                for name in sheet_names:
+                    if name in wb.sheetnames:
+                        sheets[name] = read_worksheet(wb[name])
+            finally:
+                wb.close()
+            return sheets
+
+        with pd.ExcelFile(self.excel_path, engine=self.engine) as xls:
+            self.parse_count += 1
+            for name in sheet_names:
+                if name in xls.sheet_names:
+                    sheets[name] = xls.parse(sheet_name=name, keep_default_na=True)
+        return sheets
+
+    @classmethod
+    def from_frames(cls, excel_path, sheets: Dict[str, pd.DataFrame]):
+        """Wrap sheets that are already in memory, nothing is read from disk"""
+        workbook = cls.__new__(cls)
+        workbook.excel_path = excel_path
+        workbook.engine = None
+        workbook.parse_count = 0
+        workbook.sheets = dict(sheets)
+        return workbook
+
+    def sheet(self, name: str) -> Optional[pd.DataFrame]:
+        return self.sheets.get(name)
+
+    @property
+    def matrix(self) -> pd.DataFrame:
+        if "Matrix" not in self.sheets:
+            raise ValueError("Sheet 'Matrix' not found in workbook")
+        return self.sheets["Matrix"]
+
+    @property
+    def history(self) -> pd.DataFrame:
+        if "History" not in self.sheets:
+            raise ValueError("Sheet 'History' not found in workbook")
+        return self.sheets["History"]
+
+
+def _cell_value(value):
+    """Cell value the way pandas' openpyxl reader converts it"""
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value in ERROR_CODES:
+        return np.nan
+    return value
+
+
+def read_worksheet(ws, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Stream a read-only worksheet into a DataFrame.
+
+    Rows are read as plain values (no cell objects) and only the requested
+    columns are kept, the result is the same as pd.read_excel(...,
+    keep_default_na=True) restricted to these columns. Headers that are not
+    in the sheet are skipped.
+    """
+    ws.reset_dimensions()
+    rows = ws.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return pd.DataFrame()
+
+    header = [_cell_value(value) for value in header]
+    while header and header[-1] == "":
+        header.pop()
+    # Let pandas name empty and duplicate headers ("Unnamed: 3", "Name.1")
+    names = list(TextParser([header], header=0).read().columns) if header else []
+
+    if columns is None:
+        keep = None
+    else:
+        wanted = set(columns)
+        keep = [i for i, name in enumerate(names) if name in wanted]
+        names = [names[i] for i in keep]
+
+    data = []
+    last_row_with_data = -1
+    width = len(names)
+    for row in rows:
+        if any(value is not None and value != "" for value in row):
+            last_row_with_data = len(data)
+        if keep is None:
+            values = [_cell_value(value) for value in row]
+            while values and values[-1] == "":
+                values.pop()
+            width = max(width, len(values))
+        else:
+            values = [_cell_value(row[i]) if i < len(row) else "" for i in keep]
+        data.append(values)
+    del data[last_row_with_data + 1 :]
+
+    if keep is None and width > len(names):
+        # Data wider than the header, same naming as pandas
+        names += [f"Unnamed: {i}" for i in range(len(names), width)]
+    for values in data:
+        if len(values) < len(names):
+            values.extend([""] * (len(names) - len(values)))
+        elif len(values) > len(names):
+            del values[len(names) :]
+
+    if not names:
+        return pd.DataFrame(index=pd.RangeIndex(len(data)), columns=[])
+    return TextParser(
+        data, names=names, header=None, skip_blank_lines=False, keep_default_na=True
+    ).read()
+
+
+def read_sheet(
+    excel_path, sheet_name: str = "Matrix", columns: Optional[Iterable[str]] = None
+) -> pd.DataFrame:
+    """Read one sheet of an xlsx file (path or file-like) in streaming mode"""
+    if hasattr(excel_path, "seek"):
+        excel_path.seek(0)
+    wb = load_workbook(excel_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        if sheet_name not in wb.sheetnames:
+            raise ValueError(f"Worksheet named '{sheet_name}' not found")
+        return read_worksheet(wb[sheet_name], columns)
+    finally:
+        wb.close()
+
+
+def read_columns(
+    excel_path, columns: Iterable[str], sheet_name: str = "Matrix"
+) -> Dict[str, np.ndarray]:
+    """Typed column arrays for the given bilingual headers, e.g.
+    read_columns(path, ["Msg ID\n报文标识符", "Msg Length (Byte)\n报文长度"])"""
+    df = read_sheet(excel_path, sheet_name, columns)
+    return {name: df[name].to_numpy() for name in df.columns}
+
+
+def find_bus_users(df: pd.DataFrame) -> List[str]:
+    """Columns that mark at least one message as sent (S) or received (R)"""
+    return [
+        col
+        for col in df.columns
+        if any(val in ["S", "R"] for val in df[col].dropna().unique())
+        and col != "Unit\n单位"
+    ]
+
+
+def extract_senders_receivers(
+    df: pd.DataFrame, bus_users: List[str], empty: Optional[str] = "Vector__XXX"
+) -> Tuple[pd.Series, pd.Series]:
+    """Comma-joined senders and receivers for every row of the S/R block.
+
+    Rows are reduced to their S/R pattern first, so the joins are only built
+    once per distinct pattern instead of once per row.
+    """
+    users = [user for user in bus_users if user in df.columns]
+    if not users or df.empty:
+        return (
+            pd.Series([empty] * len(df), index=df.index, dtype=object),
+            pd.Series([empty] * len(df), index=df.index, dtype=object),
+        )
+
+    block = df[users].to_numpy(dtype=object)
+    codes = np.zeros(block.shape, dtype=np.uint8)
+    codes[block == "S"] = 1
+    codes[block == "R"] = 2
+
+    patterns, inverse = np.unique(codes, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    names = np.array(users, dtype=object)
+    pattern_senders = np.empty(len(patterns), dtype=object)
+    pattern_receivers = np.empty(len(patterns), dtype=object)
+    for i, pattern in enumerate(patterns):
+        pattern_senders[i] = ",".join(names[pattern == 1]) or empty
+        pattern_receivers[i] = ",".join(names[pattern == 2]) or empty
+
+    return (
+        pd.Series(pattern_senders[inverse], index=df.index, dtype=object),
+        pd.Series(pattern_receivers[inverse], index=df.index, dtype=object),
+    )
+
+
+def row_index(
+    names: Iterable, rows: Optional[Iterable[int]] = None
+) -> Dict[str, List[int]]:
+    """Sheet rows of every name in a name column (Msg Name, Signal Name).
+
+    rows are the sheet rows of the names, by default 2, 3, ... (a column of an
+    openpyxl worksheet from its first data row); for a column of read_worksheet
+    pass its index + 2. Keys are stripped, empty cells are skipped.
+    """
+    if rows is None:
+        rows = itertools.count(2)
+    index: Dict[str, List[int]] = {}
+    for row, name in zip(rows, names):
+        if name is None or name == "" or (isinstance(name, float) and np.isnan(name)):
+            continue
+        index.setdefault(str(name).strip(), []).append(int(row))
+    return index
+
+
+def find_matrix_files(pattern: str) -> List[str]:
+    """Matrices in a directory, or matching a glob, in a stable order"""
+    if os.path.isdir(pattern):
+        files = glob.glob(os.path.join(pattern, "*.xlsx"))
+    else:
+        files = glob.glob(pattern, recursive=True)
+    # Skip the lock files Excel leaves next to opened workbooks
+    return sorted(
+        f
+        for f in files
+        if f.endswith(".xlsx") and not os.path.basename(f).startswith("~$")
+    )
@@ -0,0 +1,67 @@
+"""Streamlit caches for the pages.
+
+Every widget interaction reruns a page script from the top. The loaders here
+are keyed by the SHA-256 of the uploaded file, so a rerun with the same
+uploads skips parsing. They are backed by matrix_cache, which also keeps the
+results across server restarts and shares them between pages.
+"""
+
+from typing import Iterable, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from can_matrix import CanMatrix
+from matrix_cache import content_hash, matrix_cache, read_bytes
+
+MAX_ENTRIES = 32
+
+
+def file_key(file) -> str:
+    """Content hash of an uploaded file or path"""
+    return content_hash(read_bytes(file))
+
+
+def files_key(files: Iterable) -> Tuple[Tuple[str, str], ...]:
+    """(name, content hash) of every file, for steps that use several uploads"""
+    return tuple((getattr(file, "name", str(file)), file_key(file)) for file in files)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _sheet(digest: str, sheet_name: str, _file) -> pd.DataFrame:
+    return matrix_cache.sheet(_file, sheet_name)
+
+
+def sheet(file, sheet_name: str = "Matrix") -> pd.DataFrame:
+    """One sheet of an xlsx matrix"""
+    return _sheet(file_key(file), sheet_name, file)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _can_matrix(digest: str, _file) -> CanMatrix:
+    return matrix_cache.can_matrix(_file)
+
+
+def can_matrix(file) -> CanMatrix:
+    """CanMatrix of an xlsx matrix"""
+    return _can_matrix(file_key(file), file)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _messages(digest: str, _file) -> pd.DataFrame:
+    return matrix_cache.messages(_file)
+
+
+def messages(file) -> pd.DataFrame:
+    """Message table of an xlsx matrix, without reading the signal columns"""
+    return _messages(file_key(file), file)
+
+
+@st.cache_data(show_spinner=False, max_entries=MAX_ENTRIES)
+def _dbc_matrix(digest: str, _file) -> CanMatrix:
+    return matrix_cache.dbc_matrix(_file)
+
+
+def dbc_matrix(file) -> CanMatrix:
+    """CanMatrix of a DBC file"""
+    return _dbc_matrix(file_key(file), file)
@@ -1,6 +1,6 @@
 import streamlit as st
 import pandas as pd
-import cantools
+import page_cache
 from openpyxl import load_workbook
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
@@ -50,22 +50,22 @@ def get_format_splitted_files(uploaded_files):
         return excel_files, dbc_files
     return 0, 0
 
+def get_message_df(messages):
+    return pd.DataFrame({
+        "Msg Name\n报文名称": messages["Msg Name"],
+        "Msg ID\n报文标识符": messages["Frame ID"].map(lambda frame_id: f"0x{frame_id:X}", na_action="ignore"),
+        "Msg Send Type\n报文发送类型": messages["Send Type"],
+        "Msg Cycle Time (ms)\n报文周期时间": messages["Cycle Type"],
+        "Msg Length (Byte)\n报文长度": messages["Msg Length"],
+    })
+
 def get_excel_2_df(excel_files):
     if excel_files:
         pd_df_matrices = {}
         # Получить датафреймы для каждого домена
         for file in excel_files:
-            df = pd.read_excel(file, sheet_name="Matrix")
-            if 'CANFD' in file.name:
-                necessary_columns = [0, 2, 3, 4, 7]
-            else:
-                necessary_columns = [0, 2, 3, 4, 5]
-            df = df.iloc[:, necessary_columns]
-            message_name_column = df.columns[0]
-            df.dropna(subset=[message_name_column], inplace=True)
-            df.columns = ["Msg Name\n报文名称",	"Msg ID\n报文标识符", "Msg Send Type\n报文发送类型", "Msg Cycle Time (ms)\n报文周期时间", "Msg Length (Byte)\n报文长度"]
             domain = file.name.split('_')[1] + '_' + file.name.split('_')[3]
-            pd_df_matrices[domain] = df
+            pd_df_matrices[domain] = get_message_df(page_cache.messages(file))
 
         return pd_df_matrices
     return 0
@@ -75,21 +75,8 @@ def get_dbc_2_df(dbc_files):
         pd_df_matrices = {}
         # Получить датафреймы для каждого файла
         for file in dbc_files:
-            file.seek(0)
-            dbc_content = file.read().decode('utf-8')
-            db = cantools.database.load_string(dbc_content, 'dbc')
-            data = []
-            for message in db.messages:
-                data.append({
-                    "Msg Name\n报文名称": message.name,
-                    "Msg ID\n报文标识符": hex(message.frame_id),
-                    "Msg Send Type\n报文发送类型": message.send_type,
-                    "Msg Cycle Time (ms)\n报文周期时间": message.cycle_time,
-                    "Msg Length (Byte)\n报文长度": message.length
-                })
-            df = pd.DataFrame(data)
             domain = file.name.split('_')[1] + '_' + file.name.split('_')[3]
-            pd_df_matrices[domain] = df
+            pd_df_matrices[domain] = get_message_df(page_cache.dbc_matrix(file).messages)
 
         return pd_df_matrices
     return 0
@@ -162,7 +149,7 @@ def get_domains_version(uploaded_files):
         domain_version = {}
         # Получить датафреймы для каждого домена
         for file in uploaded_files['xlsx']:
-            df = pd.read_excel(file, sheet_name="History")
+            df = page_cache.sheet(file, "History")
             revision_column = df.columns[0]
             domain = file.name.split('_')[1] + '_' + file.name.split('_')[3]
             domain_version[domain] = df[revision_column].dropna().iloc[-1]
@@ -387,6 +374,17 @@ def calculate_busload(template_created, output_path):
     
     return 0
 
+@st.cache_data(show_spinner=False, max_entries=page_cache.MAX_ENTRIES)
+def get_busload_calculation(uploaded_files_key, output_path, _merged_df):
+    # Шаблон и загрузка считаются заново только при загрузке других файлов
+    template_created = create_matrix_template(_merged_df, output_path)
+    stylise_matrix_template(template_created, output_path)
+    domain_busload = calculate_busload(template_created, output_path)
+    if not domain_busload:
+        return 0, None
+    with open(output_path, 'rb') as f:
+        return domain_busload, f.read()
+
 def download_busload_calculation(busload_calculated, template_path, release_version):
     if busload_calculated and template_path and release_version:
         busload_calculation = load_workbook(template_path)
@@ -424,12 +422,13 @@ def main():
         merged_df = get_merged_df(domain_df_excel, domain_df_dbc)
         # Добавить кнопку "рассчитать"
         start_processing(merged_df)
-        # Создать шаблон для рассчета загрузки
-        template_created = create_matrix_template(merged_df, output_path)
-        # Залить ячейки цветом
-        stylise_matrix_template(template_created, output_path)
-        # Рассчитать загрузку
-        domain_busload = calculate_busload(template_created, output_path)
+        # Создать шаблон, залить ячейки цветом и рассчитать загрузку
+        uploaded_files_key = page_cache.files_key(excel_files + dbc_files) if uploaded_files else ()
+        domain_busload, busload_workbook = get_busload_calculation(uploaded_files_key, output_path, merged_df)
+        if busload_workbook:
+            # Страница с результатом добавляется к рассчету из кэша
+            with open(output_path, 'wb') as f:
+                f.write(busload_workbook)
         # Добавить страницу с общим результатом
         busload_calculated = add_result_sheet(domain_busload, domains_version, release_version, output_path)
         # Скачать результат
@@ -5,7 +5,7 @@ from openpyxl.styles import PatternFill, Font
 from datetime import datetime
 from io import BytesIO
 import re
-import cantools
+import page_cache
 
 def set_page_config():
     st.title("🔥CAN ID Map")
@@ -47,19 +47,19 @@ def input_version():
         version = "VNone"
     return version
 
+def get_message_df(messages):
+    return pd.DataFrame({
+        'message name': messages['Msg Name'],
+        'message id': messages['Frame ID'].map(lambda frame_id: f'{frame_id:03X}', na_action='ignore'),
+        'message cycle time': messages['Cycle Type'],
+    })
+
 def get_excel_2_df(uploaded_files):
     if uploaded_files:
         pd_df_matrices = []
         # Получить датафреймы для каждого файла
         for file in uploaded_files:
-            df = pd.read_excel(file, sheet_name="Matrix")
-            necessary_columns = [0, 2, 4]
-            df = df.iloc[:, necessary_columns]
-            message_name_column = df.columns[0]
-            df.dropna(subset=[message_name_column], inplace=True)
-            df.columns = ['message name', 'message id', 'message cycle time']
-            df['message id'] = df['message id'].str[2:]
-            pd_df_matrices.append(df)
+            pd_df_matrices.append(get_message_df(page_cache.messages(file)))
 
         return pd_df_matrices
     return 0
@@ -69,20 +69,7 @@ def get_dbc_2_df(uploaded_files):
         pd_df_matrices = []
         # Получить датафреймы для каждого файла
         for file in uploaded_files:
-            dbc_content = file.read().decode('utf-8')
-            db = cantools.database.load_string(dbc_content, 'dbc')
-            data = []
-            for message in db.messages:
-                message_id = hex(message.frame_id).upper()[2:]
-                if len(message_id) == 2:
-                    message_id = '0' + message_id
-                data.append({
-                    'message name': message.name,
-                    'message id': message_id,
-                    'message cycle time': message.cycle_time
-                })
-            df = pd.DataFrame(data)
-            pd_df_matrices.append(df)
+            pd_df_matrices.append(get_message_df(page_cache.dbc_matrix(file).messages))
 
         return pd_df_matrices
     return 0
@@ -197,6 +184,11 @@ def generate_CAN_ID_Map(template_path, df):
         return CAN_ID_Map
     return 0
 
+@st.cache_resource(show_spinner=False, max_entries=page_cache.MAX_ENTRIES)
+def get_CAN_ID_Map(uploaded_files_key, template_path, _df):
+    # Таблица строится заново только при загрузке других файлов
+    return generate_CAN_ID_Map(template_path, _df)
+
 def download_CAN_ID_Map(CAN_ID_Map, version):
     if CAN_ID_Map:
         output_path = f"CANID Design_ATOM_{version}-{datetime.now().strftime("%Y%m%d")}.xlsx"
@@ -231,7 +223,8 @@ def main():
         # Совместить excel и dbc датафреймы
         merged_df = get_merged_df(df_excel, df_dbc)
         # Сгенерировать id таблицу
-        CAN_ID_Map = generate_CAN_ID_Map(template_path, merged_df)
+        uploaded_files_key = page_cache.files_key(excel_files + dbc_files) if uploaded_files else ()
+        CAN_ID_Map = get_CAN_ID_Map(uploaded_files_key, template_path, merged_df)
         # Скачать результат
         download_CAN_ID_Map(CAN_ID_Map, version)
 
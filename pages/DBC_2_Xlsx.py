@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from dbc2xlsx import DbcRead
+from dbc2xlsx import DbcRead, DbcTables
+import page_cache
 import os
 import tempfile
 from datetime import datetime
@@ -130,53 +131,33 @@ def display_warnings(warnings):
                 )
 
 
-def validate_dbc_file(uploaded_file):
+def validate_dbc_file(tables):
     errors = []
     warnings = []
 
-    try:
-        temp_dir = tempfile.gettempdir()
-        temp_path = os.path.join(temp_dir, uploaded_file.name)
+    messages = tables.messages
+    if messages.empty:
+        errors.append("DBC file contains no messages")
 
-        if not os.path.exists(temp_dir):
-            errors.append(f"Temporary directory does not exist: {temp_dir}")
-            return errors, warnings
+    if not tables.nodes:
+        warnings.append("DBC file contains no ECU nodes")
 
-        with open(temp_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+    no_signals = (messages["Signals"] == 0).to_numpy()
+    no_senders = (messages["Senders"] == "").to_numpy()
+    for msg_name, empty, unsent in zip(messages["Name"], no_signals, no_senders):
+        if empty:
+            warnings.append(f"Message '{msg_name}' contains no signals")
 
-        if not os.path.exists(temp_path):
-            errors.append(f"Failed to create temporary file: {temp_path}")
-            return errors, warnings
+        if unsent:
+            warnings.append(f"Message '{msg_name}' has no senders")
 
-        converter = DbcRead(temp_path)
-        lib, ecu = converter.CreateDB()
-
-        if not lib:
-            errors.append("DBC file contains no messages")
-
-        if not ecu:
-            warnings.append("DBC file contains no ECU nodes")
-
-        for msg_name, msg_data in lib.items():
-            if not msg_data.get("Signals"):
-                warnings.append(f"Message '{msg_name}' contains no signals")
-
-            if not msg_data.get("Senders"):
-                warnings.append(f"Message '{msg_name}' has no senders")
-
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    return errors, warnings
 
-    except Exception as e:
-        errors.append(f"Error reading the DBC file: {str(e)}")
-        try:
-            if "temp_path" in locals() and os.path.exists(temp_path):
-                os.remove(temp_path)
-        except:
-            pass
 
-    return errors, warnings
+@st.cache_data(show_spinner=False, max_entries=page_cache.MAX_ENTRIES)
+def load_dbc_tables(file_hash: str, _temp_path: str) -> DbcTables:
+    # Один разбор DBC на загрузку: превью, проверка и конвертация
+    return DbcRead(_temp_path).tables()
 
 
 def main():
@@ -210,18 +191,18 @@ def main():
                     st.error(f"Failed to create temporary file: {temp_path}")
                     return
 
-                converter = DbcRead(temp_path)
-                lib, ecu = converter.CreateDB()
+                tables = load_dbc_tables(page_cache.file_key(uploaded_file), temp_path)
 
                 preview_data = []
-                ecu_nodes = [node.name for node in ecu]
+                ecu_nodes = tables.nodes[:3]
+                signals = tables.signals
 
-                for msg_name, msg_data in list(lib.items())[:5]:
+                for msg_idx, message in tables.messages.head(5).iterrows():
                     msg_row = {
-                        "Message Name": msg_name,
-                        "Message ID": f"0x{int(msg_data['Msg_id']):X}",
-                        "Message Length": msg_data["Msg_length"],
-                        "Cycle Time": msg_data["Cycle_time"],
+                        "Message Name": message["Name"],
+                        "Message ID": f"0x{int(message['Frame ID']):X}",
+                        "Message Length": message["Length"],
+                        "Cycle Time": message["Cycle Time"],
                         "Signal Name": None,
                         "Signal Description": None,
                         "Start Byte": None,
@@ -235,38 +216,39 @@ def main():
                         "Unit": None,
                     }
 
-                    for ecu_node in ecu_nodes[:3]:
+                    for node_idx, ecu_node in enumerate(ecu_nodes):
                         msg_row[ecu_node] = (
-                            "S" if ecu_node in msg_data["Senders"] else ""
+                            "S" if tables.senders[msg_idx, node_idx] else ""
                         )
 
                     preview_data.append(msg_row)
 
-                    for signal in msg_data["Signals"][:3]:
+                    message_signals = signals[signals["Message"] == msg_idx].head(3)
+                    for sig_idx, signal in message_signals.iterrows():
                         sig_row = {
                             "Message Name": None,
                             "Message ID": None,
                             "Message Length": None,
                             "Cycle Time": None,
-                            "Signal Name": signal["Sgn_name"],
+                            "Signal Name": signal["Name"],
                             "Signal Description": signal["Comment"] or None,
-                            "Start Byte": signal["Start_bit"] // 8,
-                            "Start Bit": signal["Start_bit"],
-                            "Bit Length": signal["Sgn_lenght"],
+                            "Start Byte": signal["Start Bit"] // 8,
+                            "Start Bit": signal["Start Bit"],
+                            "Bit Length": signal["Length"],
                             "Data Type": (
-                                "Unsigned" if not signal["Is_signed"] else "Signed"
+                                "Unsigned" if not signal["Is Signed"] else "Signed"
                             ),
-                            "Resolution": signal["Factor"],
+                            "Resolution": signal["Scale"],
                             "Offset": signal["Offset"],
                             "Min Value": signal["Minimum"],
                             "Max Value": signal["Maximum"],
                             "Unit": signal["Unit"] or None,
                         }
 
-                        for ecu_node in ecu_nodes[:3]:
-                            if ecu_node in msg_data["Senders"]:
+                        for node_idx, ecu_node in enumerate(ecu_nodes):
+                            if tables.senders[msg_idx, node_idx]:
                                 sig_row[ecu_node] = "S"
-                            elif ecu_node in signal["Receivers"]:
+                            elif tables.receivers[sig_idx, node_idx]:
                                 sig_row[ecu_node] = "R"
                             else:
                                 sig_row[ecu_node] = ""
@@ -292,7 +274,7 @@ def main():
                     )
                 )
 
-                errors, warnings = validate_dbc_file(uploaded_file)
+                errors, warnings = validate_dbc_file(tables)
                 display_errors(errors)
                 display_warnings(warnings)
 
@@ -354,10 +336,13 @@ def main():
                             f.write(uploaded_file.getbuffer())
 
                         converter = DbcRead(temp_path)
+                        tables = load_dbc_tables(
+                            page_cache.file_key(uploaded_file), temp_path
+                        )
                         
                         f = io.StringIO()
                         with redirect_stdout(f):
-                            success = converter.convert(custom_filename)
+                            success = converter.convert(custom_filename, tables)
                         
                         output = f.getvalue()
                         # st.code(f"Conversion output:\n{output}")
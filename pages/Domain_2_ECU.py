@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 from openpyxl import load_workbook
 from copy import copy
 from io import BytesIO
@@ -9,6 +8,11 @@ from openpyxl.utils import (
 )
 from openpyxl.styles import Alignment
 import zipfile
+import page_cache
+from style_copier import StyleCopier
+
+# Number formats and protection are not copied by this page
+COPIED_STYLES = ("font", "fill", "border", "alignment")
 
 # Настройка страницы Streamlit
 # st.set_page_config(
@@ -33,13 +37,10 @@ def set_column_widths(ws, widths):
         ws.column_dimensions[col_letter].width = width
 
 
-def copy_row_with_style(src_row, dest_ws, dest_row_idx):
+def copy_row_with_style(src_row, dest_ws, dest_row_idx, styles):
     for i, orig_cell in enumerate(src_row, 1):
         new_cell = dest_ws.cell(row=dest_row_idx, column=i, value=orig_cell.value)
-        new_cell.font = copy(orig_cell.font)
-        new_cell.fill = copy(orig_cell.fill)
-        new_cell.border = copy(orig_cell.border)
-        new_cell.alignment = copy(orig_cell.alignment)
+        styles.copy(orig_cell, new_cell)
 
 
 def process_matrix_sheet(wb, ecu_col_indexes):
@@ -97,12 +98,10 @@ def process_matrix_sheet(wb, ecu_col_indexes):
     }
     set_column_widths(new_matrix_ws, custom_widths)
 
+    styles = StyleCopier(COPIED_STYLES)
     for col_idx, cell in enumerate(ws_matrix[1], 1):
         new_cell = new_matrix_ws.cell(row=1, column=col_idx, value=cell.value)
-        new_cell.font = copy(cell.font)
-        new_cell.fill = copy(cell.fill)
-        new_cell.border = copy(cell.border)
-        new_cell.alignment = copy(cell.alignment)
+        styles.copy(cell, new_cell)
         if col_idx == 27:
             alignment = copy(cell.alignment)
             new_cell.alignment = Alignment(
@@ -117,7 +116,7 @@ def process_matrix_sheet(wb, ecu_col_indexes):
             (row[idx].value is not None and str(row[idx].value).lower() in ["s", "r"])
             for idx in ecu_col_indexes.values()
         ):
-            copy_row_with_style(row, new_matrix_ws, dest_row)
+            copy_row_with_style(row, new_matrix_ws, dest_row, styles)
             dest_row += 1
 
     for row in new_matrix_ws.iter_rows(min_row=2, max_row=new_matrix_ws.max_row):
@@ -125,12 +124,13 @@ def process_matrix_sheet(wb, ecu_col_indexes):
         aa_cell.alignment = Alignment(horizontal="left", vertical="top", wrap_text=True)
 
     row_idx = 2
-    while row_idx <= new_matrix_ws.max_row:
+    max_row = new_matrix_ws.max_row
+    while row_idx <= max_row:
         a_val = new_matrix_ws.cell(row=row_idx, column=1).value
         if a_val:
             start_row = row_idx + 1
             end_row = start_row
-            while end_row <= new_matrix_ws.max_row:
+            while end_row <= max_row:
                 i_val = new_matrix_ws.cell(row=end_row, column=9).value
                 if i_val:
                     end_row += 1
@@ -166,12 +166,10 @@ def process_history_sheet(wb, ecu_col_indexes):
     for merged_range in original_merged_ranges:
         new_history_ws.merge_cells(str(merged_range))
 
+    styles = StyleCopier(COPIED_STYLES)
     for col_idx, orig_cell in enumerate(ws_history_orig[1], 1):
         new_cell = new_history_ws.cell(row=1, column=col_idx, value=orig_cell.value)
-        new_cell.font = copy(orig_cell.font)
-        new_cell.fill = copy(orig_cell.fill)
-        new_cell.border = copy(orig_cell.border)
-        new_cell.alignment = copy(orig_cell.alignment)
+        styles.copy(orig_cell, new_cell)
 
     for row_idx in range(new_history_ws.max_row, 2, -1):
         cell_value = new_history_ws.cell(row=row_idx, column=6).value
@@ -193,9 +191,23 @@ def identify_bus_users(df):
     ]
 
 
+@st.cache_data(show_spinner=False, max_entries=page_cache.MAX_ENTRIES)
+def export_ecu(file_hash: str, ecu: str, ecu_col_index: int, _uploaded_file):
+    """ECU workbook as xlsx bytes and whether the History sheet was found"""
+    ecu_col_indexes = {ecu: ecu_col_index}
+    wb = load_workbook(_uploaded_file)
+    process_matrix_sheet(wb, ecu_col_indexes)
+    history_found = process_history_sheet(wb, ecu_col_indexes)
+
+    excel_buffer = BytesIO()
+    wb.save(excel_buffer)
+    return excel_buffer.getvalue(), history_found
+
+
 if uploaded_file:
     try:
-        df = pd.read_excel(uploaded_file, sheet_name="Matrix")
+        file_hash = page_cache.file_key(uploaded_file)
+        df = page_cache.sheet(uploaded_file, "Matrix")
         bus_users = identify_bus_users(df)
 
         if not bus_users:
@@ -218,23 +230,19 @@ if uploaded_file:
             with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
                 for selected_ecu in selected_ecus:
                     date_str = datetime.now().strftime("%d%m%Y")
-                    ecu_list = [selected_ecu]
-                    ecu_col_indexes = {ecu: df.columns.get_loc(ecu) for ecu in ecu_list}
-
-                    wb = load_workbook(uploaded_file)
-                    process_matrix_sheet(wb, ecu_col_indexes)
-                    history_found = process_history_sheet(wb, ecu_col_indexes)
+                    ecu_xlsx, history_found = export_ecu(
+                        file_hash,
+                        selected_ecu,
+                        df.columns.get_loc(selected_ecu),
+                        uploaded_file,
+                    )
                     if not history_found:
                         st.warning(
                             f"🕱 'History' sheet not found in ECU {selected_ecu}."
                         )
 
-                    excel_buffer = BytesIO()
                     filename = f"ATOM_CAN_MATRIX_{selected_ecu}_{date_str}.xlsx"
-                    wb.save(excel_buffer)
-                    excel_buffer.seek(0)
-
-                    zip_file.writestr(filename, excel_buffer.getvalue())
+                    zip_file.writestr(filename, ecu_xlsx)
 
             zip_buffer.seek(0)
             zip_filename = f"ECU_Export_{datetime.now().strftime('%d%m%Y_%H%M%S')}.zip"
@@ -8,6 +8,7 @@ from datetime import datetime
 from io import BytesIO
 import json
 import itertools
+import page_cache
 
 
 def set_page_config():
@@ -31,15 +32,12 @@ def files_upload():
 
 def get_pd_data(uploaded_files):
     if uploaded_files:
-        pd_df_matrices = {}
-        # Для каждого файла получить пару: имя - датафрейм
+        can_matrices = {}
+        # Для каждого файла получить пару: имя - модель матрицы
         for file in uploaded_files:
-            df = pd.read_excel(file, sheet_name="Matrix")
-            message_id_column_name = df.columns[2]
-            df.dropna(subset=[message_id_column_name], inplace=True)
-            pd_df_matrices[file.name] = df
+            can_matrices[file.name] = page_cache.can_matrix(file)
 
-        return pd_df_matrices
+        return can_matrices
     return 0
 
 
@@ -98,72 +96,60 @@ def get_routing_table_template_path(input_path, output_path, uploaded_files):
     return 0
 
 
-def calculate_routing_table_data(pd_df_matrices, gateway):
-    if pd_df_matrices and gateway:
-        # Для хранения всех message_id для каждой матарицы
-        matrix_message_ids = {}
-        # Для хранения общих между парой матриц фреймов
-        source_target_common_ids = {}
+def get_gateway_messages(can_matrix, gateway, role):
+    # Сообщения, для которых шлюз имеет роль role (S/R)
+    gateway_nodes = [node for node in can_matrix.nodes if gateway in node]
+    if not gateway_nodes:
+        return None
+    messages = can_matrix.messages
+    return messages.loc[
+        can_matrix.roles[gateway_nodes[0]] == role, ["Msg Name", "Msg ID", "Frame ID"]
+    ]
+
+
+def calculate_routing_table_data(can_matrices, gateway):
+    if can_matrices and gateway:
         # Для хранения маршрутизируемых сообщений для каждой пары имен матриц
         routing_table_data = {}
-        # Получение id всех сообщений рассматриваемой матрицы
-        for matrix_name, pd_df_matrix in pd_df_matrices.items():
-            matrix_message_ids[matrix_name] = pd_df_matrix.iloc[:, 2]
         # Получение всех пар матриц для построения таблицы маршрутов
-        source_target_data = list(itertools.permutations(pd_df_matrices.keys(), 2))
+        source_target_data = list(itertools.permutations(can_matrices.keys(), 2))
         for source_taget in source_target_data:
             source = source_taget[0]
             target = source_taget[1]
-            # Получение общих сообщений для рассматриваемой пары матриц
-            routed_ids = pd.merge(
-                matrix_message_ids[source], matrix_message_ids[target], how="inner"
-            )
-            # Для каждой пары маттриц определяются id маршрутизируемых сообщений
-            source_target_common_ids[source_taget] = routed_ids
-            # Определяются сообщения маршрутизируемые из матрицы источника
-            source_matrix = pd_df_matrices[source]
-            message_id_column_name = source_matrix.columns[2]
-            source_gateway_column = source_matrix.filter(like=gateway).columns
+            # Определяются сообщения, принимаемые шлюзом в матрице источника
+            source_messages = get_gateway_messages(can_matrices[source], gateway, "R")
             # Проверка на наличие выбранного шлюза в ECU матрицы источника
-            if len(source_gateway_column) == 0:
+            if source_messages is None:
                 st.error(f"'{gateway}' not in '{source}'. Check gateway.")
                 st.stop()
-            routed_ids_list = routed_ids[message_id_column_name].tolist()
-            source_matrix_routed_messages = source_matrix[
-                (source_matrix[message_id_column_name].isin(routed_ids_list))
-                & (source_matrix[source_gateway_column[0]] == "R")
-            ]
-            # Определяются сообщения маршрутизируемые в целевую матрицу
-            target_matrix = pd_df_matrices[target]
-            message_id_column_name = target_matrix.columns[2]
-            target_gateway_column = target_matrix.filter(like=gateway).columns
+            # Определяются сообщения, отправляемые шлюзом в целевую матрицу
+            target_messages = get_gateway_messages(can_matrices[target], gateway, "S")
             # Проверка на наличие выбранного шлюза в ECU матрицы получателя
-            if len(target_gateway_column) == 0:
+            if target_messages is None:
                 st.error(f"'{gateway}' not in '{target}'. Check gateway.")
                 st.stop()
-            target_matrix_routed_messages = target_matrix[
-                (target_matrix[message_id_column_name].isin(routed_ids_list))
-                & (target_matrix[target_gateway_column[0]] == "S")
-            ]
-            # Определяются маршрутизируемые сообщения между данными матрицами
+            # Маршрутизируемые сообщения: одинаковые имя и id в обеих матрицах
             matrices_routed_messages = pd.merge(
-                source_matrix_routed_messages,
-                target_matrix_routed_messages,
+                source_messages.dropna(subset=["Frame ID"]),
+                target_messages[["Msg Name", "Frame ID"]],
+                on=["Msg Name", "Frame ID"],
                 how="inner",
             )
-            matrices_routed_messages = matrices_routed_messages[
-                [
-                    matrices_routed_messages.columns[0],
-                    matrices_routed_messages.columns[2],
-                ]
-            ]
             # Запись в словарь маршрутизируемых между данными матрицами сообщений по ключу рассматриваемой пары матриц
-            routing_table_data[source_taget] = matrices_routed_messages
+            routing_table_data[source_taget] = matrices_routed_messages[
+                ["Msg Name", "Msg ID"]
+            ]
 
         return routing_table_data
     return 0
 
 
+@st.cache_data(show_spinner=False, max_entries=page_cache.MAX_ENTRIES)
+def get_routing_table_data(uploaded_files_key, gateway, _can_matrices):
+    # Пересчет только при смене загруженных файлов или шлюза
+    return calculate_routing_table_data(_can_matrices, gateway)
+
+
 def generate_routing_table(routing_table_data, routing_table_template_path, gateway):
     if (routing_table_data) and (routing_table_template_path) and (gateway):
         generate_btn = st.button("Generate")
@@ -363,10 +349,13 @@ def main():
             f"routing_table_template{datetime.now().strftime("%Y_%m_%d")}.xlsx",
             uploaded_files,
         )
-        # Считать загруженные файлы в pandas датафреймы
-        pd_df_matrices = get_pd_data(uploaded_files)
+        # Считать загруженные файлы в модели матриц
+        can_matrices = get_pd_data(uploaded_files)
         # Обработать загруженные данные для получения данных для заполнения таблицы маршрутизации
-        routing_table_data = calculate_routing_table_data(pd_df_matrices, gateway)
+        uploaded_files_key = page_cache.files_key(uploaded_files) if uploaded_files else ()
+        routing_table_data = get_routing_table_data(
+            uploaded_files_key, gateway, can_matrices
+        )
         # Заполнить таблицу маршрутизации с требуемым форматированием
         routing_table = generate_routing_table(
             routing_table_data, routing_table_template_path, gateway
@@ -380,6 +380,10 @@ def main():
                                 f'<div class="success-box">Conversion completed successfully!</div>',
                                 unsafe_allow_html=True,
                             )
+                            # Несовпадения Protected ID с таблицей PID
+                            display_validation_results(
+                                [], converter.validation_warnings
+                            )
 
                             with open(custom_filename, "rb") as f:
                                 bytes_data = f.read()
@@ -1,5 +1,7 @@
 import streamlit as st
 import pandas as pd
+import page_cache
+from matrix_cache import matrix_cache
 from xlsx2dbc import ExcelToDBCConverter
 import os
 from datetime import datetime
@@ -134,7 +136,7 @@ def validate_input_data(uploaded_file):
     warnings = []
 
     try:
-        df = pd.read_excel(uploaded_file, sheet_name="Matrix")
+        df = page_cache.sheet(uploaded_file, "Matrix")
 
         required_columns = [
             "Msg ID\n报文标识符",
@@ -246,6 +248,11 @@ def validate_input_data(uploaded_file):
     return errors, warnings
 
 
+@st.cache_data(show_spinner=False, max_entries=page_cache.MAX_ENTRIES)
+def get_validation_result(file_hash: str, _uploaded_file):
+    return validate_input_data(_uploaded_file)
+
+
 def main():
     st.markdown(
         '<h1 class="title">📊 Excel to DBC Converter</h1>', unsafe_allow_html=True
@@ -263,7 +270,7 @@ def main():
 
         if uploaded_file is not None:
             try:
-                df = pd.read_excel(uploaded_file, sheet_name="Matrix")
+                df = page_cache.sheet(uploaded_file, "Matrix")
                 st.subheader("Data Preview")
                 st.dataframe(
                     df.head().style.set_properties(
@@ -275,7 +282,9 @@ def main():
                     )
                 )
 
-                errors, warnings = validate_input_data(uploaded_file)
+                errors, warnings = get_validation_result(
+                    page_cache.file_key(uploaded_file), uploaded_file
+                )
                 display_errors(errors)
                 display_warnings(warnings)
 
@@ -322,7 +331,9 @@ def main():
             if st.button("Convert to DBC", key="convert_button"):
                 with st.spinner("Converting... Please wait"):
                     try:
-                        converter = ExcelToDBCConverter(uploaded_file)
+                        converter = ExcelToDBCConverter(
+                            uploaded_file, matrix_cache.workbook(uploaded_file)
+                        )
                         success = converter.convert(custom_filename)
 
                         if success:
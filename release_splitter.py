@@ -0,0 +1,293 @@
+import os
+import time
+import traceback
+import multiprocessing
+import concurrent.futures
+from io import BytesIO
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+from matrix_loader import MatrixWorkbook
+from style_copier import StyleCopier
+from xlsx2dbcForRelease import ExcelToDBCConverter
+
+# Parsed domain workbook of the current worker process, see init_worker
+_domain_bytes: Optional[bytes] = None
+_domain_wb = None
+# ECU workbook templates by ECU column layout, see build_ecu_template
+_templates: Dict[Tuple[int, ...], bytes] = {}
+
+
+class EcuJob(NamedTuple):
+    ecu_name: str
+    matrix_rows: List[int]  # domain Matrix rows, see matrix_rows_by_ecu
+    history_rows: List[int]  # domain History rows, see history_rows_by_ecu
+    ecu_col_index: Dict[str, int]
+    xlsx_path: str
+    dbc_path: str
+    matrix: pd.DataFrame  # the same rows as DataFrames, for the DBC stage
+    history: pd.DataFrame
+
+
+def matrix_rows_by_ecu(
+    df_matrix: pd.DataFrame, ecus: List[str]
+) -> Dict[str, List[int]]:
+    """Matrix rows (DataFrame index) every ECU takes part in, -1 is the header"""
+    return {
+        ecu_name: [-1] + df_matrix[df_matrix[ecu_name].notna()].index.tolist()
+        for ecu_name in ecus
+    }
+
+
+def prepare_history(df_history: pd.DataFrame) -> pd.DataFrame:
+    """History sheet with the real header row (the first row is the title)"""
+    df = df_history.copy()
+    df.columns = df.iloc[0]
+    return df.drop(0).reset_index(drop=True)
+
+
+def ecu_frames(
+    df_matrix: pd.DataFrame,
+    df_history_raw: pd.DataFrame,
+    matrix_rows: List[int],
+    history_rows: List[int],
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Matrix and History sheets of an ECU as they read back from its saved xlsx"""
+    matrix = df_matrix.loc[matrix_rows[1:]].reset_index(drop=True)
+    # The raw History frame still has the column header as its first row
+    history = df_history_raw.iloc[[0] + [row + 1 for row in history_rows[1:]]]
+    return matrix, history.reset_index(drop=True)
+
+
+def history_rows_by_ecu(
+    df_history: pd.DataFrame, ecus: List[str]
+) -> Dict[str, List[int]]:
+    """History rows (prepared DataFrame index) mentioning every ECU"""
+    rows = {}
+    for ecu_name in ecus:
+        mask = df_history["ECU\n节点"].notna() & df_history["ECU\n节点"].str.contains(
+            ecu_name, case=True
+        )
+        rows[ecu_name] = [-1] + df_history[mask].index.tolist()
+    return rows
+
+
+def init_worker(domain_bytes: bytes, templates: Dict[Tuple[int, ...], bytes]):
+    """Every worker process parses its own copy of the domain workbook once"""
+    global _domain_bytes, _domain_wb
+    _domain_bytes = domain_bytes
+    _domain_wb = load_workbook(BytesIO(domain_bytes))
+    _templates.update(templates)
+
+
+def build_ecu_template(domain_bytes: bytes, ecu_col_index: Dict[str, int]) -> bytes:
+    """Domain workbook without its Matrix/History data, saved once for all ECUs.
+
+    Keeps the remaining sheets (Cover, Legend, ...) and the Matrix column
+    widths, ECU columns are narrowed to 2.
+    """
+    ecu_wb = load_workbook(BytesIO(domain_bytes))
+    matrix_ws_with_data = ecu_wb["Matrix"]
+    history_ws_with_data = ecu_wb["History"]
+    ecu_wb.remove(matrix_ws_with_data)
+    ecu_wb.remove(history_ws_with_data)
+    ecu_wb.create_sheet("Matrix")
+    ecu_wb.create_sheet("History")
+
+    # Сохранить ширину столбцов
+    ecu_columns = set(ecu_col_index.values())
+    for col_idx in range(1, max(50, matrix_ws_with_data.max_column) + 1):
+        if col_idx in ecu_columns:
+            ecu_wb["Matrix"].column_dimensions[get_column_letter(col_idx + 1)].width = 2
+        else:
+            col_dimension = matrix_ws_with_data.column_dimensions[
+                get_column_letter(col_idx)
+            ].width
+            ecu_wb["Matrix"].column_dimensions[
+                get_column_letter(col_idx)
+            ].width = col_dimension
+
+    template = BytesIO()
+    ecu_wb.save(template)
+    return template.getvalue()
+
+
+def get_ecu_matrix_template(ecu_col_index: Dict[str, int]):
+    """Fresh ECU workbook, loaded from the small template of the worker"""
+    key = tuple(sorted(ecu_col_index.values()))
+    if key not in _templates:
+        _templates[key] = build_ecu_template(_domain_bytes, ecu_col_index)
+    return load_workbook(BytesIO(_templates[key]))
+
+
+def copy_cell(source_cell, target_cell, styles: StyleCopier):
+    target_cell.value = source_cell.value
+    if source_cell.has_style:
+        styles.copy(source_cell, target_cell)
+
+
+def copy_matrix_rows(
+    domain_ws, ecu_ws_matrix, row_list_to_copy: List[int], styles: StyleCopier
+):
+    """Copy the ECU rows of the domain Matrix sheet and group signals under messages"""
+    max_column = domain_ws.max_column
+    row_to_paste = 1
+    for row_idx in row_list_to_copy:
+        for col_idx in range(1, max_column + 1):
+            copy_cell(
+                domain_ws.cell(row=row_idx + 2, column=col_idx),
+                ecu_ws_matrix.cell(row=row_to_paste, column=col_idx),
+                styles,
+            )
+        row_to_paste += 1
+
+    # Group rows by messages
+    # max_row scans every cell of the sheet, look it up once
+    row_idx = 2
+    max_row = ecu_ws_matrix.max_row
+    while row_idx <= max_row:
+        a_val = ecu_ws_matrix.cell(row=row_idx, column=1).value
+        ecu_ws_matrix.row_dimensions[row_idx].height = 20
+        if a_val:
+            start_row = row_idx + 1
+            end_row = start_row
+            while end_row <= max_row:
+                i_val = ecu_ws_matrix.cell(row=end_row, column=9).value
+                if i_val:
+                    end_row += 1
+                else:
+                    break
+            if end_row > start_row:
+                for r in range(start_row, end_row):
+                    ecu_ws_matrix.row_dimensions[r].outlineLevel = 1
+                    ecu_ws_matrix.row_dimensions[r].hidden = True
+                ecu_ws_matrix.row_dimensions[row_idx].collapsed = True
+            row_idx = end_row
+        else:
+            row_idx += 1
+
+
+def copy_history_rows(
+    domain_ws, history_ws_matrix, row_list_to_copy: List[int], styles: StyleCopier
+):
+    """Copy the title and the History rows that mention the ECU"""
+    max_column = domain_ws.max_column
+
+    history_ws_matrix.merge_cells("A1:G1")
+    copy_cell(
+        domain_ws.cell(row=1, column=1),
+        history_ws_matrix.cell(row=1, column=1),
+        styles,
+    )
+
+    row_to_paste = 2
+    for row_idx in row_list_to_copy:
+        actual_row = row_idx + 3
+        for col_idx in range(1, max_column + 1):
+            copy_cell(
+                domain_ws.cell(row=actual_row, column=col_idx),
+                history_ws_matrix.cell(row=row_to_paste, column=col_idx),
+                styles,
+            )
+        history_ws_matrix.row_dimensions[row_to_paste].height = 15
+        row_to_paste += 1
+
+
+def write_ecu_xlsx(job: EcuJob) -> Tuple[str, Optional[float], str]:
+    """Build and save one ECU workbook inside a worker process.
+
+    Returns (ecu_name, save_time, xlsx_path_or_error)
+    """
+    try:
+        ecu_wb = get_ecu_matrix_template(job.ecu_col_index)
+        # One style cache per ECU workbook, shared by both sheets
+        styles = StyleCopier()
+        copy_matrix_rows(
+            _domain_wb["Matrix"], ecu_wb["Matrix"], job.matrix_rows, styles
+        )
+        if "History" in _domain_wb.sheetnames:
+            copy_history_rows(
+                _domain_wb["History"], ecu_wb["History"], job.history_rows, styles
+            )
+
+        os.makedirs(os.path.dirname(job.xlsx_path), exist_ok=True)
+        save_time_start = time.time()
+        ecu_wb.save(job.xlsx_path)
+        return (job.ecu_name, time.time() - save_time_start, job.xlsx_path)
+    except Exception as e:
+        print(f"❌ Ошибка при обработке ECU {job.ecu_name}:")
+        traceback.print_exc()
+        return (job.ecu_name, None, f"Exception: {repr(e)}")
+
+
+def write_ecu_dbc(job: EcuJob) -> Tuple[str, Optional[float], str]:
+    """Convert the in-memory ECU rows to DBC, the xlsx is never read back.
+
+    Returns (ecu_name, dbc_time, dbc_path_or_error)
+    """
+    try:
+        os.makedirs(os.path.dirname(job.dbc_path), exist_ok=True)
+        dbc_time_start = time.time()
+        workbook = MatrixWorkbook.from_frames(
+            job.xlsx_path, {"Matrix": job.matrix, "History": job.history}
+        )
+        if not ExcelToDBCConverter(job.xlsx_path, workbook).convert(job.dbc_path):
+            return (job.ecu_name, None, "DBC conversion failed")
+        return (job.ecu_name, time.time() - dbc_time_start, job.dbc_path)
+    except Exception as e:
+        print(f"❌ Ошибка при конвертации ECU {job.ecu_name} в DBC:")
+        traceback.print_exc()
+        return (job.ecu_name, None, f"Exception: {repr(e)}")
+
+
+def split_domain(
+    domain_bytes: bytes, jobs: List[EcuJob], workers: Optional[int] = None
+) -> Iterator[Tuple]:
+    """Write the xlsx and the DBC of every ECU as independent tasks on a process
+    pool. Yields (ecu_name, save_time, dbc_time, xlsx_path, dbc_path_or_error)
+    once both stages of an ECU are done.
+
+    The ECU workbook template is built here once per column layout (in
+    practice once per domain) and shipped to the workers as bytes, so the
+    full domain workbook is not parsed again for every ECU.
+
+    Workers are spawned rather than forked so the pool behaves the same on
+    Windows and inside the multi-threaded Streamlit server.
+    """
+    if not jobs:
+        return
+    templates = {}
+    for job in jobs:
+        key = tuple(sorted(job.ecu_col_index.values()))
+        if key not in templates:
+            templates[key] = build_ecu_template(domain_bytes, job.ecu_col_index)
+
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=min(workers or os.cpu_count(), 2 * len(jobs)),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(domain_bytes, templates),
+    ) as executor:
+        futures = {}
+        for job in jobs:
+            futures[executor.submit(write_ecu_xlsx, job)] = (job.ecu_name, "xlsx")
+            futures[executor.submit(write_ecu_dbc, job)] = (job.ecu_name, "dbc")
+
+        done = {}
+        for future in concurrent.futures.as_completed(futures):
+            ecu_name, stage = futures[future]
+            try:
+                done[(ecu_name, stage)] = future.result()
+            except Exception as e:
+                done[(ecu_name, stage)] = (ecu_name, None, f"Exception: {repr(e)}")
+
+            if (ecu_name, "xlsx") in done and (ecu_name, "dbc") in done:
+                _, save_time, xlsx_path = done.pop((ecu_name, "xlsx"))
+                _, dbc_time, dbc_path = done.pop((ecu_name, "dbc"))
+                if save_time is None:
+                    yield (ecu_name, None, dbc_time, None, xlsx_path)
+                else:
+                    yield (ecu_name, save_time, dbc_time, xlsx_path, dbc_path)
@@ -0,0 +1,148 @@
+"""Bit occupancy of CAN signal layouts.
+
+Every signal is expanded into the bits it occupies, numbered like DBC start
+bits (byte * 8 + bit in byte, bit 7 is the MSB of a byte):
+
+    Intel          start is the LSB, the signal runs up through the bits
+    Motorola MSB   start is the MSB, the signal runs down inside a byte and
+                   continues at bit 7 of the next byte
+
+The bits of all messages go into one occupancy count, so overlaps, unused
+bits and bits outside the frame are found for the whole matrix in one pass.
+Byte orders other than "Motorola MSB" are laid out as Intel, like
+xlsx2dbc.py encodes them.
+"""
+
+from typing import NamedTuple, Tuple
+
+import numpy as np
+import pandas as pd
+
+MOTOROLA = "Motorola MSB"
+
+
+class Layout(NamedTuple):
+    overlaps: pd.DataFrame  # Message, Signal, Other Signal, Bits
+    outside: pd.DataFrame  # Message, Signal, Bits
+    gaps: pd.DataFrame  # Message, Unused Bits, Count
+
+
+def signal_bits(
+    start_bits: np.ndarray, lengths: np.ndarray, motorola: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(signal position, bit number) of every bit of every signal"""
+    lengths = np.maximum(lengths.astype(np.int64), 0)
+    starts = start_bits.astype(np.int64)
+    owners = np.repeat(np.arange(len(lengths)), lengths)
+    offsets = np.arange(len(owners)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+    # Motorola bits are counted MSB first, byte after byte ("sawtooth")
+    sawtooth = starts // 8 * 8 + 7 - starts % 8
+    bits = np.where(
+        motorola[owners],
+        (sawtooth[owners] + offsets) // 8 * 8 + 7 - (sawtooth[owners] + offsets) % 8,
+        starts[owners] + offsets,
+    )
+    return owners, bits
+
+
+def _grouped_ranges(groups: np.ndarray, bits: np.ndarray) -> Tuple[np.ndarray, list]:
+    """Bits of every group as "0-7, 12, 40-63", input sorted by group and bit.
+    Returns the groups in order and their texts."""
+    if not len(groups):
+        return groups, []
+    new_group = np.r_[True, groups[1:] != groups[:-1]]
+    starts = np.flatnonzero(new_group | np.r_[True, np.diff(bits) != 1])
+    firsts = bits[starts].tolist()
+    lasts = bits[np.r_[starts[1:], len(bits)] - 1].tolist()
+
+    texts = []
+    for opens_group, first, last in zip(new_group[starts], firsts, lasts):
+        run = str(first) if first == last else f"{first}-{last}"
+        if opens_group:
+            texts.append([run])
+        else:
+            texts[-1].append(run)
+    return groups[new_group], [", ".join(runs) for runs in texts]
+
+
+def check_layout(
+    messages: pd.Series,
+    signals: pd.Series,
+    start_bits: pd.Series,
+    lengths: pd.Series,
+    byte_orders: pd.Series,
+    msg_lengths: pd.Series,
+) -> Layout:
+    """Overlapping signals, bits outside the frame and unused bits of every
+    message. One row per signal, the message columns filled on every row.
+    Rows without a start bit, length or message length are skipped."""
+    start_bits = pd.to_numeric(start_bits, errors="coerce").to_numpy(dtype=float)
+    lengths = pd.to_numeric(lengths, errors="coerce").to_numpy(dtype=float)
+    msg_lengths = pd.to_numeric(msg_lengths, errors="coerce").to_numpy(dtype=float)
+    valid = ~(np.isnan(start_bits) | np.isnan(lengths) | np.isnan(msg_lengths))
+    valid &= messages.notna().to_numpy()
+
+    message_names = messages.to_numpy(dtype=object)[valid]
+    signal_names = signals.to_numpy(dtype=object)[valid]
+    codes, uniques = pd.factorize(message_names)
+    frame_bits = np.zeros(len(uniques), dtype=np.int64)
+    np.maximum.at(frame_bits, codes, msg_lengths[valid].astype(np.int64) * 8)
+    width = int(frame_bits.max(initial=0))
+
+    owners, bits = signal_bits(
+        start_bits[valid],
+        lengths[valid],
+        (byte_orders.to_numpy(dtype=object) == MOTOROLA)[valid],
+    )
+    inside = (bits >= 0) & (bits < frame_bits[codes[owners]])
+
+    keys = codes[owners[inside]] * width + bits[inside]
+    counts = np.bincount(keys, minlength=len(uniques) * width)
+
+    # Signal pairs sharing a bit, with all bits they share
+    shared = counts[keys] > 1
+    bits_of = pd.DataFrame({"key": keys[shared], "owner": owners[inside][shared]})
+    pairs = bits_of.merge(bits_of, on="key")
+    pairs = pairs[pairs["owner_x"] < pairs["owner_y"]]
+    pair_codes = pairs["owner_x"].to_numpy() * len(owners) + pairs["owner_y"].to_numpy()
+    pair_bits = pairs["key"].to_numpy() % max(width, 1)
+    order = np.lexsort((pair_bits, pair_codes))
+    pair_codes, texts = _grouped_ranges(pair_codes[order], pair_bits[order])
+    first, second = np.divmod(pair_codes, max(len(owners), 1))
+    overlaps = pd.DataFrame(
+        {
+            "Message": message_names[first],
+            "Signal": signal_names[first],
+            "Other Signal": signal_names[second],
+            "Bits": texts,
+        },
+        columns=["Message", "Signal", "Other Signal", "Bits"],
+    )
+
+    order = np.lexsort((bits[~inside], owners[~inside]))
+    outside_owners, texts = _grouped_ranges(
+        owners[~inside][order], bits[~inside][order]
+    )
+    outside = pd.DataFrame(
+        {
+            "Message": message_names[outside_owners],
+            "Signal": signal_names[outside_owners],
+            "Bits": texts,
+        },
+        columns=["Message", "Signal", "Bits"],
+    )
+
+    unused = counts.reshape(len(uniques), width) == 0
+    unused &= np.arange(width) < frame_bits[:, None]
+    gap_rows, gap_bits = np.nonzero(unused)
+    gap_messages, texts = _grouped_ranges(gap_rows, gap_bits)
+    gaps = pd.DataFrame(
+        {
+            "Message": uniques[gap_messages],
+            "Unused Bits": texts,
+            "Count": unused.sum(axis=1)[gap_messages],
+        },
+        columns=["Message", "Unused Bits", "Count"],
+    )
+    return Layout(overlaps, outside, gaps)
@@ -0,0 +1,54 @@
+from copy import copy
+from typing import Dict, Iterable, Tuple
+
+from openpyxl.styles.cell_style import StyleArray
+
+# Cell style attribute -> id field of the cell's StyleArray
+STYLE_IDS = {
+    "font": "fontId",
+    "border": "borderId",
+    "fill": "fillId",
+    "number_format": "numFmtId",
+    "protection": "protectionId",
+    "alignment": "alignmentId",
+}
+
+
+class StyleCopier:
+    """Copies cell styles into one target workbook, interning every distinct
+    source style once.
+
+    The first cell with a given source style is styled the usual way, by
+    copying its font, border, ... objects into the target workbook. The style
+    ids this produces in the target are cached and simply assigned to every
+    later cell with the same source style, so no style objects are created or
+    hashed per cell. Use one copier per source/target workbook pair.
+    """
+
+    def __init__(self, attributes: Iterable[str] = tuple(STYLE_IDS)):
+        self.attributes = tuple(attributes)
+        self.fields = tuple(STYLE_IDS[attribute] for attribute in self.attributes)
+        self._styles: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+    def copy(self, source_cell, target_cell):
+        key = tuple(source_cell._style or ())
+        style_ids = self._styles.get(key)
+        if style_ids is None:
+            for attribute in self.attributes:
+                setattr(target_cell, attribute, copy(getattr(source_cell, attribute)))
+            style_ids = tuple(
+                getattr(target_cell._style, field) for field in self.fields
+            )
+            self._styles[key] = style_ids
+            return
+
+        target_style = target_cell._style
+        if target_style is None:  # a fresh cell has no style array yet
+            target_style = target_cell._style = StyleArray()
+        for field, style_id in zip(self.fields, style_ids):
+            setattr(target_style, field, style_id)
+
+    @property
+    def style_count(self) -> int:
+        """Distinct source styles seen so far"""
+        return len(self._styles)
@@ -0,0 +1,170 @@
+"""Headless validation of CAN and LIN matrices.
+
+Runs can_rules and lin_rules, the rule sets pages/CANValidator.py and
+pages/LINValidator.py show, without Streamlit, one matrix per worker
+process, and writes the findings as JSON and/or CSV:
+
+    python validate_matrix.py "release/*.xlsx" --json report.json --csv report.csv
+
+Exit codes, for gating a pipeline:
+
+    0  every matrix passed
+    1  at least one matrix has errors (or warnings with --strict)
+    2  no matrix found, or a matrix could not be read
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+import can_rules
+import lin_rules
+from file_info import parse_file_name
+from matrix_cache import matrix_cache
+from matrix_loader import find_matrix_files
+from xlsx2dbc import positive_int
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_UNREADABLE = 2
+
+# Column only LIN matrices have, used when the file name tells nothing
+LIN_COLUMN = "Protected ID (hex)\n保护标识符"
+
+CSV_COLUMNS = ["File", "Protocol"] + can_rules.ERROR_COLUMNS
+
+
+def detect_protocol(file_path: str, sheet: pd.DataFrame) -> str:
+    """CAN, CANFD or LIN, from the file name or else from the sheet columns"""
+    info = parse_file_name(file_path, lin=True)
+    if info is not None:
+        return info.protocol
+    return "LIN" if LIN_COLUMN in sheet.columns else "CAN"
+
+
+def validate_file(file_path: str) -> Dict:
+    """Findings of one matrix as a plain dict, safe to send between processes"""
+    start = time.perf_counter()
+    result = {"file": file_path, "protocol": None, "status": "ok", "message": ""}
+    try:
+        sheet = matrix_cache.sheet(file_path, "Matrix")
+        protocol = detect_protocol(file_path, sheet)
+        if protocol == "LIN":
+            errors = lin_rules.validate(lin_rules.signal_table(sheet))
+        else:
+            errors = can_rules.validate(matrix_cache.can_matrix(file_path).signals)
+        result["protocol"] = protocol
+        result["findings"] = (
+            errors.astype(object).where(errors.notna(), None).to_dict("records")
+        )
+    except Exception as e:
+        result["status"] = "unreadable"
+        result["message"] = str(e)
+        result["findings"] = []
+
+    severity = pd.Series([f["Severity"] for f in result["findings"]], dtype=object)
+    result["errors"] = int((severity == "error").sum())
+    result["warnings"] = int((severity == "warning").sum())
+    if result["status"] == "ok" and result["errors"]:
+        result["status"] = "failed"
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def validate_batch(files: List[str], workers: Optional[int] = None) -> List[Dict]:
+    """Validate every matrix on a process pool, results keep the input order"""
+    if not files:
+        return []
+    workers = min(workers or os.cpu_count(), len(files))
+    if workers == 1:
+        return [validate_file(file_path) for file_path in files]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(validate_file, files))
+
+
+def exit_code(results: List[Dict], strict: bool = False) -> int:
+    if not results or any(r["status"] == "unreadable" for r in results):
+        return EXIT_UNREADABLE
+    if any(r["errors"] or (strict and r["warnings"]) for r in results):
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def write_json(results: List[Dict], path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def write_csv(results: List[Dict], path: str):
+    rows = [
+        {"File": r["file"], "Protocol": r["protocol"], **finding}
+        for r in results
+        for finding in r["findings"]
+    ]
+    # utf-8-sig so Excel opens the Chinese/Unicode text correctly
+    pd.DataFrame(rows, columns=CSV_COLUMNS).to_csv(
+        path, index=False, encoding="utf-8-sig"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Validate CAN/LIN matrices without the Streamlit UI"
+    )
+    parser.add_argument(
+        "inputs", nargs="+", help="Excel-files, directories or globs of matrices"
+    )
+    parser.add_argument("--json", help="Write all findings to this JSON file")
+    parser.add_argument("--csv", help="Write all findings to this CSV file")
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        default=None,
+        help="Worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--strict", action="store_true", help="Fail on warnings as well as errors"
+    )
+    args = parser.parse_args()
+
+    files = []
+    for pattern in args.inputs:
+        found = [pattern] if os.path.isfile(pattern) else find_matrix_files(pattern)
+        files.extend(f for f in found if f not in files)
+    if not files:
+        print(f"No Excel-files found for {' '.join(args.inputs)}")
+        raise SystemExit(EXIT_UNREADABLE)
+
+    start = time.perf_counter()
+    results = validate_batch(files, args.workers)
+    total = time.perf_counter() - start
+
+    for r in results:
+        status = {"ok": "OK  ", "failed": "FAIL", "unreadable": "ERR "}[r["status"]]
+        print(
+            f"{status} {r['seconds']:7.2f}s  {r['file']} ({r['protocol'] or '?'}): "
+            f"{r['errors']} errors, {r['warnings']} warnings {r['message']}".rstrip()
+        )
+
+    if args.json:
+        write_json(results, args.json)
+    if args.csv:
+        write_csv(results, args.csv)
+
+    failed = sum(
+        1 for r in results if r["status"] != "ok" or (args.strict and r["warnings"])
+    )
+    print(
+        f"{len(results) - failed}/{len(results)} passed, {failed} failed, "
+        f"{total:.2f}s total"
+    )
+    raise SystemExit(exit_code(results, args.strict))
+
+
+if __name__ == "__main__":
+    main()
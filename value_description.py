@@ -0,0 +1,123 @@
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# "0x1: text" or "0x2~0xFF: text"
+ENTRY_PATTERN = re.compile(r"(0x[0-9a-fA-F]+)(?:\s*~\s*(0x[0-9a-fA-F]+))?\s*:\s*")
+TEXT_CLEANUP_PATTERN = re.compile(r"[^a-zA-Z0-9_\- ]")
+
+# Ranges wider than this are written to a DBC as their two end points only,
+# so "0x0~0xFFFF: Reserved" no longer turns into 65k VAL_ entries
+MAX_RANGE_EXPANSION = 256
+
+
+class ValueRange(NamedTuple):
+    start: int
+    end: int
+    text: str
+    start_hex: str
+    end_hex: str
+
+
+class ValueDescriptions(NamedTuple):
+    """Parsed description: single values plus ranges that are kept unexpanded"""
+
+    points: Tuple[Tuple[int, str], ...]
+    ranges: Tuple[ValueRange, ...]
+
+
+class ValueDescriptionParser:
+    @staticmethod
+    def parse(desc_str: str) -> Optional[ValueDescriptions]:
+        """Parse multi-line hex descriptions into the compact representation"""
+        if not isinstance(desc_str, str) or not desc_str.strip():
+            return None
+        return _parse(desc_str)
+
+    @staticmethod
+    def to_dbc(
+        desc_str: str, max_range_expansion: int = MAX_RANGE_EXPANSION
+    ) -> Optional[Dict[int, str]]:
+        """Choices for a DBC signal. VAL_ has no range syntax, so ranges are
+        expanded value by value up to max_range_expansion entries."""
+        if not isinstance(desc_str, str) or not desc_str.strip():
+            return None
+        return _to_dbc(desc_str, max_range_expansion)
+
+    @staticmethod
+    def to_ldf(desc_str: str) -> Optional[Dict[int, str]]:
+        """Logical values for a LDF encoding type, one entry per range"""
+        if not isinstance(desc_str, str) or not desc_str.strip():
+            return None
+        return _to_ldf(desc_str)
+
+
+@lru_cache(maxsize=4096)
+def _parse(desc_str: str) -> Optional[ValueDescriptions]:
+    desc_str = " ".join(desc_str.replace("\r", "\n").split())
+    matches = list(ENTRY_PATTERN.finditer(desc_str))
+
+    points = {}
+    ranges = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(desc_str)
+        text = desc_str[match.end() : end].split(";")[0].strip()
+
+        if match.group(2):
+            ranges.append(
+                ValueRange(
+                    int(match.group(1), 16),
+                    int(match.group(2), 16),
+                    text,
+                    match.group(1),
+                    match.group(2),
+                )
+            )
+        else:
+            text = TEXT_CLEANUP_PATTERN.sub("", text)
+            if text:
+                points[int(match.group(1), 16)] = text
+
+    if not points and not ranges:
+        return None
+    return ValueDescriptions(tuple(sorted(points.items())), tuple(ranges))
+
+
+# The emitters are cached per description string and hand out shared dicts,
+# copy before modifying one
+@lru_cache(maxsize=1024)
+def _to_dbc(desc_str: str, max_range_expansion: int) -> Optional[Dict[int, str]]:
+    parsed = _parse(desc_str)
+    if parsed is None:
+        return None
+
+    descriptions = dict(parsed.points)
+    for value_range in parsed.ranges:
+        if not value_range.text:
+            continue
+        if value_range.end - value_range.start + 1 > max_range_expansion:
+            descriptions[value_range.start] = value_range.text
+            descriptions[value_range.end] = value_range.text
+        else:
+            for value in range(value_range.start, value_range.end + 1):
+                descriptions[value] = value_range.text
+
+    return dict(sorted(descriptions.items())) if descriptions else None
+
+
+@lru_cache(maxsize=1024)
+def _to_ldf(desc_str: str) -> Optional[Dict[int, str]]:
+    parsed = _parse(desc_str)
+    if parsed is None:
+        return None
+
+    descriptions = {
+        value_range.start: (
+            f"{value_range.start_hex}~{value_range.end_hex}, {value_range.text}"
+        )
+        for value_range in parsed.ranges
+    }
+    for value, text in parsed.points:
+        descriptions.setdefault(value, text)
+
+    return dict(sorted(descriptions.items())) if descriptions else None
@@ -5,74 +5,29 @@ from cantools.database.can.formats.arxml.message_specifics import (
 from cantools.database.can.formats.arxml.node_specifics import AutosarNodeSpecifics
 import cantools.database
 import cantools.database.conversion
+import numpy as np
 import pandas as pd
 from cantools.database.can.formats.dbc import DbcSpecifics
 from cantools.database.can.attribute import Attribute
 from cantools.database.can.attribute_definition import AttributeDefinition
 from cantools.database.can import Node
-import re
 import os
 import argparse
-from typing import Optional, Dict
+from typing import Optional, List
+from can_matrix import CanMatrix
+from matrix_loader import MatrixWorkbook, find_bus_users
+from file_info import MatrixFileInfo, file_info_dict, parse_file_name
+from value_description import ValueDescriptionParser
 
-
-class ValueDescriptionParser:
-    @staticmethod
-    def parse(desc_str: str) -> Optional[Dict[int, str]]:
-        """Convert multi-line hex descriptions to single-line decimal format"""
-        if not isinstance(desc_str, str) or not desc_str.strip():
-            return None
-
-        descriptions = {}
-        try:
-            desc_str = " ".join(desc_str.replace("\r", "\n").split())
-            parts = re.split(r"(0x[0-9a-fA-F]+)\s*:\s*", desc_str)
-            if len(parts) > 1:
-                for i in range(1, len(parts), 2):
-                    hex_val = parts[i]
-                    text = parts[i + 1].split(";")[0].split("~")[0].strip()
-                    text = re.sub(r"[^a-zA-Z0-9_\- ]", "", text)
-                    if hex_val and text:
-                        try:
-                            dec_val = int(hex_val, 16)
-                            descriptions[dec_val] = text
-                        except ValueError:
-                            continue
-            else:
-                for item in desc_str.split(";"):
-                    item = item.strip()
-                    if ":" in item:
-                        val_part, text = item.split(":", 1)
-                        val_part = val_part.strip()
-                        text = text.strip()
-                        if val_part.startswith("0x"):
-                            try:
-                                dec_val = int(val_part, 16)
-                                descriptions[dec_val] = text
-                            except ValueError:
-                                continue
-
-            range_matches = re.finditer(
-                r"(0x[0-9a-fA-F]+)\s*~\s*(0x[0-9a-fA-F]+)\s*:\s*([^;]+)", desc_str
-            )
-            for match in range_matches:
-                start = int(match.group(1), 16)
-                end = int(match.group(2), 16)
-                text = match.group(3).strip()
-                for val in range(start, end + 1):
-                    descriptions[val] = text
-
-            return dict(sorted(descriptions.items())) if descriptions else None
-
-        except Exception as e:
-            print(f"Error parsing value descriptions '{desc_str}': {str(e)}")
-            return None
+_NAN_KEY = object()
 
 
 class ExcelToDBCConverter:
 
-    def __init__(self, excel_path: str):
+    def __init__(self, excel_path: str, workbook: Optional[MatrixWorkbook] = None):
+        """workbook: already loaded sheets, excel_path then only names the DBC"""
         self.excel_path = excel_path
+        self.file_info: MatrixFileInfo = parse_file_name(excel_path)
         self.diag_messages = []  # For diagnostic messages (0x7...)
         self.nm_messages = []  # For network management messages (0x5...)
         self.normal_messages = []  # For normal messages
@@ -86,7 +41,7 @@ class ExcelToDBCConverter:
         )
 
         self.db = cantools.database.can.Database(
-            version=ExcelToDBCConverter.get_file_info(excel_path)["version"],
+            version=self.file_info.version,
             sort_signals=None,
             strict=False,
         )
@@ -98,27 +53,17 @@ class ExcelToDBCConverter:
                     definition=self.attr_def_dbname,
                 ),
                 "BusType": Attribute(
-                    value=ExcelToDBCConverter.get_file_info(excel_path)[
-                        "protocol"
-                    ],
+                    value=self.file_info.protocol,
                     definition=self.attr_def_bus_type,
                 ),
             }
         )
 
-        df = pd.read_excel(
-            self.excel_path,
-            sheet_name="Matrix",
-            keep_default_na=True,
-            engine="openpyxl",
-        )
+        self.workbook = workbook or MatrixWorkbook(self.excel_path)
+        df = self.workbook.matrix
 
-        self.bus_users = [
-            col
-            for col in df.columns
-            if any(val in ["S", "R"] for val in df[col].dropna().unique())
-            and col != "Unit\n单位"
-        ]
+        self.bus_users = find_bus_users(df)
+        self.can_matrix = CanMatrix.from_sheet(df, self.bus_users)
 
         self._initialize_nodes()
         self._initialize_attr()
@@ -404,263 +349,211 @@ class ExcelToDBCConverter:
         )
 
     def _load_excel_data(self) -> pd.DataFrame:
-        df = pd.read_excel(
-            self.excel_path,
-            sheet_name="Matrix",
-            keep_default_na=True,
-            engine="openpyxl",
-        )
-
-        df_history = pd.read_excel(
-            self.excel_path,
-            sheet_name="History",
-            keep_default_na=True,
-            engine="openpyxl",
-        )
+        df_history = self.workbook.history
 
         all_revisions = df_history["Revision Management\n版本管理"].apply(
             lambda x: x.split("版本")[-1] if pd.notna(x) else x
         )
 
-        df_history = df_history.reindex(df.index)
-
-        senders = []
-        receivers = []
-
-        for _, row in df.iterrows():
-            row_senders = []
-            row_receivers = []
+        return self.can_matrix.dbc_signals(), all_revisions
+
+    SIGNAL_SEND_TYPES = {
+        "Cyclic": 0,
+        "OnChange": 1,
+        "OnWrite": 2,
+        "IfActive": 3,
+        "OnChangeWithRepetition": 4,
+        "OnWriteWithRepetition": 5,
+        "IfActiveWithRepetition": 6,
+        "NoSigSendType": 7,
+        "OnChangeAndIfActive": 8,
+        "OnChangeAndIfActiveWithRepetition": 9,
+        "CA": 10,
+        "CE": 11,
+        "Event": 12,
+    }
 
-            for bus_user in self.bus_users:
-                if bus_user in df.columns:
-                    if pd.notna(row[bus_user]) and row[bus_user] == "S":
-                        row_senders.append(bus_user)
-                    elif pd.notna(row[bus_user]) and row[bus_user] == "R":
-                        row_receivers.append(bus_user)
-
-            senders.append(",".join(row_senders) if row_senders else "Vector__XXX")
-            receivers.append(
-                ",".join(row_receivers) if row_receivers else "Vector__XXX"
-            )
-
-        df["Msg Cycle Time (ms)\n报文周期时间"] = (
-            pd.to_numeric(df["Msg Cycle Time (ms)\n报文周期时间"], errors="coerce")
+    @staticmethod
+    def _map_unique(series: pd.Series, func) -> list:
+        """Apply func once per distinct value, a failure is kept as the exception"""
+        cache = {}
+        result = []
+        for value in series:
+            key = _NAN_KEY if value != value else value
+            if key not in cache:
+                try:
+                    cache[key] = func(value)
+                except Exception as e:
+                    cache[key] = e
+            result.append(cache[key])
+        return result
+
+    def _prepare_signals(self, df: pd.DataFrame) -> list:
+        """Normalize every signal column of the matrix at once"""
+        comments = (
+            df["Description"]
+            .where(df["Description"].notna(), "")
+            .astype(str)
+            .str.replace(r"[\u4e00-\u9fff]+", "", regex=True)
+            .str.replace("/", "", regex=False)
+            .str.replace("\n", "", regex=False)
+        )
+        units = (
+            df["Unit"]
+            .where(df["Unit"].notna(), "")
+            .astype(str)
+            .str.replace("nan", "", regex=False)
+        )
+        byte_orders = np.where(
+            df["Byte Order"] == "Motorola MSB", "big_endian", "little_endian"
+        )
+        is_float = df["Data Type"].astype(str).str.contains("Float", regex=False) & (
+            df["Data Type"].notna()
+        )
+        send_types = (
+            df["Signal Send Type"]
+            .astype(str)
+            .map(self.SIGNAL_SEND_TYPES)
             .fillna(0)
             .astype(int)
         )
-        df["Msg Cycle Time Fast(ms)\n报文发送的快速周期"] = (
-            pd.to_numeric(
-                df["Msg Cycle Time Fast(ms)\n报文发送的快速周期"], errors="coerce"
+        receivers = [
+            (
+                (value.split(",") if isinstance(value, str) else [str(value)])
+                if pd.notna(value)
+                else []
             )
-            .fillna(0)
-            .astype(int)
-        )
-        df["Msg Nr. Of Reption\n报文快速发送的次数"] = (
-            pd.to_numeric(df["Msg Nr. Of Reption\n报文快速发送的次数"], errors="coerce")
-            .fillna(0)
-            .astype(int)
-        )
-        df["Msg Delay Time(ms)\n报文延时时间"] = (
-            pd.to_numeric(df["Msg Delay Time(ms)\n报文延时时间"], errors="coerce")
-            .fillna(0)
-            .astype(int)
-        )
-
-        new_df = pd.DataFrame(
-            {
-                "Message ID": df["Msg ID\n报文标识符"].ffill(),
-                "Message Name": df["Msg Name\n报文名称"].ffill(),
-                "Signal Name": df["Signal Name\n信号名称"],
-                "Cycle Type": df["Msg Cycle Time (ms)\n报文周期时间"].ffill(),
-                "Msg Time Fast": df[
-                    "Msg Cycle Time Fast(ms)\n报文发送的快速周期"
-                ].ffill(),
-                "Msg Reption": df["Msg Nr. Of Reption\n报文快速发送的次数"].ffill(),
-                "Msg Delay": df["Msg Delay Time(ms)\n报文延时时间"].ffill(),
-                "Start Byte": df["Start Byte\n起始字节"],
-                "Start Bit": df["Start Bit\n起始位"],
-                "Length": df["Bit Length (Bit)\n信号长度"],
-                "Factor": df["Resolution\n精度"],
-                "Offset": df["Offset\n偏移量"],
-                "Initinal": df["Initial Value (Hex)\n初始值"],
-                "Invalid": df["Invalid Value(Hex)\n无效值"],
-                "Min": df["Signal Min. Value (phys)\n物理最小值"],
-                "Max": df["Signal Max. Value (phys)\n物理最大值"],
-                "Unit": df["Unit\n单位"],
-                "Receiver": receivers,
-                "Byte Order": df["Byte Order\n排列格式(Intel/Motorola)"],
-                "Data Type": df["Data Type\n数据类型"],
-                "Message Type": df["Msg Type\n报文类型"].ffill(),
-                "Send Type": df["Msg Send Type\n报文发送类型"].ffill(),
-                "Description": df["Signal Description\n信号描述"],
-                "Msg Length": df["Msg Length (Byte)\n报文长度"].ffill(),
-                "Signal Value Description": df["Signal Value Description\n信号值描述"],
-                "Senders": senders,
-                "Signal Send Type": df["Signal Send Type\n信号发送类型"],
-                "Inactive value": df["Inactive Value (Hex)\n非使能值"],
-            }
-        )
-
-        consistent_fields = [
-            "Message ID",
-            "Message Name",
-            "Cycle Type",
-            "Send Type",
-            "Msg Length",
-            "Message Type",
-            "Msg Time Fast",
-            "Msg Reption",
-            "Msg Delay",
+            for value in df["Receiver"]
         ]
 
-        for field in consistent_fields:
-            new_df[field] = new_df.groupby("Message Name")[field].transform("first")
-
-        new_df["Send Type"] = (
-            new_df["Send Type"].astype(str).str.replace("Cycle", "Cyclic")
-        )
-        new_df["Signal Send Type"] = (
-            new_df["Signal Send Type"].astype(str).str.replace("Cycle", "Cyclic")
-        )
-
-        new_df["Unit"] = new_df["Unit"].astype(str)
-        new_df["Unit"] = new_df["Unit"].str.replace("Ω", "Ohm", regex=False)
-        new_df["Unit"] = new_df["Unit"].str.replace("℃", "degC", regex=False)
-
-        new_df = new_df.dropna(subset=["Signal Name"])
-        new_df["Is Signed"] = new_df["Data Type"].str.contains("Signed", na=False)
-
-        return new_df, all_revisions
-
-    def _create_signal(self, row: pd.Series) -> Optional[cantools.database.can.Signal]:
-        try:
-            comment = str(row["Description"]) if pd.notna(row["Description"]) else ""
-            comment = re.sub(r"[\u4e00-\u9fff]+", "", comment)
-            comment = str.replace(comment, "/", "")
-            comment = str.replace(comment, "\n", "")
-            unit = str(row["Unit"]) if pd.notna(row["Unit"]) else ""
-            unit = str.replace(unit, "nan", "")
-            byte_order = (
-                "big_endian" if row["Byte Order"] == "Motorola MSB" else "little_endian"
+        def scale_or_offset(default):
+            return lambda value: (
+                default
+                if pd.isna(value)
+                else (int(value) if value.is_integer() else float(value))
             )
 
-            is_float = (
-                "Float" in str(row["Data Type"])
-                if pd.notna(row["Data Type"])
-                else False
-            )
-
-            value_descriptions = None
-            if pd.notna(row["Signal Value Description"]):
-                value_descriptions = ValueDescriptionParser.parse(
-                    row["Signal Value Description"]
-                )
-
-            receivers = []
-            if pd.notna(row["Receiver"]):
-                if isinstance(row["Receiver"], str):
-                    receivers = row["Receiver"].split(",")
-                else:
-                    receivers = [str(row["Receiver"])]
-
-            raw_invalid = (
-                int(int(row["Invalid"], 16)) if pd.notna(row["Invalid"]) else 0
-            )
-
-            send_type_map = {
-                "Cyclic": 0,
-                "OnChange": 1,
-                "OnWrite": 2,
-                "IfActive": 3,
-                "OnChangeWithRepetition": 4,
-                "OnWriteWithRepetition": 5,
-                "IfActiveWithRepetition": 6,
-                "NoSigSendType": 7,
-                "OnChangeAndIfActive": 8,
-                "OnChangeAndIfActiveWithRepetition": 9,
-                "CA": 10,
-                "CE": 11,
-                "Event": 12,
-            }
+        def limit(value):
+            if pd.isna(value):
+                return None
+            return int(value) if float(value).is_integer() else float(value)
+
+        # Exception-raising columns go first, in the order the per-row
+        # builder used to evaluate them, so the reported error is unchanged
+        return [
+            self._map_unique(
+                df["Invalid"], lambda v: int(v, 16) if pd.notna(v) else None
+            ),
+            self._map_unique(
+                df["Inactive value"], lambda v: int(v) if pd.notna(v) else 0
+            ),
+            self._map_unique(df["Start Bit"], int),
+            self._map_unique(df["Length"], int),
+            self._map_unique(df["Initinal"], lambda v: int(v, 16)),
+            self._map_unique(df["Factor"], scale_or_offset(1.0)),
+            self._map_unique(df["Offset"], scale_or_offset(0.0)),
+            self._map_unique(df["Min"], limit),
+            self._map_unique(df["Max"], limit),
+            df["Signal Name"].astype(str).tolist(),
+            byte_orders.tolist(),
+            df["Is Signed"].astype(bool).tolist(),
+            is_float.tolist(),
+            send_types.tolist(),
+            units.tolist(),
+            comments.tolist(),
+            receivers,
+            self._map_unique(
+                df["Signal Value Description"],
+                lambda v: ValueDescriptionParser.to_dbc(v) if pd.notna(v) else None,
+            ),
+        ]
 
-            signal_send_type = (
-                str(row["Signal Send Type"])
-                if str(row["Signal Send Type"])
-                else "Cyclic"
-            )
-            send_type_int = send_type_map.get(signal_send_type, 0)
+    def _create_signals(
+        self, df: pd.DataFrame
+    ) -> List[Optional[cantools.database.can.Signal]]:
+        """Build the cantools signals of every row, None where a row is invalid"""
+        signals = []
+        for row in zip(*self._prepare_signals(df)):
+            (
+                raw_invalid,
+                inactive_value,
+                start,
+                length,
+                raw_initial,
+                scale,
+                offset,
+                minimum,
+                maximum,
+                name,
+                byte_order,
+                is_signed,
+                is_float,
+                send_type_int,
+                unit,
+                comment,
+                receivers,
+                value_descriptions,
+            ) = row
+            try:
+                for value in row[:9]:
+                    if isinstance(value, Exception):
+                        raise value
 
-            attr_sig_inv_val = Attribute(
-                value=raw_invalid, definition=self.attr_def_sig_invalid_value
-            )
-            attr_sig_send_type = Attribute(
-                value=send_type_int, definition=self.attr_def_sig_send_type
-            )
-            attr_sig_inact_val = Attribute(
-                value=(
-                    int(row["Inactive value"]) if pd.notna(row["Inactive value"]) else 0
-                ),
-                definition=self.attr_def_sig_inactive_value,
-            )
+                attr_sig_inv_val = Attribute(
+                    value=raw_invalid if raw_invalid is not None else 0,
+                    definition=self.attr_def_sig_invalid_value,
+                )
+                attr_sig_send_type = Attribute(
+                    value=send_type_int, definition=self.attr_def_sig_send_type
+                )
+                attr_sig_inact_val = Attribute(
+                    value=inactive_value, definition=self.attr_def_sig_inactive_value
+                )
 
-            signal = cantools.database.can.Signal(
-                name=str(row["Signal Name"]),
-                start=int(row["Start Bit"]),
-                length=int(row["Length"]),
-                byte_order=byte_order,
-                is_signed=bool(row["Is Signed"]),
-                raw_initial=int(
-                    int(row["Initinal"], 16) if int(row["Initinal"], 16) else 0
-                ),
-                raw_invalid=(
-                    int(int(row["Invalid"], 16)) if pd.notna(row["Invalid"]) else None
-                ),
-                dbc_specifics=DbcSpecifics(
-                    attributes={
-                        "GenSigInvalidValue": attr_sig_inv_val,
-                        "GenSigSendType": attr_sig_send_type,
-                        "GenSigInactiveValue": attr_sig_inact_val,
-                    }
-                ),
-                conversion=cantools.database.conversion.LinearConversion(
-                    scale=(
-                        int(row["Factor"])
-                        if pd.notna(row["Factor"]) and row["Factor"].is_integer()
-                        else (float(row["Factor"]) if pd.notna(row["Factor"]) else 1.0)
+                signal = cantools.database.can.Signal(
+                    name=name,
+                    start=start,
+                    length=length,
+                    byte_order=byte_order,
+                    is_signed=is_signed,
+                    raw_initial=raw_initial,
+                    raw_invalid=raw_invalid,
+                    dbc_specifics=DbcSpecifics(
+                        attributes={
+                            "GenSigInvalidValue": attr_sig_inv_val,
+                            "GenSigSendType": attr_sig_send_type,
+                            "GenSigInactiveValue": attr_sig_inact_val,
+                        }
                     ),
-                    offset=(
-                        int(row["Offset"])
-                        if pd.notna(row["Offset"]) and row["Offset"].is_integer()
-                        else (float(row["Offset"]) if pd.notna(row["Offset"]) else 0.0)
+                    conversion=cantools.database.conversion.LinearConversion(
+                        scale=scale, offset=offset, is_float=is_float
                     ),
-                    is_float=is_float,
-                ),
-                minimum=(
-                    int(row["Min"])
-                    if pd.notna(row["Min"]) and float(row["Min"]).is_integer()
-                    else (float(row["Min"]) if pd.notna(row["Min"]) else None)
-                ),
-                maximum=(
-                    int(row["Max"])
-                    if pd.notna(row["Max"]) and float(row["Max"]).is_integer()
-                    else (float(row["Max"]) if pd.notna(row["Max"]) else None)
-                ),
-                unit=unit,
-                comment=comment,
-                receivers=receivers,
-                is_multiplexer=False,
-            )
+                    minimum=minimum,
+                    maximum=maximum,
+                    unit=unit,
+                    comment=comment,
+                    receivers=receivers,
+                    is_multiplexer=False,
+                )
 
-            if value_descriptions:
-                signal.choices = value_descriptions
+                if value_descriptions:
+                    signal.choices = dict(value_descriptions)
 
-            return signal
+                signals.append(signal)
 
-        except Exception as e:
-            print(f"Error creating signal {row['Signal Name']}: {str(e)}")
-            return None
+            except Exception as e:
+                print(f"Error creating signal {name}: {str(e)}")
+                signals.append(None)
+
+        return signals
 
-    def _create_message(self, msg_id: str, msg_name: str, group: pd.DataFrame) -> bool:
+    def _create_message(
+        self,
+        msg_id: str,
+        msg_name: str,
+        group: pd.DataFrame,
+        signals: Optional[List[cantools.database.can.Signal]] = None,
+    ) -> bool:
         try:
             frame_id = (
                 int(msg_id, 16)
@@ -668,11 +561,9 @@ class ExcelToDBCConverter:
                 else int(msg_id)
             )
 
-            signals = []
-            for _, row in group.iterrows():
-                signal = self._create_signal(row)
-                if signal:
-                    signals.append(signal)
+            if signals is None:
+                signals = self._create_signals(group)
+            signals = [signal for signal in signals if signal]
 
             if not signals:
                 return False
@@ -759,20 +650,9 @@ class ExcelToDBCConverter:
                 # autosar_specifics=AutosarMessageSpecifics(attr_msg_send_type),
                 is_extended_frame=False,
                 header_byte_order="big_endian",
-                protocol=ExcelToDBCConverter.get_file_info(self.excel_path)[
-                    "protocol"
-                ],
-                is_fd=(
-                    True
-                    if ExcelToDBCConverter.get_file_info(self.excel_path)[
-                        "protocol"
-                    ]
-                    == "CANFD"
-                    else False
-                ),
-                bus_name=ExcelToDBCConverter.get_file_info(self.excel_path)[
-                    "domain_name"
-                ],
+                protocol=self.file_info.protocol,
+                is_fd=self.file_info.protocol == "CANFD",
+                bus_name=self.file_info.domain_name,
                 comment=None,
                 sort_signals=None,
             )
@@ -935,12 +815,7 @@ class ExcelToDBCConverter:
 
     def validate_input_data(self) -> bool:
         try:
-            df = pd.read_excel(
-                self.excel_path,
-                sheet_name="Matrix",
-                keep_default_na=True,
-                engine="openpyxl",
-            )
+            df = self.workbook.matrix
 
             checks = [
                 self._validate_excel_structure(df),
@@ -957,60 +832,15 @@ class ExcelToDBCConverter:
             return False
 
     def get_file_info(file_name: str):
-        file_start = "ATOM_CAN_Matrix_"
-        file_start1 = "ATOM_CANFD_Matrix_"
-        file_name_only = os.path.splitext(os.path.basename(file_name))[0]
-        if file_name_only.startswith(file_start1):
-            protocol = "CANFD"
-            start_index = 0
-            parts = file_name_only[len(file_start1) :].split("_")
-        elif file_name_only.startswith(file_start):
-            protocol = "CAN"
-            start_index = 0
-            parts = file_name_only[len(file_start) :].split("_")
-        else:
-            protocol = ""
-        if not (
-            file_name_only.startswith(file_start)
-            or file_name_only.startswith(file_start1)
-        ):
-            return None
-        start_index = file_name_only.find(file_start1)
-        if start_index != -1:
-            parts = file_name_only[start_index + len(file_start1) :].split("_")
-        else:
-            parts = file_name_only[len(file_start) :].split("_")
-        domain_name = parts.pop(0)
-        version_string = parts.pop(0)
-        if version_string.startswith("V"):
-            version = version_string[1:]
-            versions = version.split(".")
-            if len(versions) != 3:
-                return None
-        else:
-            version = ""
-        file_date = parts.pop(0)
-        if len(parts) > 0:
-            if parts[0] == "internal":
-                parts.pop(0)
-            device_name = "_".join(parts)
-        else:
-            device_name = ""
-
-        return {
-            "version": version,
-            "date": file_date,
-            "device_name": device_name,
-            "domain_name": domain_name,
-            "protocol": protocol,
-        }
+        return file_info_dict(file_name)
 
     def convert(self, output_path: str = "output.dbc") -> bool:
         """Main method convert"""
         print(f"Starting conversion to DBC: {output_path}")
         print(f"Excel path: {self.excel_path}")
 
-        if not os.path.exists(self.excel_path):
+        # Sheets handed over in memory (parse_count 0) have no file to check
+        if self.workbook.parse_count and not os.path.exists(self.excel_path):
             print(f"❌ Файл Excel не найден: {self.excel_path}")
             return False
 
@@ -1019,6 +849,7 @@ class ExcelToDBCConverter:
         except Exception as e:
             print(f"❌ Ошибка загрузки Excel: {str(e)}")
             import traceback
+
             traceback.print_exc()
             return False
 
@@ -1032,12 +863,15 @@ class ExcelToDBCConverter:
             print("❌ Нет колонок 'Message ID' или 'Message Name'")
             return False
 
+        signals = dict(zip(df.index, self._create_signals(df)))
         grouped = df.groupby(["Message ID", "Message Name"])
         print(f"🗂 Найдено {len(grouped)} уникальных сообщений")
 
         for (msg_id, msg_name), group in grouped:
             print(f"📩 Создание сообщения: {msg_id} | {msg_name}")
-            success = self._create_message(msg_id, msg_name, group)
+            success = self._create_message(
+                msg_id, msg_name, group, [signals[i] for i in group.index]
+            )
             if not success:
                 print(f"❌ Не удалось создать сообщение: {msg_name}")
 
@@ -1052,6 +886,7 @@ class ExcelToDBCConverter:
         except Exception as e:
             print(f"❌ Ошибка при сохранении DBC: {str(e)}")
             import traceback
+
             traceback.print_exc()
             return False
 
@@ -16,64 +16,21 @@ from ldfparser import (
     save_ldf,
 )
 import pandas as pd
-from typing import Optional, Dict
+from typing import Dict, List, Tuple
 import re
 import argparse
 from streamlit.runtime.uploaded_file_manager import UploadedFile
-import os
+from matrix_loader import MatrixWorkbook, extract_senders_receivers, find_bus_users
+from lin_rules import parse_id, protected_id
+from file_info import file_info_dict
+from value_description import ValueDescriptionParser
 import datetime
 
 
-class ValueDescriptionParser:
-    @staticmethod
-    def parse(desc_str: str) -> Optional[Dict[int, str]]:
-        """Convert multi-line hex descriptions to single-line decimal format"""
-        if not isinstance(desc_str, str) or not desc_str.strip():
-            return None
-
-        descriptions = {}
-        try:
-            desc_str = " ".join(desc_str.replace("\r", "\n").split())
-
-            range_matches = list(
-                re.finditer(
-                    r"(0x[0-9a-fA-F]+)\s*~\s*(0x[0-9a-fA-F]+)\s*:\s*([^;]*)", desc_str
-                )
-            )
-
-            for match in range_matches:
-                start = int(match.group(1), 16)
-                end = int(match.group(2), 16)
-                text = match.group(3).strip()
-                descriptions[start] = f"{match.group(1)}~{match.group(2)}, {text}"
-
-            for match in reversed(range_matches):
-                desc_str = desc_str[: match.start()].strip() + desc_str[match.end() :]
-
-            parts = re.split(r"(0x[0-9a-fA-F]+)\s*:\s*", desc_str)
-            if len(parts) > 1:
-                for i in range(1, len(parts), 2):
-                    hex_val = parts[i]
-                    text = parts[i + 1].split(";")[0].strip()
-                    if hex_val and text:
-                        try:
-                            dec_val = int(hex_val, 16)
-                            if dec_val not in descriptions:
-                                descriptions[dec_val] = re.sub(
-                                    r"[^a-zA-Z0-9_\- ]", "", text
-                                )
-                        except ValueError:
-                            continue
-
-            return dict(sorted(descriptions.items())) if descriptions else None
-
-        except Exception as e:
-            print(f"Error parsing value descriptions '{desc_str}': {str(e)}")
-            return None
-
-
 class ExcelToLDFConverter:
 
+    SHEETS = ("Matrix", "Info", "LIN Schedule")
+
     def _get_engine(self, file_path: str) -> str:
         if isinstance(file_path, UploadedFile):
             if file_path.name.endswith(".xls"):
@@ -93,32 +50,18 @@ class ExcelToLDFConverter:
     def __init__(self, excel_path: str):
         self.excel_path = excel_path
         self.ldf = LDF()
+        self.validation_warnings: List[str] = []
         self.engine = self._get_engine(self.excel_path)
 
-        df = pd.read_excel(
-            self.excel_path,
-            sheet_name="Matrix",
-            keep_default_na=True,
-            engine=self.engine,
+        # All sheets are parsed in one pass over the workbook (xls via xlrd)
+        self.workbook = MatrixWorkbook(
+            self.excel_path, sheet_names=self.SHEETS, engine=self.engine
         )
+        df = self._sheet("Matrix")
+        self.df_info = self._sheet("Info")
+        self.df_schedule = self._sheet("LIN Schedule")
 
-        self.df_info = pd.read_excel(
-            self.excel_path, sheet_name="Info", keep_default_na=True, engine=self.engine
-        )
-
-        self.df_schedule = pd.read_excel(
-            self.excel_path,
-            sheet_name="LIN Schedule",
-            keep_default_na=True,
-            engine=self.engine,
-        )
-
-        self.bus_users = [
-            col
-            for col in df.columns
-            if any(val in ["S", "R"] for val in df[col].dropna().unique())
-            and col != "Unit\n单位"
-        ]
+        self.bus_users = find_bus_users(df)
 
         self.ldf_version = LinVersion(
             str(self.df_info.iloc[1, 0]).strip(".")[0],
@@ -178,38 +121,20 @@ class ExcelToLDFConverter:
         self.ldf._master = self.master
         self.ldf._channel = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+    def _sheet(self, name: str) -> pd.DataFrame:
+        df = self.workbook.sheet(name)
+        if df is None:
+            raise ValueError(f"Worksheet named '{name}' not found")
+        return df
+
     def _load_excel_data(self) -> pd.DataFrame:
-        df = pd.read_excel(
-            self.excel_path,
-            sheet_name="Matrix",
-            keep_default_na=True,
-            engine=self.engine,
-        )
+        df = self._sheet("Matrix")
+        df_schedule = self.df_schedule
 
-        df_schedule = pd.read_excel(
-            self.excel_path,
-            sheet_name="LIN Schedule",
-            keep_default_na=True,
-            engine=self.engine,
+        senders, receivers = extract_senders_receivers(
+            df, self.bus_users, empty=None
         )
 
-        senders = []
-        receivers = []
-
-        for _, row in df.iterrows():
-            row_senders = []
-            row_receivers = []
-
-            for bus_users in self.bus_users:
-                if bus_users in df.columns:
-                    if pd.notna(row[bus_users]) and row[bus_users] == "S":
-                        row_senders.append(bus_users)
-                    elif pd.notna(row[bus_users]) and row[bus_users] == "R":
-                        row_receivers.append(bus_users)
-
-            senders.append(",".join(row_senders) if row_senders else None)
-            receivers.append(",".join(row_receivers) if row_receivers else None)
-
         new_df = pd.DataFrame(
             {
                 "Msg name": df["Msg Name\n报文名称"].ffill(),
@@ -247,60 +172,7 @@ class ExcelToLDFConverter:
         return new_df, df_schedule
 
     def get_file_info(self, file_name: str):
-        file_start = "ATOM_CAN_Matrix_"
-        file_start1 = "ATOM_CANFD_Matrix_"
-        file_start2 = "ATOM_LIN_Matrix_"
-        file_name_only = os.path.splitext(os.path.basename(file_name))[0]
-
-        if file_name_only.startswith(file_start1):
-            protocol = "CANFD"
-            remaining = file_name_only[len(file_start1) :]
-        elif file_name_only.startswith(file_start2):
-            protocol = "LIN"
-            remaining = file_name_only[len(file_start2) :]
-        elif file_name_only.startswith(file_start):
-            protocol = "CAN"
-            remaining = file_name_only[len(file_start) :]
-        else:
-            return None
-
-        parts = remaining.split("_")
-
-        domain_name = parts.pop(0)
-
-        version_string = parts.pop(0)
-        if version_string.startswith("V"):
-            version = version_string[1:]
-        else:
-            version = version_string
-
-        version_parts = version.split(".")
-        if len(version_parts) != 3:
-            return None
-
-        if "-" in version_parts[2]:
-            version_num, file_date = version_parts[2].split("-")
-            version_parts[2] = version_num
-        else:
-            if parts and re.match(r"^\d{8}$", parts[0]):
-                file_date = parts.pop(0)
-            else:
-                file_date = ""
-
-        version = ".".join(version_parts)
-
-        device_name = "_".join(parts) if parts else ""
-
-        if device_name.startswith("internal"):
-            device_name = device_name[8:].lstrip("_")
-
-        return {
-            "version": version,
-            "date": file_date,
-            "device_name": device_name,
-            "domain_name": domain_name,
-            "protocol": protocol,
-        }
+        return file_info_dict(file_name, lin=True)
 
     def _create_signals(self, row: pd.Series) -> LinSignal:
         try:
@@ -315,7 +187,7 @@ class ExcelToLDFConverter:
             # self.ldf._comments = self.get_file_info(self.excel_path.name)["version"] # if need start in local pc, del .name and all will be work
             value_description = None
             if pd.notna(row["Sig Val Description"]):
-                value_description = ValueDescriptionParser.parse(
+                value_description = ValueDescriptionParser.to_ldf(
                     row["Sig Val Description"]
                 )
 
@@ -380,67 +252,65 @@ class ExcelToLDFConverter:
             print(f"Error creating node attr: {str(e)}")
             return False
 
-    def _create_schedule_tables(self, df_schedule: pd.DataFrame):
-        try:
-            schedule_columns = []
-
-            for col_name, column in df_schedule.items():
-                first_value = column.iloc[0]
-
-                if pd.isna(first_value) or not isinstance(first_value, str):
-                    continue
-                else:
-                    schedule_columns.append(first_value)
-
-            for schedule_name in schedule_columns:
-                matching_cols = [
-                    col
-                    for col in df_schedule.columns
-                    if str(df_schedule[col].iloc[0]) == schedule_name
-                ]
+    def _index_frames(self) -> Dict[int, LinUnconditionalFrame]:
+        """Frames by frame ID, unconditional frames first; built once after all
+        frames are created so schedule entries are looked up in O(1)"""
+        all_frames = {
+            **self.ldf._unconditional_frames,
+            **self.ldf._diagnostic_frames,
+        }
+        frames_by_id = {}
+        for frame in all_frames.values():
+            frames_by_id.setdefault(frame.frame_id, frame)
+        return frames_by_id
+
+    def _parse_schedule_sheet(
+        self, df_schedule: pd.DataFrame
+    ) -> Dict[str, List[Tuple[object, object, object]]]:
+        """Schedule name -> (row, message ID, delay) of every filled slot.
+        A schedule is three columns (slot, message ID, delay) whose first cell
+        holds its name; the sheet is scanned once, columns by position."""
+        schedules = {}
+        rows = df_schedule.index[2:]
+
+        for position, first_value in enumerate(df_schedule.iloc[0]):
+            if pd.isna(first_value) or not isinstance(first_value, str):
+                continue
+            if first_value in schedules:
+                continue
+
+            msg_ids = df_schedule.iloc[2:, position + 1]
+            delays = df_schedule.iloc[2:, position + 2]
+            schedules[first_value] = [
+                (row, msg_id, delay)
+                for row, msg_id, delay in zip(rows, msg_ids, delays)
+                if pd.notna(msg_id)
+            ]
 
-                if not matching_cols:
-                    print(f"No matching column found for schedule '{schedule_name}'")
-                    continue
+        return schedules
 
-                slot_col = matching_cols[0]
-                msg_col = df_schedule.columns[df_schedule.columns.get_loc(slot_col) + 1]
-                delay_col = df_schedule.columns[
-                    df_schedule.columns.get_loc(slot_col) + 2
-                ]
+    def _create_schedule_tables(self, df_schedule: pd.DataFrame):
+        try:
+            frames_by_id = self._index_frames()
 
+            for schedule_name, slots in self._parse_schedule_sheet(
+                df_schedule
+            ).items():
                 entries = []
 
-                for _, row in (
-                    df_schedule[[slot_col, msg_col, delay_col]].iloc[2:].iterrows()
-                ):
-                    if pd.isna(row[msg_col]):
-                        continue
-
+                for row, msg_id, delay in slots:
                     try:
-                        msg_id = int(str(row[msg_col]).strip(), 16)
-                        delay = (
-                            float(row[delay_col]) if pd.notna(row[delay_col]) else 0.0
-                        )
-
-                        all_frames = {
-                            **self.ldf._unconditional_frames,
-                            **self.ldf._diagnostic_frames,
-                        }
-
-                        frame = next(
-                            (f for f in all_frames.values() if f.frame_id == msg_id),
-                            None,
-                        )
-
-                        if frame and frame != None:
+                        frame = frames_by_id.get(int(str(msg_id).strip(), 16))
+                        delay = float(delay) if pd.notna(delay) else 0.0
+
+                        if frame is not None:
                             entry_frame = LinFrameEntry()
                             entry_frame.frame = frame
                             entry_frame.delay = delay / 1000
                             entries.append(entry_frame)
 
                     except ValueError as e:
-                        print(f"Invalid message ID or delay in row {_}: {e}")
+                        print(f"Invalid message ID or delay in row {row}: {e}")
                         continue
 
                 if entries:
@@ -451,10 +321,35 @@ class ExcelToLDFConverter:
         except Exception as e:
             print(f"Error creating schedule tables: {str(e)}")
 
+    def _check_protected_id(self, frame_id: int, frame_name: str, pid) -> None:
+        """Compare the matrix Protected ID with the PID table. LDF files only
+        carry frame IDs, so a mismatch is added to validation_warnings and the
+        frame is still written."""
+        try:
+            expected = protected_id(frame_id)
+            if pd.isna(pid):
+                warning = (
+                    f"Protected ID of {frame_name} is empty, expected 0x{expected:02X}"
+                )
+            elif parse_id(pid) != expected:
+                warning = (
+                    f"Protected ID of {frame_name} is {pid}, expected 0x{expected:02X} "
+                    f"for frame ID 0x{frame_id:02X}"
+                )
+            else:
+                return
+        except ValueError as e:
+            warning = f"Cannot check protected ID of {frame_name}: {str(e)}"
+        print(warning)
+        self.validation_warnings.append(warning)
+
     def _create_frames(
         self, frame_id: int, frame_name: str, group: pd.DataFrame
     ) -> bool:
         try:
+            self._check_protected_id(
+                int(frame_id, 16), frame_name, group["Protected Id"].iloc[0]
+            )
             signals = {}
             sig_ldf = {}
             for i, row in group.iterrows():
@@ -560,6 +455,9 @@ class ExcelToLDFConverter:
 
             self._create_node()
 
+            if self.validation_warnings:
+                print(f"{len(self.validation_warnings)} protected ID warnings")
+
             save_ldf(self.ldf, output_path, "./ldf.jinja2")
 
             print(f"LDF-file successfully created: {output_path}")